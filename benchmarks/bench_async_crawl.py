@@ -0,0 +1,38 @@
+"""Benchmark : pages/s de crawl_url selon la concurrence.
+
+Usage : python -m benchmarks.bench_async_crawl [max_pages] [latence_s]
+(nécessite MongoDB local, comme WebCrawler)
+"""
+import sys
+import time
+
+from benchmarks.fixture_site import FixtureSite
+from crawler.web_crawler import WebCrawler
+
+
+def run(max_pages=100, latency=0.05, levels=(1, 2, 4, 8, 16)):
+    crawler = WebCrawler(polite=False)
+    try:
+        with FixtureSite(latency=latency) as site:
+            print(f"Site local: {site.url} (latence {latency*1000:.0f} ms)")
+            for concurrency in levels:
+                crawler.concurrency = concurrency
+                crawler.per_host_concurrency = concurrency
+                start = time.perf_counter()
+                data = crawler.crawl_url(site.url, ['html'], max_hits=max_pages)
+                elapsed = time.perf_counter() - start
+                print(f"concurrence={concurrency:>3}  pages={len(data):>4}  "
+                      f"temps={elapsed:6.2f}s  {len(data) / elapsed:7.1f} pages/s")
+            # Connexions keep-alive conservées d'un crawl à l'autre
+            for host, http in crawler.http.stats()['hosts'].items():
+                print(f"{host}: {http['requests']} requêtes, {http['connections']} connexions, "
+                      f"réutilisation {http['reuse_rate']:.0%}, "
+                      f"établissement {http['handshake_avg_ms']:.2f} ms")
+    finally:
+        crawler.close()
+
+
+if __name__ == "__main__":
+    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    run(max_pages, latency)
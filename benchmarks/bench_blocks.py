@@ -0,0 +1,52 @@
+"""Benchmark : texte envoyé au LLM lors des recrawls, page entière contre blocs modifiés.
+
+Usage : python -m benchmarks.bench_blocks [recrawls]
+
+Simulation d'une page d'actualité mise à jour entre deux crawls : un
+paragraphe modifié, parfois un paragraphe ajouté en tête et le plus ancien
+retiré. Compte les caractères (≈ tokens x 4) envoyés à l'extraction.
+"""
+import random
+import sys
+
+from preprocessing.blocks import split_blocks, plan_extraction
+from preprocessing.cleaner import clean_text
+
+WORDS = ("le gouvernement a annoncé mardi une réforme des retraites dont les syndicats "
+         "contestent le calendrier tandis que la ville de Lyon prépare les élections "
+         "municipales avec plusieurs candidats déclarés selon le ministère").split()
+
+
+def _paragraph(rng, sentences=4):
+    return ' '.join(
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 18))).capitalize() + '.'
+        for _ in range(sentences)
+    )
+
+
+def run(recrawls=20, paragraphs=12, seed=5):
+    rng = random.Random(seed)
+    page = [_paragraph(rng) for _ in range(paragraphs)]
+    previous = None
+    full = sent = 0
+    for crawl in range(recrawls + 1):
+        text = clean_text('\n\n'.join(page))
+        plan = plan_extraction(split_blocks(text), previous)
+        if crawl:
+            full += len(text)
+            sent += len(plan.text)
+        previous = [block.hash for block in plan.blocks]
+
+        # Mise à jour de la page avant le crawl suivant
+        page[rng.randrange(len(page))] = _paragraph(rng)
+        if rng.random() < 0.3:
+            page = [_paragraph(rng)] + page[:-1]
+
+    print(f"{recrawls} recrawls d'une page de {paragraphs} paragraphes")
+    print(f"page entière   : {full:>7} caractères")
+    print(f"blocs modifiés : {sent:>7} caractères ({sent / full:.0%}, "
+          f"÷{full / max(1, sent):.1f})")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
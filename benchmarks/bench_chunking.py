@@ -0,0 +1,67 @@
+"""Benchmark : texte tronqué à 6000 caractères contre découpage en morceaux.
+
+Usage : python -m benchmarks.bench_chunking [--chars 60000] [--concurrency 8]
+
+Un long document cite une entité distincte (Societe17...) par paragraphe.
+Le serveur local compatible OpenAI renvoie les entités présentes dans le
+texte reçu, avec une latence proportionnelle à la taille du prompt.
+Compare la couverture et le temps : troncature (ancien comportement),
+morceaux extraits un par un, puis en parallèle.
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks.llm_stub import StubLLM
+
+WORDS = ("le gouvernement a annoncé mardi une réforme des retraites dont les syndicats "
+         "contestent le calendrier tandis que la ville de Lyon prépare les élections").split()
+
+
+def build_document(chars, seed=11):
+    rng = random.Random(seed)
+    paragraphs, size, n = [], 0, 0
+    while size < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 90))]
+        words.insert(rng.randrange(1, len(words)), f"Societe{n}")
+        paragraph = ' '.join(words)
+        paragraph = paragraph[0].upper() + paragraph[1:] + '.'
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 1
+        n += 1
+    return ' '.join(paragraphs), n
+
+
+def run(chars=60000, concurrency=8, latency=0.2, token_latency=0.0005):
+    text, expected = build_document(chars)
+    with StubLLM(latency=latency, echo=True, token_latency=token_latency) as stub:
+        # Le client Groq lit sa configuration à l'import
+        os.environ['GROQ_API_KEY'] = 'stub'
+        os.environ['GROQ_BASE_URL'] = stub.url
+        # Chaque appel doit atteindre le serveur
+        os.environ['LLM_CACHE_ENABLED'] = '0'
+        from llm.batch import BatchExtractor
+
+        print(f"document de {len(text)} caractères, {expected} entités")
+        runs = (
+            ('tronqué à 6000', text[:6000], dict(concurrency=1, chunk_tokens=10 ** 9)),
+            ('morceaux, 1 appel à la fois', text, dict(concurrency=1)),
+            (f'morceaux, {concurrency} en parallèle', text, dict(concurrency=concurrency)),
+        )
+        for label, document, options in runs:
+            stub.requests = 0
+            extractor = BatchExtractor(rpm=0, tpm=0, packing=False, **options)
+            start = time.perf_counter()
+            knowledge = extractor.map([document])[0]
+            elapsed = time.perf_counter() - start
+            print(f"{label:<28} appels={stub.requests:>3}  "
+                  f"entités={len(knowledge['entities']):>4}/{expected}  temps={elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chars', type=int, default=60000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    run(args.chars, args.concurrency)
@@ -0,0 +1,79 @@
+"""Benchmark : crawl de toutes les sources, une par une contre en parallèle.
+
+Usage : python -m benchmarks.bench_crawl_all [--sources 6] [--pages 20] [--budget 16] [--mongomock]
+
+Chaque source est un site local de latence différente (la plus lente
+d'abord). Compare la boucle séquentielle de crawl_source à
+crawl_all_sources, dont la durée doit approcher celle de la source la
+plus lente.
+"""
+import argparse
+import os
+import time
+from contextlib import ExitStack
+
+import pymongo
+
+from benchmarks.fixture_site import FixtureSite
+
+DB_NAME = "bench_crawl_all_db"
+# Sites locaux : pas de limitation de débit par hôte
+os.environ.setdefault("POLITENESS_ENABLED", "0")
+
+
+def run(num_sources=6, pages=20, budget=16, mongo_uri="mongodb://localhost:27017/",
+        use_mongomock=False):
+    if use_mongomock:
+        import mongomock
+        pymongo.MongoClient = mongomock.MongoClient
+
+    from crawler.web_crawler import WebCrawler
+
+    crawler = WebCrawler(mongo_uri=mongo_uri, db_name=DB_NAME, archive_dir=None)
+    with ExitStack() as stack:
+        sites = [stack.enter_context(FixtureSite(latency=0.01 * (num_sources - i)))
+                 for i in range(num_sources)]
+        crawler.sources_collection.delete_many({})
+        for site in sites:
+            crawler.add_source(site.url, max_hits=pages, content_types=['html'],
+                               skip_visited=False)
+        sources = crawler.get_sources(enabled_only=True)
+
+        def reset():
+            for name in ('crawled_data', 'page_state'):
+                crawler.db[name].delete_many({})
+
+        reset()
+        start = time.perf_counter()
+        durations = []
+        for source in sources:
+            started = time.perf_counter()
+            crawler.crawl_source(source['_id'])
+            durations.append(time.perf_counter() - started)
+        sequential = time.perf_counter() - start
+        stored = crawler.data_collection.count_documents({})
+        print(f"une par une : {stored:>4} pages  temps={sequential:6.2f}s  "
+              f"(source la plus lente {max(durations):.2f}s)")
+
+        reset()
+        start = time.perf_counter()
+        results = crawler.crawl_all_sources(budget=budget, max_parallel=num_sources)
+        parallel = time.perf_counter() - start
+        slowest = max(stats['elapsed'] for stats in results.values())
+        print(f"en parallèle: {crawler.data_collection.count_documents({}):>4} pages  "
+              f"temps={parallel:6.2f}s  (source la plus lente {slowest:.2f}s, "
+              f"÷{sequential / parallel:.1f})")
+
+    crawler.client.drop_database(DB_NAME)
+    crawler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sources', type=int, default=6)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--budget', type=int, default=16)
+    parser.add_argument('--mongo-uri', default="mongodb://localhost:27017/")
+    parser.add_argument('--mongomock', action='store_true')
+    args = parser.parse_args()
+    run(args.sources, args.pages, args.budget, args.mongo_uri, args.mongomock)
@@ -0,0 +1,94 @@
+"""Benchmark : rendement du crawl focalisé (best-first) contre BFS.
+
+Usage : python -m benchmarks.bench_focus [max_hits] [--mongomock]
+
+Site synthétique : une page d'accueil chargée en navigation (tags,
+mentions légales, pagination) et des articles sur plusieurs thèmes, dont
+un seul correspond aux mots-clés. Le rendement est le nombre de pages
+pertinentes collectées par page téléchargée.
+"""
+import random
+import sys
+
+import pymongo
+
+from benchmarks.fixture_site import FixtureSite
+
+KEYWORDS = ['élection', 'scrutin', 'candidat']
+TOPICS = {
+    'elections': ("Élection municipale : les candidats au scrutin",
+                  "élection scrutin candidat vote bureau de vote"),
+    'sport': ("Match de football : victoire à domicile", "match équipe but score"),
+    'cuisine': ("Recette de saison : tarte aux pommes", "recette four sucre pommes"),
+    'meteo': ("Prévisions météo du week-end", "pluie soleil vent températures"),
+}
+
+
+def _page(title, body, links):
+    anchors = ''.join(f'<li><a href="{href}">{text}</a></li>' for href, text in links)
+    return (f"<html><head><title>{title}</title></head><body><h1>{title}</h1>"
+            f"<p>{body}</p><ul>{anchors}</ul></body></html>")
+
+
+def build_topical_site(articles_per_topic=40, tags=30, seed=3):
+    rng = random.Random(seed)
+    articles = {topic: [f"/article/{topic}-{i}" for i in range(articles_per_topic)]
+                for topic in TOPICS}
+    navigation = ([(f"/tag/{i}", f"Tag {i}") for i in range(tags)] +
+                  [("/mentions-legales", "Mentions légales"), ("/contact", "Contact"),
+                   ("/cgu", "Conditions d'utilisation")] +
+                  [(f"/liste?page={i}", f"Page {i}") for i in range(2, 12)])
+
+    pages = {}
+    # Accueil : navigation d'abord, puis une sélection d'articles de chaque thème
+    home_links = list(navigation)
+    for topic, (title, _) in TOPICS.items():
+        home_links += [(url, title) for url in articles[topic][:2]]
+    pages['/'] = _page("Accueil", "Bienvenue", home_links)
+
+    for href, text in navigation:
+        # Pages de navigation : liens « Lire la suite » vers des articles au hasard
+        picks = rng.sample([url for urls in articles.values() for url in urls], 6)
+        pages[href] = _page(text, "Liste des articles",
+                            navigation[:5] + [(url, "Lire la suite") for url in picks])
+
+    for topic, (title, words) in TOPICS.items():
+        for i, url in enumerate(articles[topic]):
+            body = ' '.join(rng.choice(words.split()) for _ in range(120))
+            # Les articles renvoient surtout vers leur propre thème
+            related = [(u, TOPICS[topic][0]) for u in rng.sample(articles[topic], 4)]
+            other_topic = rng.choice([t for t in TOPICS if t != topic])
+            related.append((rng.choice(articles[other_topic]), TOPICS[other_topic][0]))
+            pages[url] = _page(f"{title} ({i})", body, navigation[:8] + related)
+    return pages
+
+
+def run(max_hits=40, use_mongomock=False):
+    if use_mongomock:
+        import mongomock
+        pymongo.MongoClient = mongomock.MongoClient
+
+    from crawler.focus import LinkScorer
+    from crawler.page_state import CrawlStats
+    from crawler.relevance import RelevanceFilter
+    from crawler.web_crawler import WebCrawler
+
+    crawler = WebCrawler(archive_dir=None, concurrency=1, polite=False)
+    try:
+        with FixtureSite(build_topical_site(), latency=0) as site:
+            for name, focus in (('bfs', None), ('best_first', LinkScorer(KEYWORDS))):
+                stats = CrawlStats()
+                data = crawler.crawl_url(
+                    site.url, ['html'], max_hits=max_hits, stats=stats,
+                    relevance=RelevanceFilter(KEYWORDS), focus=focus
+                )
+                print(f"{name:<11} téléchargées={stats['fetched']:>4}  "
+                      f"pertinentes={len(data):>4}  "
+                      f"rendement={len(data) / max(1, stats['fetched']):.0%}")
+    finally:
+        crawler.close()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    run(int(args[0]) if args else 40, '--mongomock' in sys.argv)
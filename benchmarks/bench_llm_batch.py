@@ -0,0 +1,49 @@
+"""Benchmark : extraction LLM page par page contre extraction par lots.
+
+Usage : python -m benchmarks.bench_llm_batch [--pages 24] [--latency 0.5] [--concurrency 8] [--rpm 0]
+
+Un serveur local compatible OpenAI répond après une latence fixe. Le
+temps par lots doit approcher pages x latence / concurrence ; avec --rpm,
+le budget de requêtes par minute impose son rythme. Un appel par page :
+le regroupement des textes courts est mesuré par bench_packing.
+"""
+import argparse
+import os
+import time
+
+from benchmarks.llm_stub import StubLLM
+
+
+def run(pages=24, latency=0.5, concurrency=8, rpm=0, tpm=0):
+    with StubLLM(latency=latency) as stub:
+        # Le client Groq lit sa configuration à l'import
+        os.environ['GROQ_API_KEY'] = 'stub'
+        os.environ['GROQ_BASE_URL'] = stub.url
+        # Chaque appel doit atteindre le serveur
+        os.environ['LLM_CACHE_ENABLED'] = '0'
+        from llm.batch import BatchExtractor
+
+        texts = [f"Emmanuel Macron visite Airbus à Paris, page {i}. " * 20 for i in range(pages)]
+        for workers in (1, concurrency):
+            extractor = BatchExtractor(concurrency=workers, rpm=rpm, tpm=tpm, packing=False)
+            stub.peak = 0
+            start = time.perf_counter()
+            results = extractor.map(texts)
+            elapsed = time.perf_counter() - start
+            stats = extractor.stats()
+            entities = sum(len(r['entities']) for r in results)
+            print(f"concurrence={workers:>2}  temps={elapsed:6.2f}s  "
+                  f"idéal={pages * latency / workers:6.2f}s  en vol max={stub.peak:>2}  "
+                  f"entités={entities}  tokens={stats['used_tokens']} "
+                  f"(estimés {stats['estimated_tokens']})  attente budget={stats['budget_wait']:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=24)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rpm', type=int, default=0)
+    parser.add_argument('--tpm', type=int, default=0)
+    args = parser.parse_args()
+    run(args.pages, args.latency, args.concurrency, args.rpm, args.tpm)
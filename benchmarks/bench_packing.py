@@ -0,0 +1,59 @@
+"""Benchmark : une page par appel LLM contre plusieurs pages courtes par appel.
+
+Usage : python -m benchmarks.bench_packing [--pages 40] [--latency 0.3] [--concurrency 4]
+
+Un serveur local compatible OpenAI répond après une latence fixe. Pour
+chaque mode : appels, tokens consommés, temps et entités retrouvées par
+page ; la dernière ligne force une réponse groupée illisible pour
+vérifier le repli document par document.
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks.llm_stub import StubLLM
+
+WORDS = ("le gouvernement a annoncé mardi une réforme des retraites dont les syndicats "
+         "contestent le calendrier tandis que la ville de Lyon prépare les élections").split()
+
+
+def _page(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(60, 250))).capitalize() + '.'
+
+
+def run(pages=40, latency=0.3, concurrency=4, seed=3):
+    rng = random.Random(seed)
+    texts = [_page(rng) for _ in range(pages)]
+    with StubLLM(latency=latency) as stub:
+        # Le client Groq lit sa configuration à l'import
+        os.environ['GROQ_API_KEY'] = 'stub'
+        os.environ['GROQ_BASE_URL'] = stub.url
+        # Chaque appel doit atteindre le serveur
+        os.environ['LLM_CACHE_ENABLED'] = '0'
+        from llm.batch import BatchExtractor
+        from llm.packing import plan_packs
+
+        print(f"{pages} pages, {len(plan_packs(texts))} appels groupés prévus")
+        for label, packing, packed_ok in (('une par appel', False, True),
+                                          ('groupées', True, True),
+                                          ('groupées, repli', True, False)):
+            stub.packed_ok = packed_ok
+            stub.requests = 0
+            extractor = BatchExtractor(concurrency=concurrency, rpm=0, tpm=0, packing=packing)
+            start = time.perf_counter()
+            results = extractor.map(texts)
+            elapsed = time.perf_counter() - start
+            stats = extractor.stats()
+            complete = sum(1 for r in results if len(r['entities']) == 3)
+            print(f"{label:<16} appels={stub.requests:>3}  tokens={stats['used_tokens']:>6}  "
+                  f"temps={elapsed:6.2f}s  pages extraites={complete}/{pages}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+    run(args.pages, args.latency, args.concurrency)
@@ -0,0 +1,64 @@
+"""Micro-benchmark des backends de parsing HTML.
+
+Usage : python -m benchmarks.bench_parsing [dossier_de_pages_html] [répétitions]
+Sans dossier, un corpus synthétique est généré. Si le dossier est une
+archive de réponses (crawler.archive), ses pages HTML sont utilisées, ce
+qui rend les mesures reproductibles sur un corpus réel. Les champs extraits par
+chaque backend sont comparés à ceux de html.parser.
+"""
+import glob
+import os
+import sys
+import time
+
+from benchmarks.fixture_site import build_site
+from crawler.parsing import available_backends, parse_html
+
+
+def load_corpus(directory=None):
+    if not directory:
+        return [(path, html.encode('utf-8')) for path, html in build_site(300).items()]
+    if os.path.exists(os.path.join(directory, 'index.sqlite3')):
+        return load_archive(directory)
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '**', '*.htm*'), recursive=True)):
+        with open(path, 'rb') as f:
+            pages.append((path, f.read()))
+    return pages
+
+
+def load_archive(directory):
+    from crawler.archive import ResponseArchive
+    archive = ResponseArchive(directory)
+    pages = []
+    for url in archive.urls():
+        archived = archive.get(url)
+        content_type = {k.lower(): v for k, v in archived.headers.items()}.get('content-type', '')
+        if archived.status == 200 and 'html' in content_type.lower():
+            pages.append((url, archived.body))
+    archive.close()
+    return pages
+
+
+def run(directory=None, repeat=3):
+    corpus = load_corpus(directory)
+    print(f"Corpus: {len(corpus)} pages, {sum(len(c) for _, c in corpus) / 1e6:.1f} Mo")
+
+    reference = {path: parse_html(content, 'http://example.com/', 'html.parser')
+                 for path, content in corpus}
+
+    for backend in available_backends():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = {path: parse_html(content, 'http://example.com/', backend)
+                       for path, content in corpus}
+        elapsed = (time.perf_counter() - start) / repeat
+        mismatches = sum(1 for path, page in results.items() if page != reference[path])
+        print(f"{backend:<12} {elapsed * 1000 / len(corpus):7.3f} ms/page  "
+              f"{len(corpus) / elapsed:8.0f} pages/s  écarts={mismatches}")
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    run(directory, repeat)
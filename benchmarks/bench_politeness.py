@@ -0,0 +1,51 @@
+"""Benchmark : crawl sans politesse contre débit adaptatif par hôte.
+
+Usage : python -m benchmarks.bench_politeness [max_pages] [limite_req_s] [--mongomock]
+
+Le site local répond 429 (Retry-After: 1) au-delà de limite_req_s
+requêtes par seconde et interdit /page/39* dans son robots.txt. Pour
+chaque mode : pages collectées, réponses 429, débit obtenu.
+"""
+import sys
+import time
+
+import pymongo
+
+from benchmarks.fixture_site import FixtureSite, build_site
+
+ROBOTS = b"User-agent: *\nDisallow: /page/39\n"
+
+
+def run(max_pages=150, rate_limit=20, use_mongomock=False):
+    if use_mongomock:
+        import mongomock
+        pymongo.MongoClient = mongomock.MongoClient
+
+    from crawler.page_state import CrawlStats
+    from crawler.web_crawler import WebCrawler
+
+    pages = build_site(num_pages=400)
+    pages['/robots.txt'] = ('text/plain', ROBOTS)
+    for polite in (False, True):
+        crawler = WebCrawler(archive_dir=None, concurrency=8, per_host_concurrency=8,
+                             polite=polite)
+        try:
+            with FixtureSite(pages, latency=0.01, rate_limit=rate_limit) as site:
+                stats = CrawlStats()
+                start = time.perf_counter()
+                data = crawler.crawl_url(site.url, ['html'], max_hits=max_pages, stats=stats)
+                elapsed = time.perf_counter() - start
+                print(f"{'poli' if polite else 'sans politesse':<15} pages={len(data):>4}  "
+                      f"429={site.throttled:>4}  interdites={stats['robots_disallowed']:>3}  "
+                      f"temps={elapsed:6.2f}s  {len(data) / elapsed:5.1f} pages/s")
+                for host, rate in crawler.get_statistics()['politeness'].items():
+                    print(f"    {host}: débit final {rate['rate']:.1f} req/s, "
+                          f"{rate['throttled']} ralentissement(s)")
+        finally:
+            crawler.close()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    run(int(args[0]) if args else 150, int(args[1]) if len(args) > 1 else 20,
+        '--mongomock' in sys.argv)
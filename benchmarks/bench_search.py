@@ -0,0 +1,118 @@
+"""Benchmark : latence des recherches, index BM25 contre $text MongoDB.
+
+Usage : python -m benchmarks.bench_search [--docs 20000] [--queries 200] [--mongomock]
+
+Un corpus synthétique est inséré dans une base dédiée puis les mêmes
+requêtes sont lancées sur les deux moteurs (p50 / p99 en millisecondes).
+mongomock ne gère pas $text : seul le moteur BM25 est alors mesuré.
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+import pymongo
+
+DB_NAME = "bench_search_db"
+
+VOCABULARY = """
+élection présidentielle gouvernement ministre parlement assemblée sénat réforme
+économie croissance inflation emploi chômage entreprise industrie énergie climat
+environnement transport santé hôpital éducation école université recherche culture
+musée cinéma sport football justice tribunal police sécurité défense armée europe
+afrique asie amérique commerce agriculture numérique internet données intelligence
+artificielle logement immobilier banque finance impôt budget retraite syndicat grève
+""".split()
+FILLER = "le la les de des du un une et en dans pour sur avec par au aux".split()
+
+
+def build_corpus(num_docs, words_per_doc=300, seed=42):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    docs = []
+    for i in range(num_docs):
+        words = []
+        for _ in range(words_per_doc):
+            if rng.random() < 0.4:
+                words.append(rng.choice(FILLER))
+            else:
+                words.append(rng.choices(VOCABULARY, weights)[0])
+        docs.append({
+            'source_id': f"bench{i % 10}",
+            'url': f"http://example.com/page/{i}",
+            'title': ' '.join(rng.sample(VOCABULARY, 4)),
+            'content': ' '.join(words),
+            'content_type': 'html',
+        })
+    return docs
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1000,
+            samples[int(0.99 * (len(samples) - 1))] * 1000)
+
+
+def run(num_docs=20000, num_queries=200, mongo_uri="mongodb://localhost:27017/",
+        use_mongomock=False):
+    if use_mongomock:
+        import mongomock
+        pymongo.MongoClient = mongomock.MongoClient
+
+    from crawler.web_crawler import WebCrawler
+
+    index_dir = tempfile.mkdtemp(prefix="bench_search_")
+    crawler = WebCrawler(mongo_uri=mongo_uri, db_name=DB_NAME, search_index_dir=index_dir)
+    crawler.data_collection.delete_many({})
+
+    docs = build_corpus(num_docs)
+    start = time.perf_counter()
+    for i in range(0, len(docs), 1000):
+        batch = docs[i:i + 1000]
+        crawler.data_collection.insert_many(batch)
+        crawler.search_index.add_documents(batch)
+        crawler.search_index.commit()
+    print(f"Corpus: {num_docs} pages, indexées en {time.perf_counter() - start:.1f}s "
+          f"({len(crawler.search_index.segments)} segment(s))")
+
+    rng = random.Random(7)
+    queries = [' '.join(rng.sample(VOCABULARY, rng.randint(1, 3))) for _ in range(num_queries)]
+
+    engines = [('bm25', lambda q: crawler.search(q, limit=10))]
+    if not use_mongomock:
+        engines.append(('$text', lambda q: crawler._search_text(q, 10)))
+
+    for name, search in engines:
+        search(queries[0])  # échauffement
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            samples.append(time.perf_counter() - start)
+        p50, p99 = percentiles(samples)
+        print(f"{name:<6} p50={p50:7.2f} ms  p99={p99:7.2f} ms")
+
+    # Redémarrage : l'index est relu depuis le disque, sans reconstruction
+    crawler.search_index.close()
+    start = time.perf_counter()
+    from crawler.search_index import SearchIndex
+    reopened = SearchIndex(index_dir)
+    print(f"Réouverture de l'index: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(reopened)} pages)")
+    reopened.close()
+
+    crawler.search_index = None
+    crawler.client.drop_database(DB_NAME)
+    crawler.close()
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--mongo-uri', default="mongodb://localhost:27017/")
+    parser.add_argument('--mongomock', action='store_true')
+    args = parser.parse_args()
+    run(args.docs, args.queries, args.mongo_uri, args.mongomock)
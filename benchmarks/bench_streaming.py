@@ -0,0 +1,102 @@
+"""Benchmark : réponse LLM attendue en entier contre réponse lue en streaming.
+
+Usage : python -m benchmarks.bench_streaming [--entities 40] [--latency 0.3] [--chunk-delay 0.01]
+
+Un serveur local compatible OpenAI génère la réponse par tranches de 16
+caractères. Première partie : délai avant la première entité et avant le
+graphe complet, avec un appel classique puis en streaming (graphe
+construit pendant la génération). Seconde partie : réponses coupées
+(MAX_TOKENS) ou mal formées (virgules en trop), lues par json.loads comme
+avant puis avec récupération des objets complets ; un appel perdu est un
+appel dont on ne tire aucune entité.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+from benchmarks.llm_stub import StubLLM
+
+
+def _text(entities):
+    return ' '.join(f"Le groupe Acme{i} a signé avec Beta{i}." for i in range(entities // 2))
+
+
+def _trailing_commas(entities):
+    items = ''.join(f'{{"name": "Acme{i}", "type": "Organization",}}, ' for i in range(entities))
+    return '{"entities": [' + items + '], "relations": [],}'
+
+
+def run(entities=40, latency=0.3, chunk_delay=0.01, calls=10):
+    text = _text(entities)
+    with StubLLM(latency=latency, echo=True, chunk_delay=chunk_delay) as stub:
+        # Le client Groq lit sa configuration à l'import
+        os.environ['GROQ_API_KEY'] = 'stub'
+        os.environ['GROQ_BASE_URL'] = stub.url
+        # Chaque appel doit atteindre le serveur
+        os.environ['LLM_CACHE_ENABLED'] = '0'
+        from graph.builder import IncrementalGraph
+        from llm.client import call_groq
+        from llm.extractor import (
+            EXTRACTION_SYSTEM, build_prompt, clean_json, parse_knowledge, remember_knowledge,
+            stream_knowledge
+        )
+        # graph.builder configure les logs en INFO : une ligne par requête HTTP
+        logging.getLogger().setLevel(logging.WARNING)
+
+        print(f"Réponse de {entities} entités, {chunk_delay * 1000:.0f} ms par tranche générée")
+        start = time.perf_counter()
+        knowledge = parse_knowledge(call_groq(build_prompt(text), system=EXTRACTION_SYSTEM))
+        first = time.perf_counter() - start
+        graph = IncrementalGraph('bench')
+        for ent in knowledge['entities']:
+            graph.add_entity(ent)
+        done = time.perf_counter() - start
+        print(f"{'appel classique':<16} première entité={first:5.2f}s  "
+              f"graphe complet={done:5.2f}s  nœuds={len(graph.nodes)}")
+
+        start = time.perf_counter()
+        first = None
+        graph = IncrementalGraph('bench')
+        for key, obj in stream_knowledge(text):
+            if first is None:
+                first = time.perf_counter() - start
+            graph.add(key, obj)
+        done = time.perf_counter() - start
+        print(f"{'streaming':<16} première entité={first:5.2f}s  "
+              f"graphe complet={done:5.2f}s  nœuds={len(graph.nodes)}")
+
+        print(f"\n{calls} appels par cas, réponses de {entities} entités")
+        full = len(json.dumps({'entities': [{'name': f'Acme{i}', 'type': 'Organization'}
+                                            for i in range(entities)], 'relations': []}))
+        stub.chunk_delay = 0
+        for label, truncate, response in (('coupée à 60 %', int(full * 0.6), None),
+                                          ('virgules en trop', None, _trailing_commas(entities))):
+            stub.truncate = truncate
+            stub.echo = response is None
+            if response is not None:
+                stub.response = response
+            results = {'json.loads': [], 'récupération': []}
+            for _ in range(calls):
+                raw = call_groq(build_prompt(text), system=EXTRACTION_SYSTEM)
+                try:
+                    strict = json.loads(clean_json(raw))['entities']
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    strict = []
+                results['json.loads'].append(len(strict))
+                results['récupération'].append(len(remember_knowledge(text, raw)['entities']))
+            for mode, counts in results.items():
+                wasted = sum(1 for n in counts if not n)
+                print(f"{label:<17} {mode:<13} entités={sum(counts):>4}/{calls * entities}  "
+                      f"appels perdus={wasted}/{calls}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entities', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--chunk-delay', type=float, default=0.01)
+    parser.add_argument('--calls', type=int, default=10)
+    args = parser.parse_args()
+    run(args.entities, args.latency, args.chunk_delay, args.calls)
@@ -0,0 +1,91 @@
+"""Benchmark : débit des workers distribués selon leur nombre.
+
+Usage : python -m benchmarks.bench_workers [--sources 16] [--pages 10] [--mongomock]
+
+Par défaut les workers sont des processus et utilisent un mongod local.
+Avec --mongomock, la base est simulée en mémoire et les workers sont des
+threads du même processus.
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+
+import pymongo
+
+from benchmarks.fixture_site import FixtureSite
+
+DB_NAME = "bench_workers_db"
+# Site local : pas de limitation de débit par hôte (crawler et workers du benchmark)
+os.environ.setdefault("POLITENESS_ENABLED", "0")
+
+
+def _worker(mongo_uri):
+    from crawler.worker import run_worker
+    run_worker(mongo_uri, DB_NAME, exit_when_idle=True)
+
+
+def _thread_worker(crawler):
+    from crawler.jobs import JobQueue
+    from crawler.worker import CrawlWorker
+    CrawlWorker(crawler, JobQueue(crawler.db)).run(exit_when_idle=True)
+
+
+def run(num_sources=16, pages=10, latency=0.05, levels=(1, 2, 4, 8),
+        mongo_uri="mongodb://localhost:27017/", use_mongomock=False):
+    if use_mongomock:
+        import mongomock
+        pymongo.MongoClient = mongomock.MongoClient
+
+    from crawler.jobs import JobQueue
+    from crawler.web_crawler import WebCrawler
+
+    crawler = WebCrawler(mongo_uri=mongo_uri, db_name=DB_NAME)
+    queue = JobQueue(crawler.db)
+
+    with FixtureSite(latency=latency) as site:
+        crawler.sources_collection.delete_many({})
+        for i in range(num_sources):
+            crawler.add_source(f"{site.url}page/{i * 7}", max_hits=pages,
+                               content_types=['html'], skip_visited=False)
+        sources = crawler.get_sources(enabled_only=True)
+
+        for workers in levels:
+            for name in ('jobs', 'crawled_data', 'page_state'):
+                crawler.db[name].delete_many({})
+            for source in sources:
+                queue.enqueue(source['_id'])
+
+            start = time.perf_counter()
+            if use_mongomock:
+                runners = [threading.Thread(target=_thread_worker, args=(crawler,))
+                           for _ in range(workers)]
+            else:
+                runners = [multiprocessing.Process(target=_worker, args=(mongo_uri,))
+                           for _ in range(workers)]
+            for runner in runners:
+                runner.start()
+            for runner in runners:
+                runner.join()
+            elapsed = time.perf_counter() - start
+
+            done = queue.counts().get('done', 0)
+            print(f"workers={workers:>2}  jobs={done:>3}  temps={elapsed:6.2f}s  "
+                  f"{done / elapsed:6.2f} jobs/s  "
+                  f"{crawler.data_collection.count_documents({}) / elapsed:7.1f} pages/s")
+
+    crawler.client.drop_database(DB_NAME)
+    crawler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sources', type=int, default=16)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--mongo-uri', default="mongodb://localhost:27017/")
+    parser.add_argument('--mongomock', action='store_true')
+    args = parser.parse_args()
+    run(args.sources, args.pages, args.latency, mongo_uri=args.mongo_uri,
+        use_mongomock=args.mongomock)
@@ -0,0 +1,113 @@
+"""Site local de test pour les benchmarks du crawler.
+
+Génère un site HTML synthétique en mémoire et le sert avec un
+ThreadingHTTPServer, avec une latence artificielle par requête et,
+optionnellement, une limite de débit (429 + Retry-After au-delà).
+"""
+import hashlib
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def build_site(num_pages=200, links_per_page=5):
+    """Construit un dictionnaire chemin -> HTML"""
+    pages = {}
+    for i in range(num_pages):
+        links = ''.join(
+            f'<a href="/page/{(i * links_per_page + j + 1) % num_pages}">Lien {j}</a> '
+            for j in range(links_per_page)
+        )
+        paragraph = f'<p>Contenu de la page numéro {i}.</p>' * 3
+        pages[f'/page/{i}'] = (
+            f'<html><head><title>Page {i}</title>'
+            f'<meta name="keywords" content="test, page{i}"></head>'
+            f'<body><h1>Page {i}</h1>{paragraph}<nav>{links}</nav></body></html>'
+        )
+    pages['/'] = pages['/page/0']
+    return pages
+
+
+class FixtureSite:
+    """Serveur HTTP local servant un site synthétique"""
+
+    def __init__(self, pages=None, latency=0.05, port=0, rate_limit=None):
+        self.pages = pages if pages is not None else build_site()
+        self.latency = latency
+        self.rate_limit = rate_limit  # requêtes/s acceptées, None = illimité
+        self.hits = 0
+        self.throttled = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, comme un vrai serveur
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                site.hits += 1
+                if site._over_limit():
+                    site.throttled += 1
+                    self.send_response(429)
+                    self.send_header('Retry-After', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                time.sleep(site.latency)
+                body = site.pages.get(self.path.split('#')[0])
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                    content_type = 'text/html; charset=utf-8'
+                else:
+                    content_type, body = body
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def _over_limit(self):
+        """Fenêtre glissante d'une seconde"""
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,164 @@
+"""Serveur local compatible OpenAI (chat completions) pour les benchmarks LLM.
+
+Répond à POST /v1/chat/completions après une latence artificielle, avec
+une extraction JSON fixe et un usage de tokens approximatif (4 caractères
+par token). Un prompt groupé (documents balisés D1, D2...) reçoit une
+extraction par document, ou une réponse illisible avec packed_ok=False.
+
+Avec echo=True, les entités renvoyées sont les mots du texte de la forme
+Nom123 (pour mesurer la couverture d'une extraction) ; token_latency
+ajoute une latence proportionnelle aux tokens du prompt.
+
+Génération simulée : chunk_delay secondes par tranche de chunk_chars
+caractères de réponse, envoyées une à une en Server-Sent Events quand la
+requête demande stream=True, d'un bloc sinon. truncate coupe la réponse à
+ce nombre de caractères (finish_reason "length", comme à MAX_TOKENS).
+"""
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+KNOWLEDGE = {
+    "entities": [
+        {"name": "Emmanuel Macron", "type": "Person"},
+        {"name": "Paris", "type": "Location"},
+        {"name": "Airbus", "type": "Organization"},
+    ],
+    "relations": [
+        {"source": "Emmanuel Macron", "target": "Paris", "type": "visite"},
+        {"source": "Airbus", "target": "Paris", "type": "situé_à"},
+    ],
+}
+
+
+class StubLLM:
+    """Serveur chat completions local, à utiliser comme context manager"""
+
+    def __init__(self, latency=0.5, response=None, packed_ok=True, echo=False,
+                 token_latency=0.0, chunk_chars=16, chunk_delay=0.0, truncate=None, port=0):
+        self.latency = latency
+        self.echo = echo
+        self.token_latency = token_latency
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.truncate = truncate
+        self.response = response if response is not None else json.dumps(KNOWLEDGE)
+        self.packed_ok = packed_ok
+        self.requests = 0
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.peak = max(stub.peak, stub.in_flight)
+                try:
+                    prompt = sum(len(m.get('content', '')) for m in body.get('messages', []))
+                    time.sleep(stub.latency + stub.token_latency * prompt / 4)
+                    self._complete(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _usage(self, body, content):
+                prompt = sum(len(m.get('content', '')) for m in body.get('messages', [])) // 4
+                completion = len(content) // 4
+                return {'prompt_tokens': prompt, 'completion_tokens': completion,
+                        'total_tokens': prompt + completion}
+
+            def _knowledge(self, text):
+                if not stub.echo:
+                    return KNOWLEDGE
+                names = dict.fromkeys(re.findall(r'\b[A-Z][a-z]+\d+\b', text))
+                return {'entities': [{'name': n, 'type': 'Organization'} for n in names],
+                        'relations': []}
+
+            def _content(self, body):
+                prompt = body['messages'][-1]['content']
+                documents = re.findall(r'=== DOCUMENT (\w+) ===\n(.*?)\n=== FIN', prompt, re.DOTALL)
+                if not documents:
+                    if stub.echo:
+                        return json.dumps(self._knowledge(prompt))
+                    return stub.response
+                if not stub.packed_ok:
+                    return "Voici les documents analysés : ..."
+                return json.dumps({'documents': [
+                    {'id': doc_id, **self._knowledge(text)} for doc_id, text in documents
+                ]})
+
+            def _complete(self, body):
+                content = self._content(body)
+                finish_reason = 'stop'
+                if stub.truncate is not None and len(content) > stub.truncate:
+                    content, finish_reason = content[:stub.truncate], 'length'
+                pieces = [content[i:i + stub.chunk_chars]
+                          for i in range(0, len(content), stub.chunk_chars)]
+                if body.get('stream'):
+                    return self._stream(body, content, pieces, finish_reason)
+                time.sleep(stub.chunk_delay * len(pieces))
+                payload = json.dumps({
+                    'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()),
+                    'model': body.get('model', 'stub'),
+                    'choices': [{'index': 0, 'finish_reason': finish_reason,
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': self._usage(body, content),
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, content, pieces, finish_reason):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                base = {'id': 'stub', 'object': 'chat.completion.chunk',
+                        'created': int(time.time()), 'model': body.get('model', 'stub')}
+                events = [{**base, 'choices': [{'index': 0, 'finish_reason': None,
+                                                'delta': {'content': piece}}]}
+                          for piece in pieces]
+                events.append({**base, 'choices': [{'index': 0, 'finish_reason': finish_reason,
+                                                    'delta': {}}],
+                               'x_groq': {'usage': self._usage(body, content)}})
+                for n, event in enumerate(events):
+                    if n < len(events) - 1:
+                        time.sleep(stub.chunk_delay)
+                    self._send_chunk(f"data: {json.dumps(event)}\n\n")
+                self._send_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
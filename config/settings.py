@@ -13,7 +13,122 @@ GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
 MODEL = os.getenv("MODEL", "llama-3.3-70b-versatile")
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", 8000))
 TEMPERATURE = float(os.getenv("TEMPERATURE", 0.1))
+# Extraction par lots : appels simultanés et limites du compte (0 = illimité)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 4))
+LLM_RPM = int(os.getenv("LLM_RPM", 30))  # requêtes par minute
+LLM_TPM = int(os.getenv("LLM_TPM", 12000))  # tokens par minute
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 1000))  # réponse attendue, réservée avant l'appel
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"  # réponses en streaming : une coupure garde le début
+# Regroupement des textes courts dans un même appel (tokens du prompt, documents)
+LLM_PACKING = os.getenv("LLM_PACKING", "1") == "1"
+LLM_PACK_TOKENS = int(os.getenv("LLM_PACK_TOKENS", 3000))
+LLM_PACK_MAX_DOCS = int(os.getenv("LLM_PACK_MAX_DOCS", 8))
+# Découpage des textes longs avant extraction (tokens estimés)
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 1500))  # ~6000 caractères par appel
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))  # phrases reprises du morceau précédent
+# Cache des extractions (texte, modèle, température, version du prompt)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")
+LLM_CACHE_MEMORY = int(os.getenv("LLM_CACHE_MEMORY", 1024))  # entrées gardées en mémoire (LRU)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 100_000))  # entrées sur disque
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 30 * 86400))  # secondes, 0 = sans expiration
 
 # Crawler
 MAX_PAGES = 50
-TIMEOUT = 10
\ No newline at end of file
+TIMEOUT = 10
+
+# Crawl asynchrone (1 = mode séquentiel)
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 1))
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", 4))
+# Taille des lots d'écriture MongoDB pendant le crawl
+CRAWL_BATCH_SIZE = int(os.getenv("CRAWL_BATCH_SIZE", 100))
+# Taille maximale d'une réponse (0 = illimitée)
+CRAWL_MAX_BYTES = int(os.getenv("CRAWL_MAX_BYTES", 10 * 1024 * 1024))
+# Texte conservé par page dans les documents stockés (caractères)
+MAX_CONTENT_CHARS = int(os.getenv("MAX_CONTENT_CHARS", 5000))
+# Texte lu par page pour l'extraction LLM (pipeline), découpé en morceaux avant l'appel
+EXTRACTION_MAX_CHARS = int(os.getenv("EXTRACTION_MAX_CHARS", 200_000))
+# Crawl de toutes les sources : requêtes en vol au total, sources en parallèle
+CRAWL_ALL_BUDGET = int(os.getenv("CRAWL_ALL_BUDGET", 16))
+CRAWL_ALL_PARALLEL = int(os.getenv("CRAWL_ALL_PARALLEL", 8))
+
+# Frontière de crawl
+CRAWL_STATE_DIR = os.getenv("CRAWL_STATE_DIR", "data/crawl_state")
+FRONTIER_CAPACITY = int(os.getenv("FRONTIER_CAPACITY", 1_000_000))
+FRONTIER_MAX_QUEUE = int(os.getenv("FRONTIER_MAX_QUEUE", 100_000))
+
+# Parser HTML : auto (selectolax > lxml > html.parser), selectolax, lxml, html.parser
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+
+# Extraction dans des processus dédiés (PDF, gros HTML), sans bloquer le crawl
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", 2))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", 60))
+EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", 2048))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 10))  # 0 = toutes les pages
+PDF_CHUNK_PAGES = int(os.getenv("PDF_CHUNK_PAGES", 10))
+HTML_OFFLOAD_BYTES = int(os.getenv("HTML_OFFLOAD_BYTES", 1_000_000))  # 0 = jamais
+
+# Planificateur
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", 4))
+SCHEDULER_REFRESH = float(os.getenv("SCHEDULER_REFRESH", 60))  # secondes
+
+# File de jobs MongoDB (workers distribués)
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 5))
+
+# Quasi-doublons (SimHash 64 bits) : skip, mark ou off
+NEAR_DUP_MODE = os.getenv("NEAR_DUP_MODE", "skip")
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", 3))  # bits différents (~95 % de similarité)
+NEAR_DUP_MIN_WORDS = int(os.getenv("NEAR_DUP_MIN_WORDS", 20))
+
+# Recherche : bm25 (index inversé local) ou text (index $text MongoDB)
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "bm25")
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "data/search_index")
+SEARCH_MAX_SEGMENTS = int(os.getenv("SEARCH_MAX_SEGMENTS", 8))
+
+# Archive des réponses brutes (rejouable avec replay=True), sur option.
+# Corps compressés en zstd si le paquet zstandard est installé, sinon en zlib
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "0") == "1"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+ARCHIVE_SEGMENT_BYTES = int(os.getenv("ARCHIVE_SEGMENT_BYTES", 256 * 1024 * 1024))
+ARCHIVE_MAX_BYTES = int(os.getenv("ARCHIVE_MAX_BYTES", 10 * 1024 ** 3))  # segments les plus anciens supprimés au-delà, 0 = illimité
+
+# Client HTTP partagé (pools keep-alive, cache DNS, HTTP/2 sur option avec httpx[http2])
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 100))  # hôtes gardés en pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))  # connexions par hôte
+HTTP_HOST_POOLS = os.getenv("HTTP_HOST_POOLS", "")  # ex. "example.com=32,lent.fr=2"
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", 300))  # secondes, 0 = désactivé
+DNS_CACHE_SIZE = int(os.getenv("DNS_CACHE_SIZE", 1024))  # noms gardés en cache
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "0") == "1"  # nécessite httpx[http2]
+
+# Stratégie de crawl par défaut : bfs ou best_first (crawl focalisé sur les mots-clés)
+CRAWL_STRATEGY = os.getenv("CRAWL_STRATEGY", "bfs")
+
+# Recrawl adaptatif (frequency='adaptive') : intervalle déduit du taux de changement observé
+RECRAWL_MIN_INTERVAL = float(os.getenv("RECRAWL_MIN_INTERVAL", 3600))  # secondes
+RECRAWL_MAX_INTERVAL = float(os.getenv("RECRAWL_MAX_INTERVAL", 30 * 86400))
+RECRAWL_INITIAL_INTERVAL = float(os.getenv("RECRAWL_INITIAL_INTERVAL", 86400))  # sans historique
+RECRAWL_TARGET_CHANGE = float(os.getenv("RECRAWL_TARGET_CHANGE", 0.5))  # part des pages modifiées visée au recrawl
+RECRAWL_DECAY = float(os.getenv("RECRAWL_DECAY", 0.8))  # poids des observations anciennes
+
+# Blocs de texte (détection des passages modifiés avant extraction LLM)
+BLOCK_MIN_CHARS = int(os.getenv("BLOCK_MIN_CHARS", 200))
+BLOCK_MAX_CHARS = int(os.getenv("BLOCK_MAX_CHARS", 1000))
+BLOCK_BOUNDARY = int(os.getenv("BLOCK_BOUNDARY", 3))  # ~ phrases par bloc (coupure définie par le contenu)
+BLOCK_CONTEXT = int(os.getenv("BLOCK_CONTEXT", 1))  # phrases voisines inchangées envoyées comme contexte
+
+# Politesse : débit adaptatif par hôte (token bucket) et robots.txt
+POLITENESS_ENABLED = os.getenv("POLITENESS_ENABLED", "1") == "1"
+POLITE_INITIAL_RATE = float(os.getenv("POLITE_INITIAL_RATE", 2.0))  # requêtes/s par hôte
+POLITE_MIN_RATE = float(os.getenv("POLITE_MIN_RATE", 0.1))
+POLITE_MAX_RATE = float(os.getenv("POLITE_MAX_RATE", 20.0))
+POLITE_BURST = float(os.getenv("POLITE_BURST", 2))  # jetons accumulables
+POLITE_LATENCY_FACTOR = float(os.getenv("POLITE_LATENCY_FACTOR", 2.0))  # ralentir si latence > facteur x référence
+POLITE_MAX_WAIT = float(os.getenv("POLITE_MAX_WAIT", 60))  # secondes ; au-delà l'URL est abandonnée
+POLITE_MAX_RETRIES = int(os.getenv("POLITE_MAX_RETRIES", 2))  # nouvelles tentatives après 429/503
+ROBOTS_ENABLED = os.getenv("ROBOTS_ENABLED", "1") == "1"
+ROBOTS_TTL = float(os.getenv("ROBOTS_TTL", 3600))  # secondes
+ROBOTS_USER_AGENT = os.getenv("ROBOTS_USER_AGENT", "GrapheWeb")
+# User-Agent envoyé : commence par le nom vérifié dans robots.txt
+USER_AGENT = os.getenv("USER_AGENT", f"{ROBOTS_USER_AGENT}/1.0")
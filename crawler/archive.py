@@ -0,0 +1,348 @@
+"""Archive des réponses brutes, adressée par contenu.
+
+Chaque réponse téléchargée est ajoutée à un segment au format proche du
+WARC : un enregistrement `response` porte le corps compressé (zstd si le
+paquet zstandard est installé, sinon zlib) la première fois qu'un contenu
+est vu ; les captures suivantes du même contenu ne sont qu'un
+enregistrement `revisit` (en-têtes seuls) qui renvoie à son empreinte
+SHA-256. Un index SQLite (reconstructible avec reindex()) relie les URLs
+aux enregistrements.
+
+L'archive est bornée à max_bytes : au-delà, les segments les plus anciens
+sont supprimés, avec les captures qui en dépendent.
+
+ArchiveSession rejoue l'archive à la place du réseau (mode replay).
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config.settings import ARCHIVE_DIR, ARCHIVE_SEGMENT_BYTES, ARCHIVE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SEGMENT_SUFFIX = '.warc'
+
+
+def _compress(data):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 6)
+
+
+def _decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Archive compressée en zstd : installez zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    return data
+
+
+@dataclass
+class ArchivedResponse:
+    """Réponse archivée : en-têtes de la capture et corps partagé"""
+    url: str
+    final_url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    fetched_at: str
+    digest: str = ''
+    extra: Dict[str, str] = field(default_factory=dict)
+
+
+class ResponseArchive:
+    """Segments d'enregistrements + index SQLite des captures"""
+
+    def __init__(self, directory=ARCHIVE_DIR, segment_bytes=ARCHIVE_SEGMENT_BYTES,
+                 max_bytes=ARCHIVE_MAX_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segment = None
+        self._db = sqlite3.connect(
+            os.path.join(directory, 'index.sqlite3'), timeout=30, check_same_thread=False
+        )
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS payloads (
+                digest TEXT PRIMARY KEY, segment TEXT, offset INTEGER, length INTEGER,
+                codec TEXT, size INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS captures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, final_url TEXT,
+                fetched_at TEXT, status INTEGER, headers TEXT, digest TEXT,
+                segment TEXT, offset INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS captures_url ON captures (url, fetched_at);
+        """)
+
+    # --- Écriture ------------------------------------------------------
+
+    def _segment_path(self):
+        """Segment courant de ce processus, renouvelé au-delà de segment_bytes"""
+        if (self._segment is None or
+                os.path.getsize(self._segment) >= self.segment_bytes):
+            name = f"{datetime.now():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}"
+            self._segment = os.path.join(self.directory, name)
+            open(self._segment, 'ab').close()
+            self._evict()
+        return self._segment
+
+    def _segments(self):
+        """Segments de l'archive, du plus ancien au plus récent"""
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def _evict(self):
+        """Supprime les segments les plus anciens tant que l'archive dépasse max_bytes
+
+        Le segment courant est conservé. Les captures d'un segment supprimé
+        et celles (revisit) dont le contenu y était stocké sortent de l'index.
+        """
+        if not self.max_bytes:
+            return
+        sizes = {name: os.path.getsize(os.path.join(self.directory, name))
+                 for name in self._segments()}
+        total = sum(sizes.values())
+        current = os.path.basename(self._segment)
+        for name in sizes:
+            if total <= self.max_bytes:
+                break
+            if name == current:
+                continue
+            os.remove(os.path.join(self.directory, name))
+            total -= sizes[name]
+            self.evicted += 1
+            self._db.execute("DELETE FROM payloads WHERE segment = ?", (name,))
+            self._db.execute("DELETE FROM captures WHERE segment = ?", (name,))
+            logger.info(f"Archive : segment {name} supprimé (limite {self.max_bytes} octets)")
+        self._db.execute("DELETE FROM captures WHERE digest NOT IN (SELECT digest FROM payloads)")
+        self._db.commit()
+
+    def _append(self, record_type, fields, payload=b''):
+        """Ajoute un enregistrement, retourne (segment, offset, offset du bloc)"""
+        lines = [
+            'WARC/1.1',
+            f"WARC-Type: {record_type}",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        ]
+        lines += [f"{key}: {value}" for key, value in fields.items()]
+        lines.append(f"Content-Length: {len(payload)}")
+        header = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+
+        path = self._segment_path()
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(header)
+            f.write(payload)
+            f.write(b'\r\n\r\n')
+        return os.path.basename(path), offset, offset + len(header)
+
+    def store(self, url, response, body=None):
+        """Archive une réponse (corps lu) ; retourne l'empreinte du corps"""
+        body = response.content if body is None else body
+        digest = 'sha256:' + hashlib.sha256(body).hexdigest()
+        headers = dict(response.headers)
+        fetched_at = datetime.now().isoformat(timespec='seconds')
+        final_url = response.url or url
+
+        with self._lock:
+            known = self._db.execute(
+                "SELECT 1 FROM payloads WHERE digest = ?", (digest,)
+            ).fetchone()
+            fields = {
+                'WARC-Target-URI': url,
+                'WARC-Date': fetched_at,
+                'WARC-Payload-Digest': digest,
+                'X-Final-URI': final_url,
+                'X-HTTP-Status': response.status_code,
+                'X-HTTP-Headers': json.dumps(headers, ensure_ascii=True),
+            }
+            if known:
+                segment, offset, _ = self._append('revisit', fields)
+            else:
+                codec, payload = _compress(body)
+                fields['X-Compression'] = codec
+                segment, offset, block = self._append('response', fields, payload)
+                self._db.execute(
+                    "INSERT OR IGNORE INTO payloads VALUES (?, ?, ?, ?, ?, ?)",
+                    (digest, segment, block, len(payload), codec, len(body))
+                )
+            self._db.execute(
+                "INSERT INTO captures (url, final_url, fetched_at, status, headers, digest,"
+                " segment, offset) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, final_url, fetched_at, response.status_code, json.dumps(headers),
+                 digest, segment, offset)
+            )
+            self._db.commit()
+        return digest
+
+    # --- Lecture -------------------------------------------------------
+
+    def _payload(self, digest):
+        row = self._db.execute(
+            "SELECT segment, offset, length, codec FROM payloads WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length, codec = row
+        with open(os.path.join(self.directory, segment), 'rb') as f:
+            f.seek(offset)
+            return _decompress(codec, f.read(length))
+
+    def get(self, url, as_of=None):
+        """Dernière capture de url (antérieure à as_of si fourni), ou None"""
+        query = "SELECT url, final_url, status, headers, fetched_at, digest FROM captures WHERE url = ?"
+        params = [url]
+        if as_of is not None:
+            query += " AND fetched_at <= ?"
+            params.append(as_of.isoformat(timespec='seconds'))
+        query += " ORDER BY fetched_at DESC, id DESC LIMIT 1"
+        with self._lock:
+            row = self._db.execute(query, params).fetchone()
+            if row is None:
+                return None
+            body = self._payload(row[5])
+        if body is None:
+            return None
+        return ArchivedResponse(
+            url=row[0], final_url=row[1], status=row[2], headers=json.loads(row[3]),
+            body=body, fetched_at=row[4], digest=row[5]
+        )
+
+    def urls(self, prefix=''):
+        """URLs archivées (éventuellement restreintes à un préfixe)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT url FROM captures WHERE url >= ? AND url < ? ORDER BY url",
+                (prefix, prefix + '\U0010ffff')
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self):
+        """Captures, contenus distincts, octets bruts et octets stockés"""
+        with self._lock:
+            captures = self._db.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+            payloads, stored, raw = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(size), 0) FROM payloads"
+            ).fetchone()
+            fetched = self._db.execute(
+                "SELECT COALESCE(SUM(p.size), 0) FROM captures c JOIN payloads p USING (digest)"
+            ).fetchone()[0]
+        return {
+            'captures': captures,
+            'payloads': payloads,
+            'bytes_fetched': fetched,
+            'bytes_unique': raw,
+            'bytes_stored': stored,
+        }
+
+    # --- Maintenance ---------------------------------------------------
+
+    def _records(self, path):
+        """Parcourt les enregistrements d'un segment : (offset, champs, offset du bloc)"""
+        with open(path, 'rb') as f:
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    return
+                if not line.strip():
+                    continue
+                fields = {}
+                for raw in iter(f.readline, b'\r\n'):
+                    if not raw:
+                        return
+                    key, _, value = raw.decode('utf-8').rstrip('\r\n').partition(': ')
+                    fields[key] = value
+                block = f.tell()
+                f.seek(int(fields.get('Content-Length', 0)) + 4, io.SEEK_CUR)
+                yield offset, fields, block
+
+    def reindex(self):
+        """Reconstruit l'index SQLite à partir des segments"""
+        with self._lock:
+            self._db.execute("DELETE FROM payloads")
+            self._db.execute("DELETE FROM captures")
+            for name in self._segments():
+                for offset, fields, block in self._records(os.path.join(self.directory, name)):
+                    digest = fields['WARC-Payload-Digest']
+                    if fields['WARC-Type'] == 'response':
+                        self._db.execute(
+                            "INSERT OR IGNORE INTO payloads VALUES (?, ?, ?, ?, ?, NULL)",
+                            (digest, name, block, int(fields['Content-Length']),
+                             fields.get('X-Compression', 'none'))
+                        )
+                    self._db.execute(
+                        "INSERT INTO captures (url, final_url, fetched_at, status, headers,"
+                        " digest, segment, offset) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (fields['WARC-Target-URI'], fields.get('X-Final-URI'),
+                         fields['WARC-Date'], int(fields['X-HTTP-Status']),
+                         fields['X-HTTP-Headers'], digest, name, offset)
+                    )
+            self._db.commit()
+        # Tailles décompressées (non stockées dans les en-têtes)
+        for digest, in self._db.execute("SELECT digest FROM payloads").fetchall():
+            body = self._payload(digest)
+            with self._lock:
+                self._db.execute("UPDATE payloads SET size = ? WHERE digest = ?",
+                                 (len(body), digest))
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ArchiveSession:
+    """Remplace requests.Session : sert les réponses depuis l'archive"""
+
+    def __init__(self, archive, as_of=None):
+        self.archive = archive
+        self.as_of = as_of
+
+    def get(self, url, headers=None, **kwargs):
+        archived = self.archive.get(url, self.as_of)
+        response = requests.Response()
+        response.request = requests.Request('GET', url, headers=headers).prepare()
+        if archived is None:
+            response.status_code = 404
+            response.url = url
+            response.raw = io.BytesIO(b'')
+            return response
+
+        response.status_code = archived.status
+        response.url = archived.final_url or url
+        # Corps archivé déjà décodé : plus de Content-Encoding
+        replay_headers = CaseInsensitiveDict(archived.headers)
+        replay_headers.pop('Content-Encoding', None)
+        replay_headers['Content-Length'] = str(len(archived.body))
+        response.headers = replay_headers
+        response.raw = io.BytesIO(archived.body)
+        response.encoding = requests.utils.get_encoding_from_headers(replay_headers)
+        return response
+
+    def close(self):
+        pass
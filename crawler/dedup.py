@@ -0,0 +1,113 @@
+import hashlib
+import re
+import threading
+from collections import defaultdict
+
+from config.settings import NEAR_DUP_MAX_DISTANCE, NEAR_DUP_MIN_WORDS, NEAR_DUP_MODE
+from crawler.relevance import normalize_text
+
+FINGERPRINT_BITS = 64
+WORD = re.compile(r'\w+')
+
+
+def simhash(text, shingle_size=3):
+    """Empreinte SimHash 64 bits sur des shingles de mots (None si texte trop court)"""
+    words = WORD.findall(normalize_text(text))
+    if len(words) < NEAR_DUP_MIN_WORDS:
+        return None
+
+    weights = [0] * FINGERPRINT_BITS
+    for i in range(max(1, len(words) - shingle_size + 1)):
+        shingle = ' '.join(words[i:i + shingle_size])
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """Index LSH d'empreintes SimHash.
+
+    L'empreinte est découpée en max_distance + 1 bandes : deux empreintes à
+    distance de Hamming <= max_distance partagent forcément une bande, donc
+    seules les empreintes d'un même bucket sont comparées.
+    """
+
+    def __init__(self, max_distance=NEAR_DUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        num_bands = max_distance + 1
+        width = FINGERPRINT_BITS // num_bands
+        self.bands = [
+            (i * width, FINGERPRINT_BITS if i == num_bands - 1 else (i + 1) * width)
+            for i in range(num_bands)
+        ]
+        self.buckets = [defaultdict(list) for _ in self.bands]
+        self._lock = threading.Lock()
+
+    def _keys(self, fingerprint):
+        return [(fingerprint >> start) & ((1 << (stop - start)) - 1) for start, stop in self.bands]
+
+    def find(self, fingerprint):
+        """Clé d'une page déjà indexée proche de l'empreinte, ou None"""
+        for buckets, key in zip(self.buckets, self._keys(fingerprint)):
+            for other, doc_key in buckets.get(key, ()):
+                if hamming(fingerprint, other) <= self.max_distance:
+                    return doc_key
+        return None
+
+    def add(self, fingerprint, doc_key):
+        for buckets, key in zip(self.buckets, self._keys(fingerprint)):
+            buckets[key].append((fingerprint, doc_key))
+
+    def check_and_add(self, fingerprint, doc_key):
+        """Retourne la page dont celle-ci est un quasi-doublon, sinon l'indexe"""
+        with self._lock:
+            original = self.find(fingerprint)
+            if original is None:
+                self.add(fingerprint, doc_key)
+            return original
+
+
+class NearDuplicateFilter:
+    """Détection des quasi-doublons d'un crawl.
+
+    mode 'skip' : la page n'est pas retournée ; mode 'mark' : elle est
+    retournée avec near_duplicate_of (et ne sera pas envoyée au LLM).
+    """
+
+    def __init__(self, mode=NEAR_DUP_MODE, index=None):
+        self.mode = mode
+        self.index = index or NearDuplicateIndex()
+
+    @classmethod
+    def for_source(cls, collection, source_id, mode=NEAR_DUP_MODE):
+        """Index initialisé avec les empreintes déjà stockées pour la source"""
+        dedup = cls(mode)
+        for doc in collection.find(
+            {'source_id': source_id, 'simhash': {'$exists': True}, 'near_duplicate_of': None},
+            {'simhash': 1, 'url': 1}
+        ):
+            dedup.index.add(int(doc['simhash'], 16), doc['url'])
+        return dedup
+
+    def check(self, data):
+        """Annote la page ; retourne l'URL de l'original si c'est un quasi-doublon"""
+        data['near_duplicate_of'] = None
+        fingerprint = simhash(f"{data.get('title', '')} {data.get('content', '')}")
+        if fingerprint is None:
+            return None
+        data['simhash'] = f"{fingerprint:016x}"
+        original = self.index.check_and_add(fingerprint, data['url'])
+        if original is not None and original != data['url']:
+            data['near_duplicate_of'] = original
+            return original
+        return None
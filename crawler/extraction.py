@@ -0,0 +1,257 @@
+import io
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+from config.settings import (
+    EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, EXTRACTION_MEMORY_MB,
+    PDF_MAX_PAGES, PDF_CHUNK_PAGES
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _limit_memory(memory_mb):
+    """Initialiseur des processus : plafonne l'espace d'adressage (Unix)"""
+    if not memory_mb:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def pdf_page_count(content):
+    """Nombre de pages d'un PDF"""
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pdf_text(content, start=0, stop=None):
+    """Texte des pages [start, stop) d'un PDF"""
+    text_content = ""
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        for page in pdf.pages[start:stop]:
+            text_content += page.extract_text() or ""
+    return text_content
+
+
+def _serve(conn, memory_mb):
+    """Boucle d'un processus d'extraction : reçoit (fn, args), renvoie (succès, résultat)"""
+    _limit_memory(memory_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            result = (True, fn(*args))
+        except Exception as e:
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # Résultat ou exception non sérialisable
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    """Processus d'extraction dédié : un délai dépassé ne tue que lui"""
+
+    def __init__(self, context, memory_mb):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, memory_mb), daemon=True)
+        self.process.start()
+        child.close()
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def call(self, fn, args, timeout):
+        """fn(*args) dans le processus ; TimeoutError ou BrokenProcessPool
+        laissent le processus arrêté"""
+        try:
+            self.conn.send((fn, args))
+            ready = self.conn.poll(timeout)
+        except OSError as e:
+            self.kill()
+            raise BrokenProcessPool(f"processus d'extraction interrompu: {e}") from e
+        if not ready:
+            self.kill()
+            raise TimeoutError(f"extraction > {timeout:.0f}s")
+        try:
+            ok, result = self.conn.recv()
+        except (EOFError, OSError) as e:
+            # Processus mort pendant la tâche (mémoire, crash du parser)
+            self.kill()
+            raise BrokenProcessPool("processus d'extraction interrompu") from e
+        if not ok:
+            raise result
+        return result
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+def then(future, fn, fallback=None):
+    """Future de fn(résultat de future), calculé dès que future se termine
+
+    Si future ou fn échoue, l'erreur est journalisée et le résultat vaut
+    fallback.
+    """
+    chained = Future()
+
+    def done(completed):
+        if not chained.set_running_or_notify_cancel():
+            return
+        try:
+            chained.set_result(fn(completed.result()))
+        except Exception as e:
+            logger.error(f"Erreur extraction: {e}")
+            chained.set_result(fallback)
+
+    future.add_done_callback(done)
+    return chained
+
+
+class DocumentExtractor:
+    """Processus d'extraction bornés pour le travail coûteux en CPU.
+
+    submit et submit_pdf retournent un Future : le crawl continue pendant
+    l'extraction. Chaque document a un délai maximum, compté depuis sa
+    soumission ; une tâche qui le dépasse tue seulement son processus, et
+    un processus mort (mémoire, crash) ne fait échouer que sa tâche. Les
+    autres documents ne sont pas touchés. La mémoire de chaque processus
+    est plafonnée par RLIMIT_AS.
+    """
+
+    def __init__(self, max_workers=EXTRACTION_WORKERS, timeout=EXTRACTION_TIMEOUT,
+                 memory_mb=EXTRACTION_MEMORY_MB, pdf_max_pages=PDF_MAX_PAGES,
+                 pdf_chunk_pages=PDF_CHUNK_PAGES):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.pdf_max_pages = pdf_max_pages
+        self.pdf_chunk_pages = max(1, pdf_chunk_pages)
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = []
+        self._tasks = None        # une tâche par processus au plus
+        self._documents = None    # orchestration des documents en plusieurs tâches
+        self._lock = threading.Lock()
+
+    def _executors(self):
+        with self._lock:
+            if self._tasks is None:
+                self._tasks = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                 thread_name_prefix='extraction')
+                self._documents = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                     thread_name_prefix='extraction-doc')
+            return self._tasks, self._documents
+
+    def _acquire(self):
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    return worker
+        return _Worker(self._context, self.memory_mb)
+
+    def _release(self, worker):
+        if not worker.alive:
+            return
+        with self._lock:
+            if self._tasks is not None:
+                self._idle.append(worker)
+                return
+        # Extracteur fermé pendant la tâche
+        worker.close()
+
+    def _call(self, fn, args, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # Délai épuisé en file d'attente : aucun processus à arrêter
+            raise TimeoutError(f"extraction > {self.timeout}s")
+        worker = self._acquire()
+        try:
+            return worker.call(fn, args, remaining)
+        finally:
+            self._release(worker)
+
+    def submit(self, fn, *args):
+        """Future de fn(*args), exécuté dans un processus avec le délai par document"""
+        tasks, _ = self._executors()
+        return tasks.submit(self._call, fn, args, time.monotonic() + self.timeout)
+
+    def submit_pdf(self, content):
+        """Future du texte d'un PDF, extrait par tranches de pages en parallèle.
+
+        pdf_max_pages limite le nombre de pages lues (0 ou None = toutes).
+        """
+        tasks, documents = self._executors()
+        return documents.submit(self._pdf_text, tasks, content, time.monotonic() + self.timeout)
+
+    def _pdf_text(self, tasks, content, deadline):
+        max_pages = self.pdf_max_pages
+        if max_pages and max_pages <= self.pdf_chunk_pages:
+            return tasks.submit(self._call, extract_pdf_text, (content, 0, max_pages),
+                                deadline).result()
+
+        num_pages = tasks.submit(self._call, pdf_page_count, (content,), deadline).result()
+        if max_pages:
+            num_pages = min(num_pages, max_pages)
+
+        futures = [
+            tasks.submit(self._call, extract_pdf_text,
+                         (content, start, min(start + self.pdf_chunk_pages, num_pages)), deadline)
+            for start in range(0, num_pages, self.pdf_chunk_pages)
+        ]
+        try:
+            return "".join(f.result() for f in futures)
+        except BaseException:
+            # Tranches pas encore commencées : inutile de les extraire
+            for f in futures:
+                f.cancel()
+            raise
+
+    def run(self, fn, *args):
+        """Exécute fn(*args) dans un processus et attend le résultat"""
+        return self.submit(fn, *args).result()
+
+    def pdf_text(self, content):
+        """Texte d'un PDF (voir submit_pdf), en attendant le résultat"""
+        return self.submit_pdf(content).result()
+
+    def close(self):
+        with self._lock:
+            tasks, documents = self._tasks, self._documents
+            self._tasks = self._documents = None
+            idle, self._idle = self._idle, []
+        for executor in (documents, tasks):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        for worker in idle:
+            worker.close()
@@ -0,0 +1,122 @@
+"""Budget global de requêtes en vol partagé entre plusieurs crawls.
+
+Quand plusieurs sources sont crawlées en même temps, FairBudget plafonne
+le nombre total de requêtes en vol et le nombre de requêtes par hôte,
+toutes sources confondues. Les créneaux libérés vont à la source qui a
+le moins de requêtes en vol parmi celles qui attendent (partage max-min) :
+une source qui ouvre beaucoup de requêtes n'affame pas les autres, et un
+créneau n'est jamais laissé vide tant qu'une source peut l'utiliser.
+"""
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+
+class FairBudget:
+    """Créneaux de requêtes partagés entre sources et hôtes"""
+
+    def __init__(self, limit, per_host=None):
+        self.limit = max(1, limit)
+        self.per_host = per_host
+        self.total = 0
+        self.sources = defaultdict(int)   # requêtes en vol par source
+        self.hosts = defaultdict(int)     # requêtes en vol par hôte
+        self.waiting = []                 # (source, hôte) en attente, par ordre d'arrivée
+        self.granted = defaultdict(int)
+        self.wait_time = defaultdict(float)
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def _host_free(self, host):
+        return self.per_host is None or self.hosts[host] < self.per_host
+
+    def _eligible(self, source, host):
+        if self.total >= self.limit or not self._host_free(host):
+            return False
+        # Priorité à la source la moins servie qui peut effectivement partir
+        mine = self.sources[source]
+        return not any(
+            other != source and self.sources[other] < mine and self._host_free(other_host)
+            for other, other_host in self.waiting
+        )
+
+    def acquire(self, source, host):
+        """Attend un créneau pour une requête de source vers host"""
+        start = time.perf_counter()
+        with self._cond:
+            waiter = (source, host)
+            self.waiting.append(waiter)
+            try:
+                while not self._eligible(source, host):
+                    self._cond.wait()
+            finally:
+                self.waiting.remove(waiter)
+            self.total += 1
+            self.sources[source] += 1
+            self.hosts[host] += 1
+            self.granted[source] += 1
+            self.wait_time[source] += time.perf_counter() - start
+            self.peak = max(self.peak, self.total)
+            # Un créneau peut rester libre pour une autre source en attente
+            self._cond.notify_all()
+
+    def release(self, source, host):
+        with self._cond:
+            self.total -= 1
+            self.sources[source] -= 1
+            self.hosts[host] -= 1
+            self._cond.notify_all()
+
+    def session(self, session, source):
+        """Session dont les requêtes passent par le budget pour source"""
+        return BudgetedSession(session, self, source)
+
+    def stats(self):
+        """Requêtes accordées et attente cumulée (secondes) par source"""
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'in_flight': self.total,
+                'peak': self.peak,
+                'sources': {
+                    source: {'requests': count, 'wait': self.wait_time[source]}
+                    for source, count in self.granted.items()
+                },
+            }
+
+
+class BudgetedSession:
+    """Session requests dont chaque GET occupe un créneau du budget
+
+    Le créneau est pris au moment de l'envoi (après l'attente de politesse)
+    et rendu à la fermeture de la réponse, corps lu compris.
+    """
+
+    def __init__(self, session, budget, source):
+        self.session = session
+        self.budget = budget
+        self.source = source
+
+    def get(self, url, **kwargs):
+        host = urlparse(url).netloc
+        self.budget.acquire(self.source, host)
+        try:
+            response = self.session.get(url, **kwargs)
+        except BaseException:
+            self.budget.release(self.source, host)
+            raise
+
+        close = response.close
+        released = threading.Event()
+
+        def release():
+            try:
+                close()
+            finally:
+                if not released.is_set():
+                    released.set()
+                    self.budget.release(self.source, host)
+
+        response.close = release
+        return response
@@ -0,0 +1,155 @@
+"""Lecture des flux RSS / Atom et des sitemaps.
+
+Les documents sont lus en streaming (iterparse) : un sitemap de 50 000 URLs
+ou compressé en gzip ne passe jamais en entier en mémoire sous forme
+d'arbre. Les espaces de noms sont ignorés (RSS 1.0/2.0, Atom, sitemaps).
+"""
+import gzip
+import io
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+GZIP_MAGIC = b'\x1f\x8b'
+# Profondeur maximale des index de sitemaps (index -> sitemaps -> ...)
+SITEMAP_MAX_DEPTH = 3
+
+
+@dataclass
+class FeedEntry:
+    """Article d'un flux ou URL d'un sitemap"""
+    url: str
+    title: str = ''
+    summary: str = ''
+    updated: Optional[datetime] = None
+    is_sitemap: bool = False  # entrée d'un index de sitemaps
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def _text(element):
+    return ' '.join(''.join(element.itertext()).split()) if element is not None else ''
+
+
+def parse_date(value):
+    """Date RFC 822 (RSS) ou W3C / ISO 8601 (Atom, sitemaps), en heure locale naïve"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+class _Prefixed(io.RawIOBase):
+    """Flux dont les premiers octets ont déjà été lus (détection du gzip)"""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.head:
+            n = min(len(buffer), len(self.head))
+            buffer[:n] = self.head[:n]
+            self.head = self.head[n:]
+            return n
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_stream(stream):
+    """Flux XML lisible, décompressé s'il s'agit d'un fichier .gz"""
+    head = stream.read(2)
+    prefixed = io.BufferedReader(_Prefixed(head, stream))
+    if head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=prefixed)
+    return prefixed
+
+
+def iter_entries(stream, meta=None):
+    """Entrées d'un flux RSS / Atom ou d'un sitemap, au fil de la lecture
+
+    meta : dictionnaire optionnel qui reçoit le titre du flux ('title').
+    """
+    depth = 0  # profondeur dans un <item> / <entry>
+    for event, element in ET.iterparse(open_stream(stream), events=('start', 'end')):
+        tag = _local(element.tag)
+        if event == 'start':
+            if tag in ('item', 'entry'):
+                depth += 1
+            continue
+
+        if tag in ('item', 'entry'):
+            depth -= 1
+            yield _feed_entry(element)
+            element.clear()
+
+        elif tag == 'title' and not depth and meta is not None and 'title' not in meta:
+            meta['title'] = _text(element)
+
+        elif tag in ('url', 'sitemap'):
+            fields = {_local(child.tag): (child.text or '').strip() for child in element}
+            if fields.get('loc'):
+                yield FeedEntry(
+                    url=fields['loc'],
+                    updated=parse_date(fields.get('lastmod')),
+                    is_sitemap=tag == 'sitemap',
+                )
+            element.clear()
+
+
+def _feed_entry(element):
+    fields = {}
+    url = ''
+    for child in element:
+        name = _local(child.tag)
+        if name == 'link':
+            # Atom : <link href="..." rel="alternate"/> ; RSS : <link>url</link>
+            href = child.get('href')
+            if href and child.get('rel', 'alternate') == 'alternate':
+                url = url or href
+            elif child.text and child.text.strip():
+                url = url or child.text.strip()
+        elif name not in fields:
+            fields[name] = child
+    if not url and fields.get('guid') is not None and \
+            fields['guid'].get('isPermaLink', 'true') == 'true':
+        url = _text(fields['guid'])
+
+    summary = ''
+    for name in ('encoded', 'content', 'description', 'summary'):
+        if fields.get(name) is not None:
+            summary = _text(fields[name])
+            break
+    updated = None
+    for name in ('updated', 'published', 'pubdate', 'date'):
+        if fields.get(name) is not None:
+            updated = parse_date(_text(fields[name]))
+            if updated:
+                break
+
+    return FeedEntry(url=url, title=_text(fields.get('title')) or 'Sans titre',
+                     summary=summary, updated=updated)
+
+
+def parse_feed(content):
+    """(titre, entrées) d'un document XML déjà téléchargé"""
+    meta = {}
+    entries = [entry for entry in iter_entries(io.BytesIO(content), meta) if entry.url]
+    return meta.get('title', ''), entries
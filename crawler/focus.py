@@ -0,0 +1,71 @@
+import math
+import re
+import threading
+from urllib.parse import unquote, urlsplit
+
+from crawler.relevance import KeywordMatcher
+
+URL_SEPARATORS = re.compile(r'[/\-_.,;:?=&+%~]+')
+
+
+class LinkScorer:
+    """Priorité des liens pour un crawl focalisé (best-first).
+
+    Score d'un lien = mots-clés de la source dans le texte d'ancre, dans
+    les mots de l'URL, et pertinence de la page qui le contient. Un lien
+    vu sur plusieurs pages garde son meilleur score jusqu'à sa sortie de
+    file (discard).
+    """
+
+    def __init__(self, keywords, anchor_weight=2.0, url_weight=1.0, parent_weight=1.0):
+        self.matcher = KeywordMatcher(keywords)
+        self.anchor_weight = anchor_weight
+        self.url_weight = url_weight
+        self.parent_weight = parent_weight
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.matcher)
+
+    def _hits(self, text):
+        return sum(self.matcher.count(text).values()) if text else 0
+
+    def url_words(self, url):
+        parts = urlsplit(url)
+        return URL_SEPARATORS.sub(' ', unquote(f"{parts.path} {parts.query}"))
+
+    def page_relevance(self, data):
+        """Pertinence d'une page traitée (celle du RelevanceFilter si déjà calculée)"""
+        if data is None:
+            return 0
+        if 'relevance' in data:
+            return data['relevance']
+        return self._hits(f"{data.get('title', '')}\n{data.get('content', '')}")
+
+    def score(self, url, anchor='', parent_relevance=0):
+        return (self.anchor_weight * self._hits(anchor) +
+                self.url_weight * self._hits(self.url_words(url)) +
+                self.parent_weight * math.log1p(parent_relevance))
+
+    def observe(self, links, anchors, parent_relevance):
+        """Note les liens d'une page (anchors : textes d'ancre alignés sur links)"""
+        scored = [
+            (link, self.score(link, anchors[i] if i < len(anchors) else '', parent_relevance))
+            for i, link in enumerate(links)
+        ]
+        with self._lock:
+            for link, value in scored:
+                if value > self._scores.get(link, -1.0):
+                    self._scores[link] = value
+
+    def priority(self, url):
+        """Meilleur score observé pour un lien"""
+        with self._lock:
+            value = self._scores.get(url)
+        return self.score(url) if value is None else value
+
+    def discard(self, url):
+        """Oublie le score d'un lien sorti de file (ou jamais mis en file)"""
+        with self._lock:
+            self._scores.pop(url, None)
@@ -0,0 +1,218 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import os
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from config.settings import CRAWL_STATE_DIR, FRONTIER_CAPACITY, FRONTIER_MAX_QUEUE
+
+logger = logging.getLogger(__name__)
+
+# Paramètres de suivi qui ne changent pas le contenu d'une page
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'yclid', 'msclkid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'ref', 'ref_src',
+}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalise une URL pour la déduplication.
+
+    Schéma et hôte en minuscules, port par défaut retiré, fragment supprimé,
+    paramètres de suivi retirés et paramètres restants triés. Le slash
+    final est conservé : /docs/ et /docs sont des pages différentes (les
+    liens relatifs de la première se résolvent sous /docs/).
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS
+        and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class BloomFilter:
+    """Filtre de Bloom à taille fixe (mémoire bornée quel que soit le volume)"""
+
+    def __init__(self, capacity=FRONTIER_CAPACITY, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        """Ajoute un élément, retourne False s'il était (probablement) déjà présent"""
+        added = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+
+class VisitedStore(BloomFilter):
+    """Ensemble des URLs déjà visitées d'une source, persisté sur disque"""
+
+    def __init__(self, path, capacity=FRONTIER_CAPACITY, error_rate=0.01):
+        super().__init__(capacity, error_rate)
+        self.path = path
+        self._load()
+
+    @classmethod
+    def for_source(cls, source_id, directory=CRAWL_STATE_DIR):
+        """Ouvre (ou crée) l'ensemble des URLs visitées d'une source"""
+        return cls(os.path.join(directory, f"{source_id}.visited"))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.readline().decode('ascii').split()
+                bits = f.read()
+            num_bits, num_hashes, count = (int(x) for x in header)
+            if num_bits != self.num_bits or len(bits) != len(self.bits):
+                logger.warning(f"Fichier visited incompatible, ignoré: {self.path}")
+                return
+            self.num_hashes = num_hashes
+            self.count = count
+            self.bits = bytearray(bits)
+        except Exception as e:
+            logger.warning(f"Erreur lecture visited {self.path}: {e}")
+
+    def save(self):
+        """Écrit le filtre sur disque (écriture atomique)"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(f"{self.num_bits} {self.num_hashes} {self.count}\n".encode('ascii'))
+            f.write(self.bits)
+        os.replace(tmp_path, self.path)
+
+    def delete(self):
+        """Supprime le fichier de la source"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Frontier:
+    """File d'URLs à visiter, dédupliquée à l'insertion.
+
+    La déduplication se fait sur la forme canonique des URLs (ensemble
+    exact des URLs mises en file pendant ce crawl), mais c'est l'URL
+    d'origine qui est téléchargée.
+
+    L'ensemble persistant des URLs visitées lors des crawls précédents ne
+    filtre pas : il sert seulement à l'ordre de visite. Les URLs nouvelles
+    passent avant les URLs déjà connues, qui sont revisitées (requête
+    conditionnelle) pour trouver les pages ajoutées depuis le dernier crawl.
+
+    En mode best_first, pop() retourne l'URL de plus haute priorité (à
+    priorité égale, la plus anciennement découverte) au lieu de suivre
+    l'ordre de découverte. Une URL en attente retrouvée avec une meilleure
+    priorité remonte dans la file.
+    """
+
+    def __init__(self, visited=None, max_queue=FRONTIER_MAX_QUEUE, best_first=False):
+        self.best_first = best_first
+        self.queue = [] if best_first else deque()
+        # En largeur d'abord : URLs déjà visitées lors d'un crawl précédent
+        self.known = deque()
+        self.seen = set()
+        self.visited = visited
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._order = itertools.count()
+        # best_first : URL canonique en attente -> (déjà visitée, priorité)
+        self._pending = {}
+
+    def push(self, url, force=False, priority=0.0):
+        """Ajoute une URL si elle n'est pas déjà en file ; force la traite comme
+        nouvelle même si elle a été visitée lors d'un crawl précédent"""
+        key = canonicalize_url(url)
+        if key in self.seen:
+            entry = self._pending.get(key)
+            if entry and priority > entry[1]:
+                # L'ancienne entrée du tas devient obsolète, ignorée par pop()
+                self._pending[key] = (entry[0], priority)
+                heapq.heappush(self.queue, (entry[0], -priority, next(self._order), url))
+            return False
+        if len(self) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self.seen.add(key)
+        known = not force and self.visited is not None and key in self.visited
+        if self.best_first:
+            self._pending[key] = (known, priority)
+            heapq.heappush(self.queue, (known, -priority, next(self._order), url))
+        elif known:
+            self.known.append(url)
+        else:
+            self.queue.append(url)
+        return True
+
+    def pop(self):
+        """Retire la prochaine URL à visiter"""
+        if self.best_first:
+            while True:
+                known, priority, _, url = heapq.heappop(self.queue)
+                key = canonicalize_url(url)
+                if self._pending.get(key) == (known, -priority):
+                    del self._pending[key]
+                    return url
+        if self.queue:
+            return self.queue.popleft()
+        return self.known.popleft()
+
+    def mark_visited(self, url):
+        """Enregistre une URL effectivement obtenue dans l'historique persistant"""
+        if self.visited is not None:
+            self.visited.add(canonicalize_url(url))
+
+    def queued(self, url):
+        """Vrai si l'URL attend encore en file (mode best_first)"""
+        return canonicalize_url(url) in self._pending
+
+    def __len__(self):
+        if self.best_first:
+            return len(self._pending)
+        return len(self.queue) + len(self.known)
+
+    def __bool__(self):
+        return len(self) > 0
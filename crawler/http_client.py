@@ -0,0 +1,461 @@
+"""Client HTTP partagé par tous les crawls d'un WebCrawler.
+
+Une seule session requests, créée une fois : les connexions keep-alive et
+les résolutions DNS sont réutilisées d'un crawl_source à l'autre. La taille
+des pools est réglable globalement et par hôte, et les connexions du client
+résolvent les noms via un cache DNS borné, avec un TTL (le reste du
+processus n'est pas concerné). HTTP/2 est disponible sur option
+(HTTP2_ENABLED) si httpx et h2 sont installés.
+
+stats() donne par hôte le nombre de requêtes, de connexions ouvertes, le
+taux de réutilisation et le temps d'établissement des connexions
+(TCP + TLS).
+"""
+import logging
+import os
+import socket
+import ssl
+import threading
+import time
+from collections import defaultdict, OrderedDict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import (
+    ConnectTimeoutError, MaxRetryError, NameResolutionError, NewConnectionError
+)
+from urllib3.response import HTTPResponse
+from urllib3.util.connection import allowed_gai_family
+
+from config.settings import (
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_HOST_POOLS, DNS_CACHE_TTL, DNS_CACHE_SIZE,
+    HTTP2_ENABLED
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    import h2  # noqa: F401  (requis par httpx pour HTTP/2)
+except ImportError:
+    httpx = None
+
+
+class DNSCache:
+    """Cache des résolutions getaddrinfo des connexions d'un HttpClient
+
+    Au plus max_entries résolutions, les moins récemment utilisées sont
+    évincées en premier ; une résolution expirée (ttl) est refaite.
+    """
+
+    def __init__(self, ttl=DNS_CACHE_TTL, max_entries=DNS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.lookup_time = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        start = time.perf_counter()
+        result = socket.getaddrinfo(host, port, family, type, proto, flags)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+            self.lookup_time += elapsed
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'lookup_avg_ms': self.lookup_time / self.misses * 1000 if self.misses else 0.0,
+            }
+
+
+def parse_host_pools(value):
+    """'example.com=20,autre.fr=5' -> {'example.com': 20, 'autre.fr': 5}"""
+    pools = {}
+    for item in (value or '').split(','):
+        host, _, size = item.strip().partition('=')
+        if host and size:
+            pools[host.strip()] = int(size)
+    return pools
+
+
+class ConnectionMetrics:
+    """Compteurs par hôte : requêtes, connexions ouvertes, temps d'établissement"""
+
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self.connections = defaultdict(int)
+        self.handshake_time = defaultdict(float)
+        self.http2 = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def request(self, host, http2=False):
+        with self._lock:
+            self.requests[host] += 1
+            if http2:
+                self.http2[host] += 1
+
+    def connected(self, host, elapsed):
+        with self._lock:
+            self.connections[host] += 1
+            self.handshake_time[host] += elapsed
+
+    def stats(self):
+        with self._lock:
+            hosts = {}
+            for host, count in self.requests.items():
+                connections = self.connections.get(host, 0)
+                hosts[host] = {
+                    'requests': count,
+                    'connections': connections,
+                    'reused': max(0, count - connections),
+                    'reuse_rate': max(0, count - connections) / count,
+                    'handshake_avg_ms': (self.handshake_time[host] / connections * 1000
+                                         if connections else 0.0),
+                    'http2': self.http2.get(host, 0),
+                }
+            return hosts
+
+
+def _connect_cached(conn, connect, dns):
+    """Ouvre le socket d'une connexion urllib3 en résolvant son hôte via dns
+
+    Chaque adresse est essayée à son tour ; TLS (SNI, vérification du
+    certificat) continue d'utiliser le nom d'hôte.
+    """
+    host = conn._dns_host
+    try:
+        addresses = dns.getaddrinfo(host, conn.port, allowed_gai_family(), socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise NameResolutionError(conn.host, conn, e) from e
+    ips = list(dict.fromkeys(address[4][0] for address in addresses))
+    if not ips:
+        raise NameResolutionError(conn.host, conn, socket.gaierror("aucune adresse"))
+    try:
+        for i, ip in enumerate(ips):
+            conn._dns_host = ip
+            try:
+                return connect()
+            except (ConnectTimeoutError, NewConnectionError):
+                if i == len(ips) - 1:
+                    raise
+    finally:
+        conn._dns_host = host
+
+
+def _pool_classes(metrics, dns=None):
+    """Pools urllib3 dont les connexions mesurent leur établissement et
+    résolvent les noms via dns (DNSCache optionnel)"""
+
+    class TimedHTTPConnection(HTTPConnection):
+        def _new_conn(self):
+            if dns is None:
+                return super()._new_conn()
+            return _connect_cached(self, super()._new_conn, dns)
+
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            metrics.connected(self.host, time.perf_counter() - start)
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def _new_conn(self):
+            if dns is None:
+                return super()._new_conn()
+            return _connect_cached(self, super()._new_conn, dns)
+
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            metrics.connected(self.host, time.perf_counter() - start)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+
+class MeteredAdapter(HTTPAdapter):
+    """HTTPAdapter qui compte les requêtes, mesure les connexions et résout
+    les noms via le cache DNS du client"""
+
+    def __init__(self, metrics, dns=None, **kwargs):
+        self.metrics = metrics
+        self.dns = dns
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _pool_classes(self.metrics, self.dns)
+
+    def send(self, request, **kwargs):
+        self.metrics.request(urlparse(request.url).hostname)
+        return super().send(request, **kwargs)
+
+
+def _requests_error(error, request):
+    """Exception requests équivalente à une exception httpx"""
+    if isinstance(error, httpx.ConnectTimeout):
+        cls = requests.exceptions.ConnectTimeout
+    elif isinstance(error, httpx.TimeoutException):
+        cls = requests.exceptions.ReadTimeout
+    elif isinstance(error, httpx.ProxyError):
+        cls = requests.exceptions.ProxyError
+    elif isinstance(error, httpx.ConnectError) and isinstance(error.__context__, ssl.SSLError):
+        cls = requests.exceptions.SSLError
+    elif isinstance(error, (httpx.TransportError, httpx.StreamError)):
+        cls = requests.exceptions.ConnectionError
+    else:
+        return error
+    return cls(error, request=request)
+
+
+class _HttpxRaw:
+    """Corps d'une réponse httpx vu comme le `raw` d'une réponse requests"""
+
+    def __init__(self, response, request=None):
+        self._response = response
+        self._request = request
+        self._chunks = None
+        self._buffer = b''
+
+    def stream(self, chunk_size, decode_content=True):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise _requests_error(e, self._request) from e
+
+    def read(self, amt=None):
+        try:
+            if amt is None:
+                return self._response.read()
+            # Lecture partielle (lecteurs en streaming comme iterparse)
+            if self._chunks is None:
+                self._chunks = self._response.iter_bytes()
+            while len(self._buffer) < amt:
+                chunk = next(self._chunks, b'')
+                if not chunk:
+                    break
+                self._buffer += chunk
+        except httpx.HTTPError as e:
+            raise _requests_error(e, self._request) from e
+        data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+
+def _ssl_context(verify, cert):
+    """Contexte TLS équivalent aux options verify / cert de requests"""
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    else:
+        path = verify if isinstance(verify, str) else requests.utils.DEFAULT_CA_BUNDLE_PATH
+        if os.path.isdir(path):
+            context = ssl.create_default_context(capath=path)
+        else:
+            context = ssl.create_default_context(cafile=path)
+    if cert:
+        if isinstance(cert, (tuple, list)):
+            context.load_cert_chain(*cert)
+        else:
+            context.load_cert_chain(cert)
+    return context
+
+
+class Http2Adapter(HTTPAdapter):
+    """Adapter requests qui passe par httpx en HTTP/2 (repli HTTP/1.1 négocié)
+
+    Comme HTTPAdapter : verify, cert et proxies sont respectés (un client
+    httpx par combinaison), les erreurs httpx deviennent des exceptions
+    requests et max_retries réessaie les statuts de son status_forcelist.
+    Les erreurs de connexion sont réessayées par le transport httpx.
+    """
+
+    def __init__(self, metrics, pool_maxsize=HTTP_POOL_MAXSIZE, **kwargs):
+        self.metrics = metrics
+        self.pool_maxsize = pool_maxsize
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def _client(self, verify, cert, proxy):
+        key = (verify, tuple(cert) if isinstance(cert, list) else cert, proxy)
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                limits = httpx.Limits(max_connections=None,
+                                      max_keepalive_connections=self.pool_maxsize)
+                # Proxies de l'environnement déjà fusionnés par la session requests
+                client = httpx.Client(
+                    transport=httpx.HTTPTransport(
+                        verify=_ssl_context(verify, cert), http2=True, retries=3,
+                        limits=limits, proxy=proxy, trust_env=False,
+                    ),
+                    follow_redirects=False,
+                    trust_env=False,
+                )
+                self._clients[key] = client
+            return client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        parsed = urlparse(request.url)
+        host = parsed.hostname
+        established = ('connection.start_tls.complete' if parsed.scheme == 'https'
+                       else 'connection.connect_tcp.complete')
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        elif timeout is None:
+            timeout = httpx.USE_CLIENT_DEFAULT
+        client = self._client(verify, cert, requests.utils.select_proxy(request.url, proxies))
+        retries = self.max_retries
+        started = []
+
+        def trace(event, info):
+            # Nouvelle connexion : TCP puis TLS (aucun événement en cas de réutilisation)
+            if event == 'connection.connect_tcp.started':
+                started.append(time.perf_counter())
+            elif event == established and started:
+                self.metrics.connected(host, time.perf_counter() - started[-1])
+
+        while True:
+            try:
+                upstream = client.send(
+                    client.build_request(
+                        request.method, request.url, headers=dict(request.headers),
+                        content=request.body, timeout=timeout, extensions={'trace': trace}
+                    ),
+                    stream=True,
+                )
+            except httpx.HTTPError as e:
+                raise _requests_error(e, request) from e
+            self.metrics.request(host, http2=upstream.http_version == 'HTTP/2')
+
+            # Nouvelle tentative sur les statuts de status_forcelist, comme urllib3
+            has_retry_after = 'Retry-After' in upstream.headers
+            if not retries.is_retry(request.method, upstream.status_code, has_retry_after):
+                break
+            status = HTTPResponse(body=b'', headers=dict(upstream.headers),
+                                  status=upstream.status_code, preload_content=False)
+            try:
+                retries = retries.increment(request.method, request.url, response=status)
+            except MaxRetryError as e:
+                if retries.raise_on_status:
+                    upstream.close()
+                    raise requests.exceptions.RetryError(e, request=request) from e
+                break
+            upstream.close()
+            retries.sleep(status)
+
+        response = requests.Response()
+        response.status_code = upstream.status_code
+        response.reason = upstream.reason_phrase
+        response.headers = CaseInsensitiveDict(upstream.headers)
+        response.url = str(upstream.url)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = _HttpxRaw(upstream, request)
+        response.request = request
+        response.connection = self
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        with self._clients_lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+        super().close()
+
+
+class HttpClient:
+    """Session HTTP longue durée, partagée par les crawls et leurs threads
+
+    throttle_retries : laisser urllib3 réessayer les 429 / 503 (en
+    respectant Retry-After) ; à désactiver quand un contrôleur de débit
+    (crawler.politeness) traite lui-même ces réponses.
+    """
+
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS,
+                 pool_maxsize=HTTP_POOL_MAXSIZE, host_pools=None,
+                 dns_ttl=DNS_CACHE_TTL, http2=HTTP2_ENABLED, throttle_retries=True):
+        self.metrics = ConnectionMetrics()
+        self.throttle_retries = throttle_retries
+        self.dns = DNSCache(dns_ttl) if dns_ttl > 0 else None
+        self.http2 = bool(http2 and httpx is not None)
+        if http2 and httpx is None:
+            logger.info("HTTP/2 indisponible (httpx[http2] non installé), HTTP/1.1 utilisé")
+
+        self.session = requests.Session()
+        self._mount('', pool_connections, pool_maxsize)
+        for host, size in (parse_host_pools(HTTP_HOST_POOLS) if host_pools is None
+                           else host_pools).items():
+            self._mount(host, 1, size)
+
+    def _retry(self):
+        if self.throttle_retries:
+            return Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                         respect_retry_after_header=True)
+        return Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 504],
+                     respect_retry_after_header=False)
+
+    def _mount(self, host, pool_connections, pool_maxsize):
+        http = MeteredAdapter(self.metrics, dns=self.dns, max_retries=self._retry(),
+                              pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        https = http
+        if self.http2:
+            https = Http2Adapter(self.metrics, pool_maxsize=pool_maxsize,
+                                 max_retries=self._retry())
+        # Préfixe terminé par / : le pool de example.com ne sert pas example.com.evil.com
+        suffix = f"{host}/" if host else ''
+        self.session.mount(f"http://{suffix}", http)
+        self.session.mount(f"https://{suffix}", https)
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def stats(self):
+        """Métriques par hôte et du cache DNS"""
+        return {
+            'hosts': self.metrics.stats(),
+            'dns': self.dns.stats() if self.dns else {},
+        }
+
+    def close(self):
+        self.session.close()
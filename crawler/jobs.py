@@ -0,0 +1,132 @@
+import logging
+from datetime import datetime, timedelta
+
+import pymongo
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config.settings import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """File de jobs de crawl partagée entre processus via MongoDB.
+
+    Un worker prend un job par find_one_and_update atomique et obtient un
+    bail (lease) qu'il prolonge par des heartbeats. Un job dont le bail a
+    expiré (worker planté) redevient disponible pour un autre worker.
+
+    Les jobs en attente ou en cours portent active: True ; un index unique
+    partiel sur ce champ garantit au plus un tel job par source, même si
+    deux planificateurs l'ajoutent en même temps.
+    """
+
+    def __init__(self, db, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.jobs = db['jobs']
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self.jobs.create_index([('status', pymongo.ASCENDING), ('run_at', pymongo.ASCENDING)])
+        self.jobs.create_index([('status', pymongo.ASCENDING), ('lease_expires', pymongo.ASCENDING)])
+        self.jobs.create_index('source_id')
+        self.jobs.create_index('source_id', name='active_source_id', unique=True,
+                               partialFilterExpression={'active': True})
+
+    def enqueue(self, source_id, run_at=None):
+        """Ajoute un job pour une source, sauf si un job est déjà en attente ou en cours"""
+        now = datetime.now()
+        try:
+            result = self.jobs.update_one(
+                {'source_id': source_id, 'status': {'$in': ['queued', 'leased']}},
+                {'$setOnInsert': {
+                    'source_id': source_id,
+                    'status': 'queued',
+                    'active': True,
+                    'run_at': run_at or now,
+                    'attempts': 0,
+                    'created_at': now,
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Job inséré entre-temps par un autre processus
+            return False
+        return result.upserted_id is not None
+
+    def lease(self, worker_id):
+        """Prend atomiquement le prochain job échu (ou abandonné par un worker)"""
+        while True:
+            job = self._lease_one(worker_id)
+            if job is None or job['attempts'] <= self.max_attempts:
+                return job
+            # Job repris trop de fois (il fait planter les workers) : abandon
+            self.jobs.update_one(
+                {'_id': job['_id'], 'worker': worker_id},
+                {'$set': {'status': 'failed', 'error': 'lease expired too many times'},
+                 '$unset': {'active': ''}}
+            )
+            logger.warning(f"Job abandonné après {job['attempts'] - 1} tentatives: {job['source_id']}")
+
+    def _lease_one(self, worker_id):
+        now = datetime.now()
+        return self.jobs.find_one_and_update(
+            {'$or': [
+                {'status': 'queued', 'run_at': {'$lte': now}},
+                {'status': 'leased', 'lease_expires': {'$lt': now}},
+            ]},
+            {
+                '$set': {
+                    'status': 'leased',
+                    'worker': worker_id,
+                    'leased_at': now,
+                    'lease_expires': now + timedelta(seconds=self.lease_seconds),
+                },
+                '$inc': {'attempts': 1},
+            },
+            sort=[('run_at', pymongo.ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def heartbeat(self, job_id, worker_id):
+        """Prolonge le bail ; retourne False si le job a été repris par un autre worker"""
+        now = datetime.now()
+        result = self.jobs.update_one(
+            {'_id': job_id, 'worker': worker_id, 'status': 'leased'},
+            {'$set': {
+                'heartbeat_at': now,
+                'lease_expires': now + timedelta(seconds=self.lease_seconds),
+            }}
+        )
+        return result.modified_count == 1
+
+    def complete(self, job_id, worker_id, result=None):
+        """Marque un job terminé (seulement si le worker détient encore le bail)"""
+        outcome = self.jobs.update_one(
+            {'_id': job_id, 'worker': worker_id, 'status': 'leased'},
+            {'$set': {'status': 'done', 'result': result, 'finished_at': datetime.now()},
+             '$unset': {'active': ''}}
+        )
+        return outcome.modified_count == 1
+
+    def fail(self, job_id, worker_id, error):
+        """Remet un job en file avec backoff, ou l'abandonne après max_attempts"""
+        job = self.jobs.find_one({'_id': job_id, 'worker': worker_id, 'status': 'leased'})
+        if not job:
+            return False
+        update = {'$set': {'error': str(error), 'finished_at': datetime.now()}}
+        if job.get('attempts', 0) < self.max_attempts:
+            update['$set']['status'] = 'queued'
+            update['$set']['run_at'] = datetime.now() + timedelta(seconds=30 * 2 ** job.get('attempts', 0))
+        else:
+            update['$set']['status'] = 'failed'
+            update['$unset'] = {'active': ''}
+        self.jobs.update_one({'_id': job_id, 'worker': worker_id}, update)
+        return True
+
+    def counts(self):
+        """Nombre de jobs par statut"""
+        return {
+            row['_id']: row['count']
+            for row in self.jobs.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+        }
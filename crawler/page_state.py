@@ -0,0 +1,99 @@
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+
+def content_hash(data):
+    """Empreinte du contenu extrait d'une page (titre + texte)"""
+    text = f"{data.get('title', '')}\n{data.get('content', '')}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class CrawlStats(Counter):
+    """Compteurs d'un crawl, incrémentables depuis plusieurs threads"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def incr(self, key, n=1):
+        with self._lock:
+            self[key] += n
+
+
+class PageStateStore:
+    """État de la dernière visite de chaque URL d'une source.
+
+    Conserve ETag, Last-Modified, les empreintes du corps et du contenu et
+    les liens sortants, pour envoyer des requêtes conditionnelles lors des
+    recrawls, ne pas reparser un corps identique et continuer l'exploration
+    quand une page n'a pas changé.
+
+    En mode deferred, les mises à jour sont mises en attente et écrites en
+    un seul bulk_write par commit() ; discard() abandonne celles d'une page
+    dont le traitement a échoué, pour qu'elle soit retéléchargée et
+    retraitée au prochain passage.
+    """
+
+    def __init__(self, collection, source_id=None, deferred=False):
+        self.collection = collection
+        self.source_id = source_id
+        self.deferred = deferred
+        self.pending = []
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        return self.collection.find_one({'source_id': self.source_id, 'url': url})
+
+    def conditional_headers(self, state):
+        """En-têtes If-None-Match / If-Modified-Since pour un état connu"""
+        headers = {}
+        if state:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    def record(self, url, headers=None, hash_value=None, links=None, changed=False,
+               body_hash=None):
+        """Met à jour l'état d'une URL après une visite"""
+        now = datetime.now()
+        update = {'last_fetched': now}
+        if headers is not None:
+            update['etag'] = headers.get('ETag')
+            update['last_modified'] = headers.get('Last-Modified')
+        if hash_value is not None:
+            update['content_hash'] = hash_value
+        if body_hash is not None:
+            update['body_hash'] = body_hash
+        if links is not None:
+            update['links'] = links
+        if changed:
+            update['last_changed'] = now
+
+        operation = UpdateOne(
+            {'source_id': self.source_id, 'url': url},
+            {'$set': update},
+            upsert=True
+        )
+        if not self.deferred:
+            self.collection.bulk_write([operation])
+            return
+        with self._lock:
+            self.pending.append((url, operation))
+
+    def discard(self, url):
+        """Abandonne les mises à jour en attente d'une URL"""
+        with self._lock:
+            self.pending = [(u, operation) for u, operation in self.pending if u != url]
+
+    def commit(self):
+        """Écrit les mises à jour en attente"""
+        with self._lock:
+            pending, self.pending = self.pending, []
+        if pending:
+            self.collection.bulk_write([operation for _, operation in pending], ordered=False)
@@ -0,0 +1,217 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, CData, NavigableString, UnicodeDammit
+
+from config.settings import HTML_PARSER
+
+logger = logging.getLogger(__name__)
+
+# Backends optionnels, du plus rapide au plus lent
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+# Éléments de bloc : le texte de chacun forme un paragraphe, séparé des
+# autres par une ligne vide (le découpage en blocs et en morceaux s'y appuie)
+BLOCK_TAGS = frozenset({
+    'html', 'head', 'title', 'body', 'address', 'article', 'aside', 'blockquote',
+    'caption', 'dd', 'details', 'dialog', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'tr', 'ul',
+})
+
+
+@dataclass
+class ParsedPage:
+    """Champs extraits d'une page HTML en une seule passe"""
+    title: str
+    text: str
+    keywords: List[str] = field(default_factory=list)
+    links: List[str] = field(default_factory=list)
+    # Texte d'ancre de chaque lien (même ordre que links)
+    anchors: List[str] = field(default_factory=list)
+
+
+def _join_paragraphs(strings):
+    """Texte d'une page à partir de ses chaînes (texte, bloc parent)
+
+    Comme BeautifulSoup.get_text(separator=' ', strip=True), mais les
+    chaînes de deux blocs différents sont séparées par une ligne vide.
+    """
+    paragraphs, current, owner = [], [], None
+    for text, block in strings:
+        text = (text or '').strip()
+        if not text:
+            continue
+        if current and block != owner:
+            paragraphs.append(' '.join(current))
+            current = []
+        current.append(text)
+        owner = block
+    if current:
+        paragraphs.append(' '.join(current))
+    return '\n\n'.join(paragraphs)
+
+
+def _split_keywords(content):
+    if not content:
+        return []
+    return [k.strip() for k in content.split(',')]
+
+
+def _anchor(raw):
+    return ' '.join((raw or '').split())
+
+
+def _title(raw):
+    title = ' '.join((raw or '').split())
+    return title or 'Sans titre'
+
+
+def _decode(content):
+    """Décode le HTML comme le fait BeautifulSoup (meta charset, BOM, détection)"""
+    if isinstance(content, str):
+        return content
+    markup = UnicodeDammit(content, is_html=True).unicode_markup or ''
+    return XML_DECLARATION.sub('', markup, count=1)
+
+
+def _parse_soup(content, base_url, features):
+    soup = BeautifulSoup(content, features)
+
+    # Contenu de template inerte (ni texte ni liens), comme pour les autres backends
+    for script in soup(['script', 'style', 'template']):
+        script.decompose()
+
+    keywords = []
+    meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+    if meta_keywords:
+        keywords = _split_keywords(meta_keywords.get('content'))
+
+    anchors = soup.find_all('a', href=True)
+    return ParsedPage(
+        title=_title(soup.title.get_text() if soup.title else ''),
+        text=_join_paragraphs(_soup_strings(soup)),
+        keywords=keywords,
+        links=[urljoin(base_url, a['href']) for a in anchors],
+        anchors=[_anchor(a.get_text(' ')) for a in anchors],
+    )
+
+
+def _soup_strings(soup):
+    for string in soup.descendants:
+        # Mêmes chaînes que get_text : ni commentaires, ni doctype, ni instructions
+        if type(string) not in (NavigableString, CData):
+            continue
+        block = string.parent
+        while block.parent is not None and block.name not in BLOCK_TAGS:
+            block = block.parent
+        yield string, id(block)
+
+
+def _parse_html_parser(content, base_url):
+    return _parse_soup(content, base_url, 'html.parser')
+
+
+def _parse_lxml(content, base_url):
+    tree = lxml.html.fromstring(_decode(content) or '<html></html>')
+    for node in tree.xpath('//script|//style|//template'):
+        node.drop_tree()
+
+    title = tree.find('.//title')
+    meta = tree.xpath('//meta[@name="keywords"]')
+
+    anchors = [a for a in tree.iter('a') if a.get('href') is not None]
+    return ParsedPage(
+        title=_title(title.text_content() if title is not None else ''),
+        text=_join_paragraphs(_lxml_strings(tree)),
+        keywords=_split_keywords(meta[0].get('content')) if meta else [],
+        links=[urljoin(base_url, a.get('href')) for a in anchors],
+        anchors=[_anchor(' '.join(a.itertext())) for a in anchors],
+    )
+
+
+def _lxml_strings(tree):
+    blocks = [tree]
+    for event, node in lxml.etree.iterwalk(tree, events=('start', 'end', 'comment', 'pi')):
+        if event == 'start':
+            if node.tag in BLOCK_TAGS:
+                blocks.append(node)
+            yield node.text, blocks[-1]
+            continue
+        if event == 'end' and node.tag in BLOCK_TAGS and len(blocks) > 1:
+            blocks.pop()
+        # Texte qui suit l'élément (ou le commentaire), dans le bloc parent
+        yield node.tail, blocks[-1]
+
+
+def _parse_selectolax(content, base_url):
+    tree = LexborHTMLParser(_decode(content))
+    for node in tree.css('script, style, template'):
+        node.decompose()
+
+    root = tree.root
+    texts = []
+    if root is not None:
+        texts = [(n.text_content, _selectolax_block(n))
+                 for n in root.traverse(include_text=True) if n.tag == '-text']
+
+    title = tree.css_first('title')
+    meta = tree.css_first('meta[name="keywords"]')
+
+    anchors = [a for a in tree.css('a[href]') if a.attributes.get('href') is not None]
+    return ParsedPage(
+        title=_title(title.text() if title is not None else ''),
+        text=_join_paragraphs(texts),
+        keywords=_split_keywords(meta.attributes.get('content')) if meta is not None else [],
+        links=[urljoin(base_url, a.attributes['href']) for a in anchors],
+        anchors=[_anchor(a.text(deep=True, separator=' ')) for a in anchors],
+    )
+
+
+def _selectolax_block(node):
+    block = node.parent
+    while block.parent is not None and block.tag not in BLOCK_TAGS:
+        block = block.parent
+    return block.mem_id
+
+
+BACKENDS = {
+    'selectolax': (_parse_selectolax, lambda: LexborHTMLParser is not None),
+    'lxml': (_parse_lxml, lambda: lxml is not None),
+    'html.parser': (_parse_html_parser, lambda: True),
+}
+
+
+def available_backends():
+    """Liste des backends installés, du plus rapide au plus lent"""
+    return [name for name, (_, available) in BACKENDS.items() if available()]
+
+
+def get_backend(name=None):
+    """Retourne le nom du backend à utiliser ('auto' = le plus rapide installé)"""
+    name = name or HTML_PARSER
+    if name == 'auto':
+        return available_backends()[0]
+    if name not in BACKENDS or not BACKENDS[name][1]():
+        logger.warning(f"Parser HTML '{name}' indisponible, repli sur html.parser")
+        return 'html.parser'
+    return name
+
+
+def parse_html(content, base_url='', backend=None) -> ParsedPage:
+    """Parse une page une seule fois : titre, texte, mots-clés meta et liens"""
+    return BACKENDS[get_backend(backend)][0](content, base_url)
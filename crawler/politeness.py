@@ -0,0 +1,304 @@
+"""Politesse du crawl : débit adaptatif par hôte et cache des robots.txt.
+
+Chaque hôte a un token bucket dont le débit suit un schéma AIMD, comme
+le contrôle de congestion TCP : démarrage rapide (débit multiplié à
+chaque réponse rapide) jusqu'au premier signal de saturation, puis
+augmentation additive ; diminution quand la latence monte et division
+par deux sur 429 / 503, avec une pause jusqu'à Retry-After. Le Crawl-delay
+du robots.txt plafonne le débit de l'hôte.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from config.settings import (
+    POLITE_INITIAL_RATE, POLITE_MIN_RATE, POLITE_MAX_RATE, POLITE_BURST,
+    POLITE_LATENCY_FACTOR, POLITE_MAX_WAIT, ROBOTS_TTL, ROBOTS_USER_AGENT
+)
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def retry_after_seconds(value):
+    """Valeur d'un en-tête Retry-After (secondes ou date HTTP) en secondes"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - datetime.now().timestamp())
+
+
+class HostRateLimiter:
+    """Token bucket adaptatif d'un hôte"""
+
+    def __init__(self, rate=POLITE_INITIAL_RATE, min_rate=POLITE_MIN_RATE,
+                 max_rate=POLITE_MAX_RATE, burst=POLITE_BURST,
+                 latency_factor=POLITE_LATENCY_FACTOR):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.latency_factor = latency_factor
+        self.step = max(0.05, rate / 10)
+        self.slow_start = True   # croissance multiplicative jusqu'au premier signal
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_cut = 0.0      # dernière division du débit
+        self.latency = None      # moyenne mobile (s)
+        self.baseline = None     # meilleure latence moyenne observée
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Réserve un jeton ; retourne l'attente nécessaire (secondes)
+
+        Pendant une pause (Retry-After), les jetons ne s'accumulent pas :
+        les requêtes en attente repartent espacées à la fin de la pause.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now > self.updated:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(0.0, self.updated - now) + wait
+
+    def paused(self):
+        return time.monotonic() < self.blocked_until
+
+    def cancel(self):
+        """Rend un jeton réservé mais non utilisé"""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def limit(self, max_rate):
+        """Plafonne le débit (Crawl-delay)"""
+        with self._lock:
+            self.max_rate = max(self.min_rate, min(self.max_rate, max_rate))
+            self.rate = min(self.rate, self.max_rate)
+
+    def success(self, latency):
+        with self._lock:
+            self.requests += 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.baseline = self.latency if self.baseline is None else min(self.baseline, self.latency)
+            if self.latency > self.latency_factor * self.baseline and self.latency > 0.05:
+                # Le serveur ralentit : on réduit la pression
+                self.slow_start = False
+                self.rate = max(self.min_rate, self.rate * 0.9)
+            elif self.slow_start:
+                self.rate = min(self.max_rate, self.rate * 1.2)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.step)
+
+    def throttle(self, retry_after=None, sent_at=None):
+        """429 / 503 : débit divisé par deux, pause jusqu'à Retry-After
+
+        Les requêtes déjà en vol lors de la dernière division (sent_at
+        antérieur) ne divisent pas le débit une seconde fois.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.requests += 1
+            self.throttled += 1
+            self.slow_start = False
+            if sent_at is None or sent_at >= self.last_cut:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.last_cut = now
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            if now + pause > self.blocked_until:
+                self.blocked_until = now + pause
+                # Une seule requête à la reprise, les suivantes au nouveau débit
+                self.updated = max(self.updated, self.blocked_until)
+                self.tokens = 1.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'max_rate': self.max_rate,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'latency_ms': (self.latency or 0.0) * 1000,
+                'blocked_for': max(0.0, self.blocked_until - time.monotonic()),
+            }
+
+
+def parse_crawl_delay(lines, user_agent):
+    """Crawl-delay du groupe de user_agent (ou de *), décimales acceptées
+
+    urllib.robotparser n'accepte que des délais entiers.
+    """
+    delays = {}
+    agents, in_rules = [], False
+    for line in lines:
+        field, _, value = line.split('#', 1)[0].partition(':')
+        field, value = field.strip().lower(), value.strip()
+        if field == 'user-agent':
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value.lower())
+        elif field:
+            in_rules = True
+            if field == 'crawl-delay':
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    delays.setdefault(agent, delay)
+    token = user_agent.lower()
+    for agent, delay in delays.items():
+        if agent != '*' and agent in token:
+            return delay
+    return delays.get('*')
+
+
+class RobotsCache:
+    """robots.txt par hôte, mis en cache avec un TTL
+
+    404 et autres 4xx : tout est autorisé ; 5xx ou hôte injoignable : tout
+    est interdit jusqu'à la prochaine tentative (RFC 9309), avec un TTL
+    court pour réessayer rapidement.
+    """
+
+    def __init__(self, session, headers=None, ttl=ROBOTS_TTL, user_agent=ROBOTS_USER_AGENT):
+        self.session = session
+        self.headers = headers or {}
+        self.ttl = ttl
+        self.user_agent = user_agent
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _host_lock(self, origin):
+        with self._lock:
+            return self._locks.setdefault(origin, threading.Lock())
+
+    def get(self, url):
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        entry = self._entries.get(origin)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        # Un seul téléchargement du robots.txt par hôte à la fois
+        with self._host_lock(origin):
+            entry = self._entries.get(origin)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            parser, delay, ttl = self._fetch(origin)
+            self._entries[origin] = (time.monotonic() + ttl, (parser, delay))
+            return parser, delay
+
+    def _fetch(self, origin):
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = self.session.get(parser.url, headers=self.headers, timeout=10)
+        except Exception as e:
+            logger.warning(f"robots.txt injoignable ({origin}): {e}")
+            parser.disallow_all = True
+            return parser, None, min(self.ttl, 60)
+        if response.status_code >= 500:
+            parser.disallow_all = True
+            return parser, None, min(self.ttl, 60)
+        delay = None
+        if response.status_code >= 400:
+            parser.allow_all = True
+        else:
+            lines = response.text.splitlines()
+            parser.parse(lines)
+            delay = parse_crawl_delay(lines, self.user_agent)
+            if delay is None:
+                rate = parser.request_rate(self.user_agent)
+                if rate is not None and rate.requests:
+                    delay = rate.seconds / rate.requests
+        parser.modified()
+        return parser, delay, self.ttl
+
+    def allowed(self, url):
+        return self.get(url)[0].can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """Délai entre deux requêtes demandé par le site (secondes, None sinon)"""
+        return self.get(url)[1] or None
+
+
+class Politeness:
+    """Débit par hôte et robots.txt pour la boucle de crawl"""
+
+    def __init__(self, session, headers=None, robots=True, max_wait=POLITE_MAX_WAIT, **limits):
+        self.robots = RobotsCache(session, headers) if robots else None
+        self.max_wait = max_wait
+        self.limits = limits
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url):
+        host = urlparse(url).netloc
+        limiter = self._hosts.get(host)
+        if limiter is not None:
+            return limiter
+        # Crawl-delay lu hors du verrou (téléchargement du robots.txt)
+        delay = self.robots.crawl_delay(url) if self.robots else None
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = HostRateLimiter(**self.limits)
+                if delay:
+                    limiter.limit(1 / delay)
+            return limiter
+
+    def allowed(self, url):
+        """robots.txt autorise-t-il l'URL ?"""
+        return self.robots is None or self.robots.allowed(url)
+
+    def wait(self, url):
+        """Attend le créneau de l'hôte ; retourne l'attente (None si trop longue)"""
+        limiter = self.limiter(url)
+        waited = 0.0
+        while True:
+            delay = limiter.reserve()
+            if waited + delay > self.max_wait:
+                limiter.cancel()
+                return None
+            if delay > 0:
+                time.sleep(delay)
+            waited += delay
+            # Pause demandée par l'hôte pendant l'attente : nouveau créneau
+            if not limiter.paused():
+                return waited
+
+    def observe(self, url, status_code, headers, latency):
+        """Ajuste le débit de l'hôte d'après une réponse"""
+        limiter = self.limiter(url)
+        if status_code in THROTTLE_STATUSES:
+            retry_after = retry_after_seconds(headers.get('Retry-After'))
+            limiter.throttle(retry_after, sent_at=time.monotonic() - latency)
+            logger.info(f"Ralentissement demandé par {urlparse(url).netloc} ({status_code}), "
+                        f"débit {limiter.rate:.2f} req/s")
+        else:
+            limiter.success(latency)
+
+    def failed(self, url):
+        """Erreur réseau : traitée comme un ralentissement demandé"""
+        self.limiter(url).throttle()
+
+    def stats(self):
+        """Débit courant, requêtes, ralentissements et latence par hôte"""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: limiter.stats() for host, limiter in hosts.items()}
@@ -0,0 +1,117 @@
+import math
+from datetime import datetime
+
+from config.settings import (
+    RECRAWL_MIN_INTERVAL, RECRAWL_MAX_INTERVAL, RECRAWL_INITIAL_INTERVAL,
+    RECRAWL_TARGET_CHANGE, RECRAWL_DECAY
+)
+
+# Intervalles des fréquences fixes, utilisés comme point de départ
+FREQUENCY_INTERVALS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+}
+HISTORY_SIZE = 10
+
+
+class RecrawlPolicy:
+    """Intervalle de recrawl adaptatif d'une source.
+
+    Les changements d'une page sont vus comme un processus de Poisson de
+    taux λ. À chaque crawl on observe, parmi les pages déjà connues et
+    revisitées, combien ont changé depuis la visite précédente (intervalle
+    I). Estimateur de Cho & Garcia-Molina, qui tient compte des changements
+    multiples non observés entre deux visites :
+
+        λ = -ln((n - x + 0.5) / (n + 0.5)) / I
+
+    avec n pages revisitées et x pages modifiées, cumulées sur les crawls
+    précédents avec une décroissance exponentielle (decay). Le prochain
+    crawl est placé quand la part attendue de pages modifiées atteint
+    target : I = -ln(1 - target) / λ, borné par [min_interval, max_interval].
+
+    L'état (source['recrawl']) contient les cumuls, le taux estimé,
+    l'intervalle retenu, la raison de la décision et un historique court.
+    """
+
+    def __init__(self, min_interval=RECRAWL_MIN_INTERVAL, max_interval=RECRAWL_MAX_INTERVAL,
+                 initial_interval=RECRAWL_INITIAL_INTERVAL, target=RECRAWL_TARGET_CHANGE,
+                 decay=RECRAWL_DECAY):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.target = min(max(target, 0.01), 0.99)
+        self.decay = decay
+
+    def clamp(self, interval):
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def initial(self, frequency=None):
+        """Intervalle sans historique (celui de la fréquence fixe s'il y en a une)"""
+        return self.clamp(FREQUENCY_INTERVALS.get(frequency, self.initial_interval))
+
+    def estimate(self, revisits, changes, exposure):
+        """Taux de changement par seconde (None sans observation)"""
+        if revisits <= 0 or exposure <= 0:
+            return None
+        mean_interval = exposure / revisits
+        changes = min(changes, revisits)
+        return -math.log((revisits - changes + 0.5) / (revisits + 0.5)) / mean_interval
+
+    def interval_for(self, rate):
+        if not rate:
+            return self.max_interval
+        return self.clamp(-math.log(1 - self.target) / rate)
+
+    def update(self, state, revisited, changed, elapsed, frequency=None, now=None):
+        """Nouvel état après un crawl
+
+        revisited : pages déjà connues revisitées (304, inchangées ou
+        modifiées) ; changed : celles qui avaient changé ; elapsed : secondes
+        depuis le crawl précédent (None pour le premier crawl).
+        """
+        state = dict(state or {})
+        now = now or datetime.now()
+        revisits = state.get('revisits', 0.0) * self.decay
+        changes = state.get('changes', 0.0) * self.decay
+        exposure = state.get('exposure', 0.0) * self.decay
+        if elapsed and revisited:
+            revisits += revisited
+            changes += changed
+            exposure += revisited * elapsed
+
+        rate = self.estimate(revisits, changes, exposure)
+        if rate is None:
+            interval = self.initial(frequency)
+            reason = 'pas encore de pages revisitées'
+        else:
+            interval = self.interval_for(rate)
+            raw = -math.log(1 - self.target) / rate if rate else math.inf
+            if raw < self.min_interval:
+                reason = 'borné au minimum'
+            elif raw > self.max_interval:
+                reason = 'aucun changement observé' if not changes else 'borné au maximum'
+            else:
+                reason = f'{self.target:.0%} des pages modifiées attendues'
+
+        decision = {
+            'at': now,
+            'elapsed': elapsed,
+            'revisited': revisited,
+            'changed': changed,
+            'rate_per_day': (rate or 0.0) * 86400,
+            'interval': interval,
+        }
+        state.update({
+            'revisits': revisits,
+            'changes': changes,
+            'exposure': exposure,
+            'rate_per_day': decision['rate_per_day'],
+            'interval': interval,
+            'reason': reason,
+            'decided_at': now,
+            'history': (state.get('history', []) + [decision])[-HISTORY_SIZE:],
+        })
+        return state
@@ -0,0 +1,103 @@
+import unicodedata
+from collections import deque
+
+
+def normalize_text(text: str) -> str:
+    """Minuscules et sans accents, pour une comparaison insensible aux deux"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+class KeywordMatcher:
+    """Automate d'Aho-Corasick sur une liste de mots-clés.
+
+    Construit une fois par source, il compte toutes les occurrences de tous
+    les mots-clés en une seule passe sur le texte (temps linéaire, quel que
+    soit le nombre de mots-clés). Seuls les mots entiers sont comptés.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        seen = set()
+        for keyword in keywords or []:
+            normalized = ' '.join(normalize_text(keyword).split())
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                self._add(normalized, len(self.keywords))
+                self.keywords.append(keyword.strip())
+        self._build()
+
+    def _add(self, word, index):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append((index, len(word)))
+
+    def _build(self):
+        """Liens d'échec par parcours en largeur"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def count(self, text):
+        """Nombre d'occurrences (mots entiers) de chaque mot-clé présent"""
+        text = ' '.join(normalize_text(text).split())
+        goto, fail, output = self._goto, self._fail, self._output
+        counts = {}
+        node = 0
+        last = len(text) - 1
+
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for index, length in output[node]:
+                start = i - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if i < last and text[i + 1].isalnum():
+                    continue
+                keyword = self.keywords[index]
+                counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+
+class RelevanceFilter:
+    """Filtre de pertinence d'une source : score = occurrences des mots-clés"""
+
+    def __init__(self, keywords, min_score=1):
+        self.matcher = KeywordMatcher(keywords)
+        self.min_score = min_score
+
+    def __bool__(self):
+        return bool(self.matcher)
+
+    def evaluate(self, data):
+        """Annote une page (keyword_matches, relevance) ; retourne True si elle est retenue"""
+        counts = self.matcher.count(f"{data.get('title', '')}\n{data.get('content', '')}")
+        data['keyword_matches'] = [
+            {'keyword': keyword, 'count': count} for keyword, count in counts.items()
+        ]
+        data['relevance'] = sum(counts.values())
+        return data['relevance'] >= self.min_score
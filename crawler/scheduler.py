@@ -0,0 +1,235 @@
+import calendar
+import heapq
+import itertools
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from config.settings import SCHEDULER_WORKERS, SCHEDULER_REFRESH, RECRAWL_INITIAL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def _at_time(moment, schedule_time):
+    hour, minute = (int(x) for x in (schedule_time or '09:00').split(':'))
+    return moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def _add_months(moment, months):
+    month = moment.month - 1 + months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def next_run_time(frequency, schedule_time='09:00', last_run=None, now=None, interval=None):
+    """Prochaine exécution d'une source.
+
+    hourly : chaque heure à la minute de schedule_time ; daily / weekly /
+    monthly : à l'heure schedule_time, un jour / une semaine / un mois
+    calendaire après le dernier crawl. Sans dernier crawl, la première
+    occurrence à venir ; une échéance manquée est exécutée tout de suite.
+    adaptive : interval secondes après le dernier crawl (intervalle décidé
+    par RecrawlPolicy), tout de suite sans dernier crawl.
+    """
+    now = now or datetime.now()
+
+    if frequency == 'adaptive':
+        if last_run is None:
+            return now
+        return max(last_run + timedelta(seconds=interval or RECRAWL_INITIAL_INTERVAL), now)
+
+    if frequency == 'hourly':
+        minute = int((schedule_time or '00:00').split(':')[1])
+        candidate = (last_run or now).replace(minute=minute, second=0, microsecond=0)
+        while candidate <= (last_run or now):
+            candidate += timedelta(hours=1)
+        return max(candidate, now) if last_run else candidate
+
+    if last_run is None:
+        candidate = _at_time(now, schedule_time)
+        return candidate if candidate > now else candidate + timedelta(days=1)
+
+    base = _at_time(last_run, schedule_time)
+    if frequency == 'weekly':
+        candidate = base + timedelta(weeks=1)
+    elif frequency == 'monthly':
+        candidate = _add_months(base, 1)
+    else:
+        candidate = base + timedelta(days=1)
+    return max(candidate, now)
+
+
+class CrawlScheduler:
+    """Planificateur des crawls : file de priorité des prochaines exécutions.
+
+    Les crawls échus sont confiés à un pool de workers borné ; une source
+    n'est jamais crawlée deux fois en même temps. Les sources sont relues
+    périodiquement dans MongoDB pour prendre en compte ajouts, suppressions
+    et changements de fréquence (ou d'intervalle adaptatif) sans
+    redémarrage.
+
+    Avec une job_queue, les crawls échus sont mis en file pour des workers
+    (crawler.worker) au lieu d'être exécutés localement.
+    """
+
+    def __init__(self, crawler, max_workers=SCHEDULER_WORKERS,
+                 refresh_interval=SCHEDULER_REFRESH, job_queue=None):
+        self.crawler = crawler
+        self.job_queue = job_queue
+        self.refresh_interval = refresh_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.heap = []
+        self.entries = {}    # source_id -> (next_run, version, signature)
+        self.running = set()
+        self.lags = deque(maxlen=1000)
+        self._versions = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_refresh = None
+
+    def _signature(self, source):
+        return (source.get('frequency'), source.get('schedule_time'),
+                (source.get('recrawl') or {}).get('interval'))
+
+    def _next_run(self, source, last_run):
+        return next_run_time(
+            source.get('frequency'), source.get('schedule_time', '09:00'), last_run,
+            interval=(source.get('recrawl') or {}).get('interval')
+        )
+
+    def _push(self, source_id, next_run, signature):
+        version = next(self._versions)
+        self.entries[source_id] = (next_run, version, signature)
+        heapq.heappush(self.heap, (next_run, version, source_id))
+        self.crawler.sources_collection.update_one(
+            {'_id': self._object_id(source_id)},
+            {'$set': {'next_crawl': next_run}}
+        )
+
+    def _object_id(self, source_id):
+        from bson.objectid import ObjectId
+        return ObjectId(source_id)
+
+    def refresh(self):
+        """Synchronise la file avec les sources actives de la base"""
+        sources = {s['_id']: s for s in self.crawler.get_sources(enabled_only=True)}
+        with self._lock:
+            for source_id in list(self.entries):
+                if source_id not in sources:
+                    del self.entries[source_id]
+                    logger.info(f"Source retirée du planificateur: {source_id}")
+
+            for source_id, source in sources.items():
+                signature = self._signature(source)
+                entry = self.entries.get(source_id)
+                if entry and entry[2] == signature:
+                    continue
+                if source_id in self.running:
+                    continue
+                next_run = self._next_run(source, source.get('last_crawl'))
+                self._push(source_id, next_run, signature)
+                if not entry:
+                    logger.info(f"Source planifiée: {source['url']} → {next_run}")
+        self._last_refresh = datetime.now()
+
+    def _dispatch_due(self):
+        """Lance les crawls échus ; retourne le délai avant la prochaine échéance"""
+        now = datetime.now()
+        with self._lock:
+            while self.heap and self.heap[0][0] <= now:
+                scheduled_at, version, source_id = heapq.heappop(self.heap)
+                entry = self.entries.get(source_id)
+                # Entrée obsolète (source supprimée ou replanifiée)
+                if not entry or entry[1] != version:
+                    continue
+                if source_id in self.running:
+                    continue
+                self.running.add(source_id)
+                self.executor.submit(self._run, source_id, scheduled_at)
+            if not self.heap:
+                return None
+            return (self.heap[0][0] - now).total_seconds()
+
+    def _run(self, source_id, scheduled_at):
+        started = datetime.now()
+        lag = (started - scheduled_at).total_seconds()
+        self.lags.append(lag)
+        logger.info(f"Crawl planifié {source_id} démarré (retard {lag:.1f}s)")
+        failed = True
+        try:
+            self.crawler.sources_collection.update_one(
+                {'_id': self._object_id(source_id)},
+                {'$set': {'last_schedule_lag': lag}}
+            )
+            if self.job_queue is not None:
+                self.job_queue.enqueue(source_id, run_at=scheduled_at)
+                failed = False
+            else:
+                result = self.crawler.crawl_source(source_id)
+                failed = bool(result and result.get('error'))
+                if failed:
+                    logger.error(f"Échec crawl planifié {source_id}: {result['error']}")
+        except Exception as e:
+            logger.error(f"Erreur crawl planifié {source_id}: {e}")
+        finally:
+            source = self.crawler.sources_collection.find_one({'_id': self._object_id(source_id)})
+            # En mode file, last_crawl n'est mis à jour qu'à la fin du job ;
+            # après un échec, last_crawl n'a pas bougé : la prochaine tentative
+            # part du démarrage, sinon une échéance passée relancerait aussitôt
+            last_run = started
+            if self.job_queue is None and source and not failed:
+                last_run = source.get('last_crawl') or started
+            with self._lock:
+                self.running.discard(source_id)
+                if source and source.get('enabled') and source_id in self.entries:
+                    next_run = self._next_run(source, last_run)
+                    self._push(source_id, next_run, self._signature(source))
+            self._wakeup.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if (self._last_refresh is None or
+                    (datetime.now() - self._last_refresh).total_seconds() >= self.refresh_interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Erreur rafraîchissement des sources: {e}")
+
+            delay = self._dispatch_due()
+            timeout = self.refresh_interval if delay is None else min(delay, self.refresh_interval)
+            self._wakeup.wait(timeout=max(0.1, timeout))
+            self._wakeup.clear()
+
+    def start(self):
+        """Démarre le planificateur dans un thread de fond"""
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        logger.info("Planificateur démarré")
+
+    def stop(self, wait=False):
+        """Arrête le planificateur (les crawls en cours se terminent)"""
+        self._stop.set()
+        self._wakeup.set()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        logger.info("Planificateur arrêté")
+
+    def stats(self):
+        """Sources planifiées, crawls en cours et retard au démarrage (secondes)"""
+        with self._lock:
+            lags = sorted(self.lags)
+            upcoming = min((entry[0] for entry in self.entries.values()), default=None)
+            stats = {
+                'scheduled': len(self.entries),
+                'running': len(self.running),
+                'next_run': upcoming,
+                'lag_avg': sum(lags) / len(lags) if lags else 0.0,
+                'lag_p95': lags[int(0.95 * (len(lags) - 1))] if lags else 0.0,
+                'lag_max': lags[-1] if lags else 0.0,
+            }
+        return stats
@@ -0,0 +1,491 @@
+"""Index inversé BM25 sur crawled_data.
+
+L'index est une suite de segments immuables sur disque : un dictionnaire
+des termes et des documents (JSON, chargé en mémoire) et un fichier de
+postings binaire lu par mmap. Les pages ajoutées depuis le dernier commit
+restent dans un segment mémoire ; commit() l'écrit sur disque et fusionne
+les segments quand ils deviennent trop nombreux. Une page mise à jour est
+marquée supprimée dans son ancien segment (fichier .del) puis réindexée.
+
+Plusieurs processus (workers) peuvent écrire dans le même répertoire : les
+commits sont sérialisés par un fichier verrou et chaque processus relit le
+manifeste quand un autre l'a modifié.
+"""
+import base64
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import time
+import uuid
+from array import array
+from collections import Counter
+
+from config.settings import SEARCH_INDEX_DIR, SEARCH_MAX_SEGMENTS
+from crawler.relevance import normalize_text
+
+TOKEN = re.compile(r'\w+')
+
+STOPWORDS = frozenset("""
+a au aux avec ce ces cet cette dans de des du elle en et eux il ils je la le les leur leurs
+lui ma mais me meme mes moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses
+son sur ta te tes toi ton tu un une vos votre vous c d j l m n s t y est sont ete etre
+a an and are as at be by for from has have in is it its of on or that the their this to
+was were will with
+""".split())
+
+K1 = 1.2
+B = 0.75
+
+
+def _stem(token):
+    """Racinisation légère FR/EN : pluriels en -s / -x"""
+    if len(token) > 3 and token[-1] in 'sx' and token[-2] not in 'su':
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Termes indexés : minuscules sans accents, sans mots vides ni nombres
+    (sauf les années), pluriels retirés"""
+    return [
+        _stem(token) for token in TOKEN.findall(normalize_text(text))
+        if token not in STOPWORDS and (not token.isdigit() or len(token) == 4)
+    ]
+
+
+def highlight(text, terms, width=200, tags=('<mark>', '</mark>')):
+    """Extrait de text autour des termes de la requête, termes surlignés"""
+    text = ' '.join((text or '').split())
+    matches = [
+        m for m in TOKEN.finditer(text)
+        if _stem(normalize_text(m.group())) in terms
+    ]
+    if not matches:
+        return text[:width] + ('…' if len(text) > width else '')
+
+    # Fenêtre de width caractères contenant le plus de termes distincts
+    best_start, best_score = matches[0].start(), 0
+    for i, first in enumerate(matches):
+        covered = {
+            _stem(normalize_text(m.group())) for m in matches[i:]
+            if m.end() - first.start() <= width
+        }
+        if len(covered) > best_score:
+            best_start, best_score = first.start(), len(covered)
+
+    start = max(0, best_start - width // 4)
+    if start:
+        space = text.find(' ', start)
+        start = space + 1 if 0 <= space < best_start else start
+    stop = min(len(text), start + width)
+
+    parts, pos = [], start
+    for m in matches:
+        if m.start() >= start and m.end() <= stop:
+            parts.append(text[pos:m.start()])
+            parts.append(f"{tags[0]}{m.group()}{tags[1]}")
+            pos = m.end()
+    parts.append(text[pos:stop])
+    return ('…' if start else '') + ''.join(parts) + ('…' if stop < len(text) else '')
+
+
+def encode_cursor(score, key):
+    raw = json.dumps([score, key[0], key[1]]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    score, source_id, url = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return score, (source_id, url)
+
+
+class _FileLock:
+    """Verrou inter-processus par création exclusive d'un fichier"""
+
+    def __init__(self, path, stale_after=120):
+        self.path = path
+        self.stale_after = stale_after
+        self._fd = None
+
+    def __enter__(self):
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                return self
+            except FileExistsError:
+                try:
+                    # Verrou laissé par un processus mort
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        os.close(self._fd)
+        os.remove(self.path)
+
+
+class Segment:
+    """Segment immuable : documents, dictionnaire des termes, postings mmap"""
+
+    def __init__(self, directory, name):
+        self.name = name
+        self.base = os.path.join(directory, name)
+        with open(self.base + '.dict', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.keys = [(source_id, url) for source_id, url, _ in meta['docs']]
+        self.lengths = [length for _, _, length in meta['docs']]
+        self.terms = meta['terms']
+        self.ordinals = {key: i for i, key in enumerate(self.keys)}
+        self.deleted = self._read_deletes(self.base)
+        # Fréquences documentaires sans les documents supprimés (par terme)
+        self._live_df = {}
+        self._dirty = False
+
+        self._file = open(self.base + '.post', 'rb')
+        self._mm = None
+        self._view = memoryview(b'').cast('I')
+        if os.path.getsize(self.base + '.post'):
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mm).cast('I')
+
+    @staticmethod
+    def write(directory, name, docs):
+        """Écrit un segment ; docs : liste de ((source_id, url), longueur, Counter)"""
+        base = os.path.join(directory, name)
+        postings = {}
+        for ordinal, (_, _, counts) in enumerate(docs):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((ordinal, tf))
+
+        data = array('I')
+        terms = {}
+        for term in sorted(postings):
+            terms[term] = [len(data) // 2, len(postings[term])]
+            for ordinal, tf in postings[term]:
+                data.append(ordinal)
+                data.append(tf)
+
+        with open(base + '.post', 'wb') as f:
+            data.tofile(f)
+        meta = {
+            'docs': [[key[0], key[1], length] for key, length, _ in docs],
+            'terms': terms,
+        }
+        with open(base + '.dict', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @staticmethod
+    def _read_deletes(base):
+        if not os.path.exists(base + '.del'):
+            return set()
+        with open(base + '.del', encoding='utf-8') as f:
+            return set(json.load(f))
+
+    def df(self, term):
+        """Nombre de documents non supprimés contenant le terme"""
+        entry = self.terms.get(term)
+        if not entry:
+            return 0
+        if not self.deleted:
+            return entry[1]
+        df = self._live_df.get(term)
+        if df is None:
+            df = self._live_df[term] = sum(1 for _ in self.postings(term))
+        return df
+
+    def postings(self, term):
+        """(ordinal, tf) des documents non supprimés contenant le terme"""
+        entry = self.terms.get(term)
+        if not entry:
+            return
+        offset, count = entry
+        view = self._view[offset * 2:(offset + count) * 2]
+        pairs = zip(view[::2].tolist(), view[1::2].tolist())
+        if not self.deleted:
+            yield from pairs
+            return
+        deleted = self.deleted
+        for ordinal, tf in pairs:
+            if ordinal not in deleted:
+                yield ordinal, tf
+
+    def delete(self, key):
+        ordinal = self.ordinals.get(key)
+        if ordinal is None or ordinal in self.deleted:
+            return False
+        self.deleted.add(ordinal)
+        self._live_df.clear()
+        self._dirty = True
+        return True
+
+    def reload_deletes(self):
+        """Ajoute les suppressions écrites par un autre processus"""
+        deleted = self._read_deletes(self.base)
+        if not deleted <= self.deleted:
+            self.deleted |= deleted
+            self._live_df.clear()
+
+    def live_docs(self):
+        return [i for i in range(len(self.keys)) if i not in self.deleted]
+
+    def documents(self):
+        """Documents vivants avec leurs fréquences de termes (pour la fusion)"""
+        counts = {i: Counter() for i in self.live_docs()}
+        for term in self.terms:
+            for ordinal, tf in self.postings(term):
+                counts[ordinal][term] = tf
+        return [(self.keys[i], self.lengths[i], counts[i]) for i in counts]
+
+    def save_deletes(self):
+        if self._dirty:
+            tmp_path = self.base + '.del.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(sorted(self.deleted), f)
+            os.replace(tmp_path, self.base + '.del')
+            self._dirty = False
+
+    def close(self):
+        self._view.release()
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def remove_files(self):
+        for ext in ('.dict', '.post', '.del'):
+            try:
+                os.remove(self.base + ext)
+            except OSError:
+                pass
+
+
+class SearchIndex:
+    """Index BM25 incrémental et persistant"""
+
+    def __init__(self, directory=SEARCH_INDEX_DIR, max_segments=SEARCH_MAX_SEGMENTS):
+        self.directory = directory
+        self.max_segments = max_segments
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.segments = []
+        self.memtable = {}          # (source_id, url) -> (longueur, Counter)
+        self._pending_deletes = set()
+        self._manifest_mtime = None
+        self._stats = None
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # --- Manifeste -----------------------------------------------------
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, encoding='utf-8') as f:
+            return json.load(f)['segments']
+
+    def _load(self):
+        names = self._read_manifest()
+        current = {segment.name: segment for segment in self.segments}
+        segments = []
+        for name in names:
+            segment = current.pop(name, None)
+            if segment is None:
+                segment = Segment(self.directory, name)
+            else:
+                # Les suppressions d'un autre processus ont pu changer
+                segment.reload_deletes()
+            segments.append(segment)
+        for segment in current.values():
+            segment.close()
+        self.segments = segments
+        for key in self._pending_deletes | set(self.memtable):
+            for segment in self.segments:
+                segment.delete(key)
+        self._manifest_mtime = self._mtime()
+        self._stats = None
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.manifest_path)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        """Relit le manifeste s'il a été modifié par un autre processus"""
+        if self._mtime() != self._manifest_mtime:
+            try:
+                self._load()
+            except OSError:
+                # Segment retiré par une fusion concurrente : relu au prochain appel
+                pass
+
+    def _write_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segments': [segment.name for segment in self.segments]}, f)
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest_mtime = self._mtime()
+
+    # --- Écriture ------------------------------------------------------
+
+    def add(self, source_id, url, text):
+        """Indexe (ou réindexe) une page"""
+        key = (source_id, url)
+        tokens = tokenize(text)
+        with self._lock:
+            for segment in self.segments:
+                segment.delete(key)
+            self.memtable[key] = (len(tokens), Counter(tokens))
+            self._stats = None
+
+    def add_documents(self, docs):
+        for data in docs:
+            self.add(data['source_id'], data['url'],
+                     f"{data.get('title', '')}\n{data.get('content', '')}")
+
+    def delete(self, source_id, url):
+        key = (source_id, url)
+        with self._lock:
+            self.memtable.pop(key, None)
+            self._pending_deletes.add(key)
+            self._stats = None
+            for segment in self.segments:
+                segment.delete(key)
+
+    def delete_source(self, source_id):
+        """Retire toutes les pages d'une source"""
+        with self._lock:
+            self._refresh()
+            keys = {key for key in self.memtable if key[0] == source_id}
+            for segment in self.segments:
+                keys.update(key for key in segment.keys if key[0] == source_id)
+            for key in keys:
+                self.delete(*key)
+            self.commit()
+
+    def commit(self):
+        """Écrit le segment mémoire et les suppressions sur disque"""
+        with self._lock, _FileLock(os.path.join(self.directory, 'write.lock')):
+            self._refresh()
+            if self.memtable:
+                name = f"seg_{uuid.uuid4().hex[:12]}"
+                docs = [(key, length, counts) for key, (length, counts) in self.memtable.items()]
+                Segment.write(self.directory, name, docs)
+                self.segments.append(Segment(self.directory, name))
+                self.memtable = {}
+            for segment in self.segments:
+                segment.save_deletes()
+            self._pending_deletes = set()
+            if len(self.segments) > self.max_segments:
+                by_size = sorted(self.segments, key=lambda seg: len(seg.keys) - len(seg.deleted))
+                self._merge(by_size[:len(self.segments) - self.max_segments // 2])
+            self._write_manifest()
+
+    def _merge(self, victims):
+        """Fusionne les plus petits segments en un seul, sans les documents supprimés"""
+        docs = []
+        for segment in victims:
+            docs.extend(segment.documents())
+        name = f"seg_{uuid.uuid4().hex[:12]}"
+        Segment.write(self.directory, name, docs)
+        self.segments = [segment for segment in self.segments if segment not in victims]
+        self.segments.append(Segment(self.directory, name))
+        for segment in victims:
+            segment.close()
+            segment.remove_files()
+
+    def clear(self):
+        with self._lock, _FileLock(os.path.join(self.directory, 'write.lock')):
+            for segment in self.segments:
+                segment.close()
+                segment.remove_files()
+            self.segments = []
+            self.memtable = {}
+            self._pending_deletes = set()
+            self._stats = None
+            self._write_manifest()
+
+    # --- Lecture -------------------------------------------------------
+
+    def __len__(self):
+        with self._lock:
+            return len(self.memtable) + sum(
+                len(segment.keys) - len(segment.deleted) for segment in self.segments
+            )
+
+    def _collection_stats(self):
+        """Nombre de pages et longueur moyenne (mis en cache jusqu'à la prochaine écriture)"""
+        if self._stats is None:
+            self._stats = self._compute_stats()
+        return self._stats
+
+    def _compute_stats(self):
+        count = len(self.memtable)
+        total = sum(length for length, _ in self.memtable.values())
+        for segment in self.segments:
+            for ordinal in segment.live_docs():
+                count += 1
+                total += segment.lengths[ordinal]
+        return count, (total / count if count else 0.0)
+
+    def search(self, query, limit=10, cursor=None):
+        """Pages classées par BM25.
+
+        Retourne {'results': [{'source_id', 'url', 'score'}], 'total',
+        'next_cursor', 'terms'} ; next_cursor (None en fin de liste) est à
+        repasser pour obtenir la page suivante.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            self._refresh()
+            count, avgdl = self._collection_stats()
+            scores = Counter()
+            for term in terms:
+                df = sum(segment.df(term) for segment in self.segments)
+                df += sum(1 for _, counts in self.memtable.values() if term in counts)
+                if not df:
+                    continue
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+
+                for segment in self.segments:
+                    for ordinal, tf in segment.postings(term):
+                        norm = K1 * (1 - B + B * segment.lengths[ordinal] / avgdl)
+                        scores[segment.keys[ordinal]] += idf * tf * (K1 + 1) / (tf + norm)
+                for key, (length, counts) in self.memtable.items():
+                    tf = counts.get(term)
+                    if tf:
+                        norm = K1 * (1 - B + B * length / avgdl)
+                        scores[key] += idf * tf * (K1 + 1) / (tf + norm)
+
+        ranked = ((-score, key) for key, score in scores.items())
+        if cursor:
+            after_score, after_key = decode_cursor(cursor)
+            after = (-after_score, after_key)
+            ranked = (item for item in ranked if item > after)
+        page = heapq.nsmallest(limit + 1, ranked)
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(-page[-1][0], page[-1][1])
+        return {
+            'results': [
+                {'source_id': key[0], 'url': key[1], 'score': -neg_score}
+                for neg_score, key in page
+            ],
+            'total': len(scores),
+            'next_cursor': next_cursor,
+            'terms': set(terms),
+        }
+
+    def close(self):
+        with self._lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
@@ -1,16 +1,39 @@
 
-import requests
-from bs4 import BeautifulSoup
 import pymongo
+from pymongo import UpdateOne
 from datetime import datetime
-import schedule
 import time
-import pdfplumber
-import io
 from typing import List, Dict
-import threading
+import argparse
+import asyncio
+import hashlib
 import logging
+import queue
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from urllib.parse import urljoin, urlparse
+from config.settings import (
+    CRAWL_CONCURRENCY, CRAWL_PER_HOST_CONCURRENCY, HTML_PARSER, CRAWL_BATCH_SIZE,
+    HTML_OFFLOAD_BYTES, CRAWL_MAX_BYTES, SCHEDULER_WORKERS, NEAR_DUP_MODE,
+    SEARCH_ENGINE, SEARCH_INDEX_DIR, ARCHIVE_ENABLED, ARCHIVE_DIR, HTTP_POOL_MAXSIZE,
+    CRAWL_STRATEGY, POLITENESS_ENABLED, ROBOTS_ENABLED, POLITE_MAX_RETRIES,
+    CRAWL_ALL_BUDGET, CRAWL_ALL_PARALLEL, MAX_CONTENT_CHARS, USER_AGENT
+)
+from crawler.frontier import Frontier, VisitedStore
+from crawler.parsing import parse_html
+from crawler.page_state import CrawlStats, PageStateStore, content_hash
+from crawler.extraction import DocumentExtractor, then
+from crawler.scheduler import CrawlScheduler
+from crawler.relevance import RelevanceFilter
+from crawler.focus import LinkScorer
+from crawler.dedup import NearDuplicateFilter
+from crawler.search_index import SearchIndex, highlight
+from crawler.archive import ResponseArchive, ArchiveSession
+from crawler.http_client import HttpClient
+from crawler.feeds import iter_entries, parse_feed, SITEMAP_MAX_DEPTH
+from crawler.recrawl import RecrawlPolicy
+from crawler.politeness import Politeness, THROTTLE_STATUSES
+from crawler.fair_share import FairBudget
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,23 +41,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+HEADERS = {
+    # Même nom que celui sous lequel robots.txt est consulté (ROBOTS_USER_AGENT)
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+}
+
 
 class WebCrawler:
     """Classe principale pour le crawler web"""
     
     def __init__(self, mongo_uri="mongodb://localhost:27017/", 
-                 db_name="web_crawler_db"):
+                 db_name="web_crawler_db",
+                 concurrency=CRAWL_CONCURRENCY,
+                 per_host_concurrency=CRAWL_PER_HOST_CONCURRENCY,
+                 html_parser=HTML_PARSER,
+                 search_engine=SEARCH_ENGINE,
+                 search_index_dir=SEARCH_INDEX_DIR,
+                 archive_dir=ARCHIVE_DIR if ARCHIVE_ENABLED else None,
+                 polite=POLITENESS_ENABLED,
+                 max_content_chars=MAX_CONTENT_CHARS):
         """Initialise le crawler avec MongoDB"""
+        # Nombre de requêtes en vol (global et par hôte) en mode asynchrone
+        self.concurrency = max(1, concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        # Backend de parsing HTML : auto, selectolax, lxml ou html.parser
+        self.html_parser = html_parser
+        # Texte gardé par page : MAX_CONTENT_CHARS pour les documents stockés,
+        # davantage quand le texte part à l'extraction LLM (pipeline)
+        self.max_content_chars = max_content_chars
+        # Client HTTP partagé par tous les crawls : keep-alive, cache DNS, HTTP/2
+        self.http = HttpClient(pool_maxsize=max(HTTP_POOL_MAXSIZE, self.per_host_concurrency),
+                               throttle_retries=not polite)
+        # Débit adaptatif par hôte et robots.txt (None : aucune limitation)
+        self.politeness = Politeness(self.http.session, HEADERS, robots=ROBOTS_ENABLED) if polite else None
+        # Processus d'extraction pour les PDF et les très grosses pages HTML
+        self.extractor = DocumentExtractor()
+        self.scheduler = None
+        # Index BM25 tenu à jour à chaque écriture (None avec le moteur $text)
+        self.search_engine = search_engine
+        self.search_index = SearchIndex(search_index_dir) if search_engine == 'bm25' else None
+        # Archive des réponses brutes (None : pas d'archivage ni de replay)
+        self.archive = ResponseArchive(archive_dir) if archive_dir else None
+        
         try:
             self.client = pymongo.MongoClient(mongo_uri)
             self.db = self.client[db_name]
             self.sources_collection = self.db['sources']
             self.data_collection = self.db['crawled_data']
+            self.page_state_collection = self.db['page_state']
             
             # Créer des index
             self.data_collection.create_index([('title', 'text'), ('content', 'text')])
             self.data_collection.create_index('source_id')
+            self.data_collection.create_index(
+                [('source_id', pymongo.ASCENDING), ('url', pymongo.ASCENDING)]
+            )
             self.data_collection.create_index('timestamp')
+            self.page_state_collection.create_index(
+                [('source_id', pymongo.ASCENDING), ('url', pymongo.ASCENDING)],
+                unique=True
+            )
             
             logger.info(f"Connexion MongoDB établie: {db_name}")
         except Exception as e:
@@ -44,8 +114,32 @@ class WebCrawler:
     def add_source(self, url, source_type='website',
                    frequency='daily', schedule_time='09:00',
                    max_hits=100, content_types=None,
-                   enabled=True):
-        """Ajoute une nouvelle source à crawler"""
+                   enabled=True, skip_visited=True,
+                   max_bytes=CRAWL_MAX_BYTES, keywords=None,
+                   min_relevance=1, near_duplicates=NEAR_DUP_MODE,
+                   strategy=CRAWL_STRATEGY, discovery='links', discovery_url=None):
+        """Ajoute une nouvelle source à crawler
+        
+        frequency : hourly, daily, weekly, monthly ou adaptive (intervalle
+        ajusté après chaque crawl selon le taux de changement observé des
+        pages, voir RecrawlPolicy).
+        skip_visited : visiter d'abord les URLs nouvelles ; les URLs déjà vues
+        lors des crawls précédents sont revisitées ensuite, par requête
+        conditionnelle, et une page inchangée n'est pas reparsée.
+        max_bytes : taille maximale d'une réponse, au-delà elle est abandonnée.
+        keywords : mots-clés de la source ; seules les pages où ils
+        apparaissent au moins min_relevance fois sont stockées.
+        near_duplicates : 'skip' (quasi-doublons non stockés), 'mark'
+        (stockés avec near_duplicate_of) ou 'off'.
+        strategy : 'bfs' (largeur d'abord) ou 'best_first' (liens les plus
+        proches des mots-clés d'abord ; nécessite des mots-clés).
+        discovery : 'links' (pages trouvées en suivant les liens), 'feed'
+        (articles d'un flux RSS/Atom) ou 'sitemap' (URLs du sitemap) ; avec
+        un flux ou un sitemap, seules les entrées plus récentes que le
+        dernier crawl sont téléchargées et les liens ne sont pas suivis.
+        discovery_url : adresse du flux ou du sitemap (par défaut l'URL de
+        la source, ou /sitemap.xml de son site).
+        """
         if content_types is None:
             content_types = ['html', 'text']
         
@@ -57,6 +151,14 @@ class WebCrawler:
             'max_hits': max_hits,
             'content_types': content_types,
             'enabled': enabled,
+            'skip_visited': skip_visited,
+            'max_bytes': max_bytes,
+            'keywords': keywords or [],
+            'min_relevance': min_relevance,
+            'near_duplicates': near_duplicates,
+            'strategy': strategy,
+            'discovery': discovery,
+            'discovery_url': discovery_url,
             'last_crawl': None,
             'status': 'pending',
             'created_at': datetime.now()
@@ -79,6 +181,10 @@ class WebCrawler:
         try:
             from bson.objectid import ObjectId
             self.data_collection.delete_many({'source_id': source_id})
+            self.page_state_collection.delete_many({'source_id': source_id})
+            if self.search_index is not None:
+                self.search_index.delete_source(source_id)
+            VisitedStore.for_source(source_id).delete()
             result = self.sources_collection.delete_one({'_id': ObjectId(source_id)})
             logger.info(f"Source supprimée: {source_id}")
             return result.deleted_count > 0
@@ -86,172 +192,570 @@ class WebCrawler:
             logger.error(f"Erreur suppression: {e}")
             return False
     
-    def crawl_url(self, url, content_types, max_hits=100):
-        """Crawl une URL et collecte les données"""
-        collected_data = []
-        visited_urls = set()
-        urls_to_visit = [url]
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        }
+    def crawl_url(self, url, content_types, max_hits=100, visited=None,
+                  page_state=None, stats=None, max_bytes=CRAWL_MAX_BYTES,
+                  relevance=None, dedup=None, replay=False, focus=None,
+                  seeds=None, follow_links=True, session=None):
+        """Crawl une URL et collecte les données
         
-        # Configuration de la session avec retry
-        import requests
-        from requests.adapters import HTTPAdapter
-        from requests.packages.urllib3.util.retry import Retry
+        visited : VisitedStore optionnel ; les URLs jamais vues lors des crawls
+        précédents sont visitées avant les URLs déjà connues.
+        page_state : PageStateStore optionnel ; les pages non modifiées (304
+        ou contenu identique) ne sont pas retournées.
+        stats : CrawlStats optionnel, rempli avec les compteurs du crawl.
+        max_bytes : taille maximale d'une réponse (corps décompressé).
+        relevance : RelevanceFilter optionnel ; les pages sous le seuil de
+        pertinence sont écartées (leurs liens restent suivis).
+        dedup : NearDuplicateFilter optionnel ; les quasi-doublons d'une page
+        déjà vue sont écartés (mode skip) ou marqués (mode mark).
+        replay : les pages sont lues dans l'archive au lieu du réseau.
+        focus : LinkScorer optionnel ; crawl best-first, les liens les plus
+        prometteurs (ancre, URL, pertinence de la page parente) d'abord.
+        seeds : URLs de départ (entrées d'un flux ou d'un sitemap) à la place
+        de url, qui reste la référence du domaine ; une liste vide ne crawle
+        rien.
+        follow_links : suivre les liens des pages téléchargées.
+        session : session HTTP à utiliser (par défaut la session partagée,
+        ou l'archive en replay), par exemple une BudgetedSession.
+        """
+        return list(self.iter_crawl_url(
+            url, content_types, max_hits, visited, page_state, stats, max_bytes,
+            relevance, dedup, replay, focus, seeds, follow_links, session
+        ))
+    
+    def iter_crawl_url(self, url, content_types, max_hits=100, visited=None,
+                       page_state=None, stats=None, max_bytes=CRAWL_MAX_BYTES,
+                       relevance=None, dedup=None, replay=False, focus=None,
+                       seeds=None, follow_links=True, session=None):
+        """Version générateur de crawl_url : produit les pages au fil du crawl"""
+        if self.concurrency > 1:
+            yield from self._iter_async(self.aiter_crawl_url(
+                url, content_types, max_hits, visited, page_state, stats, max_bytes,
+                relevance, dedup, replay, focus, seeds, follow_links, session
+            ))
+            return
         
-        session = requests.Session()
-        retry = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
+        collected = 0
+        frontier = Frontier(visited=visited, best_first=bool(focus))
+        for seed in [url] if seeds is None else seeds:
+            frontier.push(seed, force=True)
+        session = session or self._session(replay)
+        if stats is None:
+            stats = CrawlStats()
         
-        while urls_to_visit and len(collected_data) < max_hits:
-            current_url = urls_to_visit.pop(0)
-            
-            if current_url in visited_urls:
-                continue
-            
-            visited_urls.add(current_url)
-            
-            try:
-                logger.info(f"Tentative de crawl: {current_url}")
-                
-                response = session.get(
-                    current_url, 
-                    headers=headers, 
-                    timeout=30,  # ← Timeout augmenté
-                    allow_redirects=True
-                )
-                response.raise_for_status()
-                
-                content_type = response.headers.get('Content-Type', '').lower()
+        # Pages dont l'extraction (PDF, gros HTML) tourne dans un processus :
+        # le crawl continue, elles sont traitées à la fin de leur extraction
+        pending = {}
+        try:
+            while (frontier or pending) and self._hits(collected, stats) < max_hits:
+                ready = []
+                in_flight = self._hits(collected, stats) + len(pending)
+                if frontier and in_flight < max_hits:
+                    current_url = frontier.pop()
+                    if focus:
+                        focus.discard(current_url)
+                    result = self._crawl_one(
+                        session, current_url, content_types,
+                        want_links=follow_links and in_flight + 1 < max_hits,
+                        page_state=page_state, stats=stats, max_bytes=max_bytes,
+                        relevance=relevance, dedup=dedup, focus=focus, defer=True
+                    )
+                    if isinstance(result, Future):
+                        pending[result] = current_url
+                    else:
+                        ready.append((current_url, result))
+                else:
+                    # Rien d'autre à télécharger : attendre une extraction
+                    wait(pending, return_when=FIRST_COMPLETED)
+                for future in [f for f in pending if f.done()]:
+                    ready.append((pending.pop(future), future.result()))
                 
-                if 'html' in content_type and 'html' in content_types:
-                    data = self._process_html(current_url, response.content)
+                for current_url, (data, links) in ready:
+                    if data and self._hits(collected, stats) >= max_hits:
+                        continue
+                    if links is not None:
+                        frontier.mark_visited(current_url)
+                    if follow_links and links:
+                        self._enqueue_links(frontier, url, links, focus)
                     if data:
-                        collected_data.append(data)
-                        if len(collected_data) < max_hits:
-                            soup = BeautifulSoup(response.content, 'html.parser')
-                            for link in soup.find_all('a', href=True):
-                                absolute_url = urljoin(current_url, link['href'])
-                                if self._is_same_domain(url, absolute_url):
-                                    urls_to_visit.append(absolute_url)
+                        self._collect(data, links, page_state, stats)
+                        collected += 1
+                        yield data
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    async def crawl_url_async(self, url, content_types, max_hits=100, visited=None,
+                              page_state=None, stats=None, max_bytes=CRAWL_MAX_BYTES,
+                              relevance=None, dedup=None, replay=False, focus=None,
+                              seeds=None, follow_links=True, session=None):
+        """Crawl asynchrone, retourne la liste des pages collectées"""
+        return [data async for data in self.aiter_crawl_url(
+            url, content_types, max_hits, visited, page_state, stats, max_bytes,
+            relevance, dedup, replay, focus, seeds, follow_links, session
+        )]
+    
+    async def aiter_crawl_url(self, url, content_types, max_hits=100, visited=None,
+                              page_state=None, stats=None, max_bytes=CRAWL_MAX_BYTES,
+                              relevance=None, dedup=None, replay=False, focus=None,
+                              seeds=None, follow_links=True, session=None):
+        """Crawl asynchrone : garde plusieurs requêtes en vol.
+        
+        La concurrence est plafonnée globalement (self.concurrency) et par
+        hôte (self.per_host_concurrency). Les requêtes bloquantes tournent
+        dans un pool de threads ; max_hits est respecté exactement.
+        """
+        collected = 0
+        frontier = Frontier(visited=visited, best_first=bool(focus))
+        for seed in [url] if seeds is None else seeds:
+            frontier.push(seed, force=True)
+        session = session or self._session(replay)
+        if stats is None:
+            stats = CrawlStats()
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host_concurrency))
+        pending = {}
+        
+        async def crawl_one(current_url):
+            async with host_limits[urlparse(current_url).netloc]:
+                return await loop.run_in_executor(
+                    executor, self._crawl_one, session, current_url, content_types,
+                    follow_links, page_state, stats, max_bytes, relevance, dedup, focus
+                )
+        
+        try:
+            while (frontier or pending) and self._hits(collected, stats) < max_hits:
+                # Remplir les créneaux libres
+                while frontier and len(pending) < self.concurrency:
+                    current_url = frontier.pop()
+                    if focus:
+                        focus.discard(current_url)
+                    pending[asyncio.ensure_future(crawl_one(current_url))] = current_url
                 
-                elif 'xml' in content_type and 'xml' in content_types:
-                    data = self._process_xml(current_url, response.content)
-                    if data:
-                        collected_data.append(data)
+                if not pending:
+                    break
                 
-                elif 'pdf' in content_type and 'pdf' in content_types:
-                    data = self._process_pdf(current_url, response.content)
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    current_url = pending.pop(task)
+                    data, links = task.result()
+                    if collected >= max_hits:
+                        continue
+                    if data and self._hits(collected, stats) >= max_hits:
+                        continue
+                    if links is not None:
+                        frontier.mark_visited(current_url)
+                    if follow_links and links:
+                        self._enqueue_links(frontier, url, links, focus)
                     if data:
-                        collected_data.append(data)
+                        self._collect(data, links, page_state, stats)
+                        collected += 1
+                        yield data
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            # Pages pas encore commencées abandonnées ; celles en cours finissent
+            # avant le retour, pour que ni état ni statistiques ne bougent ensuite
+            executor.shutdown(wait=False, cancel_futures=True)
+            await loop.run_in_executor(None, executor.shutdown)
+    
+    def _iter_async(self, agen):
+        """Consomme un générateur asynchrone depuis du code synchrone"""
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(agen.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(agen.aclose())
+            loop.close()
+    
+    def _hits(self, collected, stats):
+        """Pages consultées avec succès : collectées, non modifiées, non pertinentes
+        ou quasi-doublons écartés"""
+        return (collected + stats['not_modified'] + stats['unchanged'] +
+                stats['irrelevant'] + stats['near_duplicates'])
+    
+    def _session(self, replay=False):
+        """Session partagée du client HTTP (ou session de replay de l'archive)"""
+        if replay:
+            if self.archive is None:
+                raise ValueError("Replay impossible : archive désactivée (ARCHIVE_ENABLED=1)")
+            return ArchiveSession(self.archive)
+        return self.http.session
+    
+    def _crawl_one(self, session, current_url, content_types, want_links=True,
+                   page_state=None, stats=None, max_bytes=CRAWL_MAX_BYTES,
+                   relevance=None, dedup=None, focus=None, defer=False):
+        """Télécharge et traite une URL, retourne (données, liens)
+        
+        Avec page_state, la requête est conditionnelle : une réponse 304 ou un
+        contenu inchangé ne produisent pas de données, seulement les liens
+        connus de la page pour poursuivre l'exploration. Un corps identique
+        à celui du dernier passage n'est pas reparsé.
+        
+        Les liens sont résolus par rapport à l'URL finale (après
+        redirections) ; les données gardent l'URL demandée. Les liens valent
+        None si la page n'a pas pu être obtenue (robots.txt, hôte en pause,
+        erreur réseau ou HTTP) : elle n'est alors pas marquée visitée.
+        
+        La réponse est lue en streaming : un Content-Type non demandé est
+        rejeté sur les en-têtes, avant le corps, et un corps plus gros que
+        max_bytes est abandonné.
+        
+        defer : si l'extraction part dans un processus (PDF, gros HTML),
+        retourne sans l'attendre un Future de (données, liens).
+        """
+        if stats is None:
+            stats = CrawlStats()
+        
+        try:
+            logger.info(f"Tentative de crawl: {current_url}")
+            
+            state = None
+            headers = HEADERS
+            if page_state is not None:
+                state = page_state.get(current_url)
+                headers = {**HEADERS, **page_state.conditional_headers(state)}
+            
+            response = self._fetch(session, current_url, headers, stats)
+            if response is None:
+                return None, None
+            
+            try:
+                if response.status_code == 304 and state:
+                    stats.incr('not_modified')
+                    page_state.record(current_url)
+                    return None, state.get('links', [])
                 
-                elif 'text' in content_type and 'text' in content_types:
-                    data = self._process_text(current_url, response.text)
-                    if data:
-                        collected_data.append(data)
+                response.raise_for_status()
                 
-            except Exception as e:
-                logger.warning(f"Erreur crawl {current_url}: {e}")
-                continue
-        
-        return collected_data
-    
-    def _is_same_domain(self, base_url, check_url):
-        """Vérifie si deux URLs sont du même domaine"""
-        return urlparse(base_url).netloc == urlparse(check_url).netloc
+                if not self._read_body(response, content_types, max_bytes, stats):
+                    return None, []
+            finally:
+                response.close()
+            
+            if self.archive is not None and not isinstance(session, ArchiveSession):
+                self.archive.store(current_url, response)
+            
+            stats.incr('fetched')
+            
+            body_hash = hashlib.sha256(response.content).hexdigest()
+            if state and state.get('body_hash') == body_hash and 'links' in state:
+                # Corps identique au dernier passage : ni parsing ni extraction
+                stats.incr('unchanged')
+                page_state.record(current_url, response.headers, body_hash=body_hash)
+                return None, state['links']
+            
+            anchors = []
+            processed = self._process_response(
+                current_url, response, content_types, want_links, anchors, defer
+            )
+            if isinstance(processed, Future):
+                return then(processed, lambda processed: self._finish_page(
+                    current_url, processed, anchors, response.headers, state, body_hash,
+                    want_links, page_state, stats, relevance, dedup, focus
+                ), (None, None))
+            return self._finish_page(
+                current_url, processed, anchors, response.headers, state, body_hash,
+                want_links, page_state, stats, relevance, dedup, focus
+            )
+            
+        except Exception as e:
+            stats.incr('errors')
+            logger.warning(f"Erreur crawl {current_url}: {e}")
+            return None, None
     
-    def _process_html(self, url, content):
-        """Traite le contenu HTML"""
+    def _finish_page(self, current_url, processed, anchors, headers, state, body_hash,
+                     want_links, page_state, stats, relevance, dedup, focus):
+        """Suite de _crawl_one après l'extraction : état de la page, pertinence
+        et quasi-doublons"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            data, links = processed
+            if focus and links:
+                focus.observe(links, anchors, focus.page_relevance(data))
+            if not data:
+                return data, links
             
-            for script in soup(['script', 'style']):
-                script.decompose()
+            data['content_hash'] = content_hash(data)
+            data['body_hash'] = body_hash
+            data['etag'] = headers.get('ETag')
+            data['last_modified'] = headers.get('Last-Modified')
+            if state and state.get('content_hash') == data['content_hash']:
+                stats.incr('unchanged')
+                page_state.record(current_url, headers, body_hash=body_hash,
+                                  links=links if want_links else None)
+                return None, links or state.get('links', [])
+            if state and state.get('content_hash'):
+                # Page connue modifiée depuis la visite précédente
+                stats.incr('modified')
             
-            title = soup.title.string if soup.title else 'Sans titre'
-            text_content = soup.get_text(separator=' ', strip=True)
+            if relevance and not relevance.evaluate(data):
+                stats.incr('irrelevant')
+                if page_state is not None:
+                    # Validateurs et empreintes conservés, comme pour une page inchangée
+                    page_state.record(current_url, headers, data['content_hash'],
+                                      links if want_links else None, body_hash=body_hash)
+                return None, links
             
-            keywords = []
-            meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-            if meta_keywords and meta_keywords.get('content'):
-                keywords = [k.strip() for k in meta_keywords['content'].split(',')]
+            if dedup is not None and dedup.check(data):
+                # Stockage et appel LLM évités pour cette page
+                stats.incr('duplicate_bytes', len(data.get('content', '')))
+                if dedup.mode == 'skip':
+                    stats.incr('near_duplicates')
+                    if page_state is not None:
+                        # Validateurs conservés : le prochain passage aura un 304
+                        page_state.record(current_url, headers, body_hash=body_hash,
+                                          links=links if want_links else None)
+                    return None, links
+                stats.incr('near_duplicates_marked')
+            
+            return data, links
             
-            return {
-                'url': url,
-                'title': title,
-                'content': text_content[:5000],
-                'content_type': 'html',
-                'keywords': keywords,
-                'timestamp': datetime.now()
-            }
         except Exception as e:
-            logger.error(f"Erreur traitement HTML: {e}")
+            stats.incr('errors')
+            logger.warning(f"Erreur crawl {current_url}: {e}")
+            return None, None
+    
+    def _fetch(self, session, url, headers, stats):
+        """GET streamé et poli : robots.txt, créneau de l'hôte, nouvelles
+        tentatives après 429 / 503
+        
+        Retourne None si robots.txt interdit l'URL ou si l'hôte demande une
+        pause plus longue que POLITE_MAX_WAIT.
+        """
+        polite = None if isinstance(session, ArchiveSession) else self.politeness
+        if polite is None:
+            return session.get(url, headers=headers, timeout=30, allow_redirects=True, stream=True)
+        
+        if not polite.allowed(url):
+            stats.incr('robots_disallowed')
+            logger.info(f"Interdit par robots.txt: {url}")
             return None
+        
+        for attempt in range(POLITE_MAX_RETRIES + 1):
+            waited = polite.wait(url)
+            if waited is None:
+                stats.incr('throttled_skipped')
+                logger.warning(f"Hôte en pause trop longue, URL abandonnée: {url}")
+                return None
+            stats.incr('polite_wait', waited)
+            
+            start = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=30,
+                                       allow_redirects=True, stream=True)
+            except Exception:
+                polite.failed(url)
+                raise
+            polite.observe(url, response.status_code, response.headers,
+                           time.perf_counter() - start)
+            
+            if response.status_code not in THROTTLE_STATUSES:
+                return response
+            stats.incr('throttled')
+            if attempt == POLITE_MAX_RETRIES:
+                return response
+            response.close()
+    
+    def _read_body(self, response, content_types, max_bytes, stats):
+        """Lit le corps d'une réponse streamée si son type et sa taille sont acceptés"""
+        declared = int(response.headers.get('Content-Length') or 0)
+        content_type = response.headers.get('Content-Type', '').lower()
+        
+        if not self._accepts(content_type, content_types):
+            stats.incr('rejected_type')
+            stats.incr('bytes_avoided', declared)
+            logger.info(f"Type ignoré ({content_type or 'inconnu'}): {response.url}")
+            return False
+        
+        if max_bytes and declared > max_bytes:
+            stats.incr('too_large')
+            stats.incr('bytes_avoided', declared)
+            logger.info(f"Réponse trop volumineuse ({declared} octets): {response.url}")
+            return False
+        
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=65536):
+            body.extend(chunk)
+            if max_bytes and len(body) > max_bytes:
+                stats.incr('too_large')
+                stats.incr('bytes_downloaded', len(body))
+                logger.info(f"Réponse tronquée au-delà de {max_bytes} octets: {response.url}")
+                return False
+        
+        stats.incr('bytes_downloaded', len(body))
+        # Rend le corps lu disponible via response.content / response.text
+        response._content = bytes(body)
+        return True
+    
+    def _accepts(self, content_type, content_types):
+        """Même règle que le dispatch de _process_response"""
+        return any(
+            kind in content_type and kind in content_types
+            for kind in ('html', 'xml', 'pdf', 'text')
+        )
+    
+    def _process_response(self, url, response, content_types, want_links=True, anchors=None,
+                          defer=False):
+        """Dispatch selon le Content-Type vers le traitement adapté
+        
+        Les liens sont résolus par rapport à l'URL finale de la réponse.
+        Avec defer, une extraction confiée à un processus donne un Future
+        de (données, liens).
+        """
+        content_type = response.headers.get('Content-Type', '').lower()
+        base_url = response.url or url
+        links = []
+        data = None
+        
+        if 'html' in content_type and 'html' in content_types:
+            data = self._process_html(url, response.content, links if want_links else None,
+                                      anchors, base_url, defer)
+        
+        elif 'xml' in content_type and 'xml' in content_types:
+            data = self._process_xml(url, response.content, links if want_links else None,
+                                     base_url)
+        
+        elif 'pdf' in content_type and 'pdf' in content_types:
+            data = self._process_pdf(url, response.content, defer)
+        
+        elif 'text' in content_type and 'text' in content_types:
+            data = self._process_text(url, response.text)
+        
+        if isinstance(data, Future):
+            return then(data, lambda data: (data, links))
+        return data, links
+    
+    def _enqueue_links(self, frontier, base_url, links, focus=None):
+        """Ajoute à la frontière les liens du même domaine"""
+        for link in links:
+            if self._is_same_domain(base_url, link):
+                # Un lien déjà en attente remonte si son score s'est amélioré
+                frontier.push(link, priority=focus.priority(link) if focus else 0.0)
+            if focus and not frontier.queued(link):
+                focus.discard(link)
+    
+    def _collect(self, data, links, page_state, stats):
+        """Retient une page nouvelle ou modifiée et enregistre son état"""
+        stats.incr('changed')
+        if page_state is not None:
+            page_state.record(
+                data['url'],
+                {'ETag': data.get('etag'), 'Last-Modified': data.get('last_modified')},
+                data['content_hash'], links or None, changed=True,
+                body_hash=data.get('body_hash')
+            )
+    
+    def _is_same_domain(self, base_url, check_url):
+        """Vérifie si deux URLs sont du même domaine"""
+        return urlparse(base_url).netloc == urlparse(check_url).netloc
     
-    def _process_xml(self, url, content):
-        """Traite le contenu XML/RSS"""
+    def _process_html(self, url, content, links=None, anchors=None, base_url=None, defer=False):
+        """Traite le contenu HTML
+        
+        La page n'est parsée qu'une fois : si une liste links est fournie,
+        elle reçoit les liens sortants de la page, rendus absolus par
+        rapport à base_url (par défaut url), et anchors leurs textes d'ancre.
+        Une très grosse page est parsée dans un processus d'extraction ;
+        avec defer, le résultat est alors un Future.
+        """
         try:
-            soup = BeautifulSoup(content, 'xml')
-            items = soup.find_all('item')
-            if items:
-                item = items[0]
-                title = item.find('title').text if item.find('title') else 'Sans titre'
-                description = item.find('description').text if item.find('description') else ''
-                
-                return {
-                    'url': url,
-                    'title': title,
-                    'content': description[:5000],
-                    'content_type': 'xml',
-                    'keywords': [],
-                    'timestamp': datetime.now()
-                }
-            return None
+            base_url = base_url or url
+            if HTML_OFFLOAD_BYTES and len(content) > HTML_OFFLOAD_BYTES:
+                page = self.extractor.submit(parse_html, content, base_url, self.html_parser)
+                if defer:
+                    return then(page, lambda page: self._html_data(url, page, links, anchors))
+                page = page.result()
+            else:
+                page = parse_html(content, base_url, self.html_parser)
+            return self._html_data(url, page, links, anchors)
         except Exception as e:
-            logger.error(f"Erreur traitement XML: {e}")
+            logger.error(f"Erreur traitement HTML: {e}")
             return None
     
-    def _process_pdf(self, url, content):
-        """Traite le contenu PDF"""
+    def _html_data(self, url, page, links=None, anchors=None):
+        """Données d'une page HTML parsée"""
+        if links is not None:
+            links.extend(page.links)
+            if anchors is not None:
+                anchors.extend(page.anchors)
+        
+        return {
+            'url': url,
+            'title': page.title,
+            'content': page.text[:self.max_content_chars],
+            'content_type': 'html',
+            'keywords': page.keywords,
+            'timestamp': datetime.now()
+        }
+    
+    def _process_xml(self, url, content, links=None, base_url=None):
+        """Traite le contenu XML (flux RSS/Atom, sitemap)
+        
+        Tous les articles du flux (ou toutes les URLs du sitemap) sont
+        conservés : leurs textes forment le contenu de la page et, si une
+        liste links est fournie, leurs adresses y sont ajoutées pour être
+        crawlées à leur tour.
+        """
         try:
-            pdf_file = io.BytesIO(content)
-            text_content = ""
+            title, entries = parse_feed(content)
+            if not entries:
+                return None
             
-            with pdfplumber.open(pdf_file) as pdf:
-                for page in pdf.pages[:10]:
-                    text_content += page.extract_text() or ""
+            if links is not None:
+                links.extend(urljoin(base_url or url, entry.url) for entry in entries)
             
             return {
                 'url': url,
-                'title': url.split('/')[-1],
-                'content': text_content[:5000],
-                'content_type': 'pdf',
+                'title': title or entries[0].title or 'Sans titre',
+                'content': '\n\n'.join(
+                    f"{entry.title}\n{entry.summary}".strip() for entry in entries
+                )[:self.max_content_chars],
+                'content_type': 'xml',
                 'keywords': [],
                 'timestamp': datetime.now()
             }
+        except Exception as e:
+            logger.error(f"Erreur traitement XML: {e}")
+            return None
+    
+    def _process_pdf(self, url, content, defer=False):
+        """Traite le contenu PDF (avec defer, retourne un Future)"""
+        try:
+            # Extraction hors du thread de crawl, dans les processus d'extraction
+            text_content = self.extractor.submit_pdf(content)
+            if defer:
+                return then(text_content, lambda text: self._pdf_data(url, text))
+            return self._pdf_data(url, text_content.result())
         except Exception as e:
             logger.error(f"Erreur traitement PDF: {e}")
             return None
     
+    def _pdf_data(self, url, text_content):
+        """Données d'un PDF à partir de son texte"""
+        return {
+            'url': url,
+            'title': url.split('/')[-1],
+            'content': text_content[:self.max_content_chars],
+            'content_type': 'pdf',
+            'keywords': [],
+            'timestamp': datetime.now()
+        }
+    
     def _process_text(self, url, content):
         """Traite le contenu texte brut"""
         try:
             return {
                 'url': url,
                 'title': url.split('/')[-1],
-                'content': content[:5000],
+                'content': content[:self.max_content_chars],
                 'content_type': 'text',
                 'keywords': [],
                 'timestamp': datetime.now()
@@ -260,15 +764,98 @@ class WebCrawler:
             logger.error(f"Erreur traitement texte: {e}")
             return None
     
-    def crawl_source(self, source_id):
-        """Crawl une source spécifique"""
+    def discovery_url(self, source):
+        """Adresse du flux ou du sitemap d'une source"""
+        if source.get('discovery_url'):
+            return source['discovery_url']
+        url = source['url']
+        if source.get('discovery') == 'sitemap' and not urlparse(url).path.endswith(('.xml', '.gz')):
+            return urljoin(url, '/sitemap.xml')
+        return url
+    
+    def discover(self, url, since=None, limit=None, stats=None, replay=False, session=None):
+        """URLs d'un flux RSS/Atom ou d'un sitemap, les plus récentes d'abord
+        
+        Le document est lu en streaming ; les index de sitemaps et les
+        sitemaps compressés (.gz) sont suivis. Avec since, les entrées
+        datées (lastmod, pubDate, updated) d'avant since sont écartées, de
+        même que les sitemaps d'un index qui n'ont pas changé depuis.
+        Retourne au plus limit URLs.
+        """
+        if stats is None:
+            stats = CrawlStats()
+        session = session or self._session(replay)
+        entries = {}
+        for entry in self._iter_discovery(session, url, since, stats):
+            known = entries.get(entry.url)
+            if known is None or (entry.updated and (known.updated is None or entry.updated > known.updated)):
+                entries[entry.url] = entry
+        
+        # Entrées datées les plus récentes d'abord, puis les non datées
+        ordered = sorted(entries.values(),
+                         key=lambda entry: (entry.updated is not None, entry.updated or datetime.min),
+                         reverse=True)
+        urls = [entry.url for entry in ordered[:limit]]
+        stats.incr('discovered', len(urls))
+        return urls
+    
+    def _iter_discovery(self, session, url, since, stats, depth=0):
+        response = self._fetch(session, url, HEADERS, stats)
+        if response is None:
+            raise RuntimeError(f"Accès refusé ou hôte indisponible: {url}")
+        try:
+            response.raise_for_status()
+            raw = response.raw
+            if hasattr(raw, 'decode_content'):
+                # Content-Encoding (gzip HTTP) décodé au fil de la lecture
+                raw.decode_content = True
+            for entry in iter_entries(raw):
+                if not entry.url:
+                    continue
+                entry.url = urljoin(url, entry.url)
+                if since and entry.updated and entry.updated <= since:
+                    stats.incr('discovery_not_modified')
+                    continue
+                if not entry.is_sitemap:
+                    yield entry
+                elif depth < SITEMAP_MAX_DEPTH:
+                    yield from self._iter_discovery(session, entry.url, since, stats, depth + 1)
+        finally:
+            response.close()
+    
+    def crawl_source(self, source_id, batch_size=CRAWL_BATCH_SIZE, replay=False,
+                     budget=None, progress=None):
+        """Crawl une source spécifique
+        
+        Les pages sont écrites au fil du crawl par lots de batch_size
+        (upsert sur l'URL), ce qui garde la mémoire constante et rend les
+        données visibles avant la fin du crawl.
+        
+        replay : retraite la source depuis l'archive, sans réseau ; toutes
+        les pages archivées sont retraitées (ni historique des URLs ni état
+        des pages) et la date du dernier crawl n'est pas modifiée.
+        
+        Pour une source découverte par flux ou sitemap, seules les entrées
+        publiées ou modifiées depuis le dernier crawl sont téléchargées ; si
+        le flux est inaccessible, le crawl repart de l'URL de la source en
+        suivant les liens.
+        
+        budget : FairBudget optionnel partagé avec d'autres crawls ; chaque
+        requête de la source y prend un créneau.
+        progress : fonction appelée avec (pages collectées, stats) après
+        chaque page collectée.
+        
+        En cas d'échec (source introuvable ou désactivée, erreur pendant le
+        crawl, aucune page obtenue), le résultat contient une clé error et
+        la source passe au statut error.
+        """
         try:
             from bson.objectid import ObjectId
             source = self.sources_collection.find_one({'_id': ObjectId(source_id)})
             
             if not source or not source.get('enabled'):
                 logger.warning(f"Source {source_id} non trouvée ou désactivée")
-                return 0
+                return {'stored': 0, 'error': f"Source {source_id} non trouvée ou désactivée"}
             
             logger.info(f"Début crawl: {source['url']}")
             
@@ -277,50 +864,318 @@ class WebCrawler:
                 {'$set': {'status': 'crawling'}}
             )
             
-            collected_data = self.crawl_url(
-                source['url'],
-                source['content_types'],
-                source['max_hits']
-            )
+            visited = None
+            if source.get('skip_visited', True) and not replay:
+                visited = VisitedStore.for_source(source_id)
+            
+            dedup = None
+            dedup_mode = source.get('near_duplicates', NEAR_DUP_MODE)
+            if dedup_mode != 'off':
+                dedup = NearDuplicateFilter.for_source(self.data_collection, source_id, dedup_mode)
+            
+            stats = CrawlStats()
+            page_state = None if replay else self.page_state(source_id, deferred=True)
+            session = None
+            if budget is not None and not replay:
+                session = budget.session(self.http.session, str(source_id))
             
+            seeds = None
+            discovery = source.get('discovery', 'links')
+            if discovery in ('feed', 'sitemap'):
+                try:
+                    seeds = self.discover(
+                        self.discovery_url(source),
+                        since=None if replay else source.get('last_crawl'),
+                        limit=source['max_hits'], stats=stats, replay=replay,
+                        session=session
+                    )
+                except Exception as e:
+                    logger.warning(f"Découverte impossible ({discovery}), suivi des liens: {e}")
+                else:
+                    logger.info(f"Découverte ({discovery}): {len(seeds)} URLs nouvelles, "
+                                f"{stats['discovery_not_modified']} inchangées")
+            batch = []
             count = 0
-            for data in collected_data:
+            
+            for data in self.iter_crawl_url(
+                source['url'],
+                source['content_types'],
+                source['max_hits'],
+                visited=visited,
+                page_state=page_state,
+                stats=stats,
+                max_bytes=source.get('max_bytes', CRAWL_MAX_BYTES),
+                relevance=RelevanceFilter(
+                    source.get('keywords'), source.get('min_relevance', 1)
+                ),
+                dedup=dedup,
+                replay=replay,
+                focus=LinkScorer(source.get('keywords'))
+                if source.get('strategy', CRAWL_STRATEGY) == 'best_first' else None,
+                seeds=seeds,
+                follow_links=seeds is None,
+                session=session
+            ):
                 data['source_id'] = source_id
-                self.data_collection.insert_one(data)
-                count += 1
+                batch.append(data)
+                if len(batch) >= batch_size:
+                    count += self._flush_batch(batch, page_state, visited)
+                    batch = []
+                if progress is not None:
+                    progress(count + len(batch), stats)
             
+            count += self._flush_batch(batch, page_state, visited)
+            
+            if stats['errors'] and not (stats['fetched'] or stats['not_modified']):
+                raise RuntimeError(f"Aucune page obtenue ({stats['errors']} erreur(s))")
+            
+            update = {'status': 'completed', 'error': None}
+            if not replay:
+                update['last_crawl'] = datetime.now()
+                update['recrawl'] = self._recrawl_decision(source, stats, update['last_crawl'])
             self.sources_collection.update_one(
                 {'_id': ObjectId(source_id)},
-                {'$set': {
-                    'status': 'completed',
-                    'last_crawl': datetime.now()
-                }}
+                {'$set': update}
             )
             
-            logger.info(f"Crawl terminé: {count} éléments")
-            return count
+            stats['stored'] = count
+            logger.info(
+                f"Crawl terminé: {count} éléments "
+                f"(téléchargés: {stats['fetched']}, non modifiés: {stats['not_modified']}, "
+                f"inchangés: {stats['unchanged']}, modifiés: {stats['changed']}, "
+                f"non pertinents: {stats['irrelevant']}, "
+                f"rendement: {stats['changed'] / max(1, stats['fetched']):.0%} des pages téléchargées retenues, "
+                f"quasi-doublons: {stats['near_duplicates']} écartés / "
+                f"{stats['near_duplicates_marked']} marqués "
+                f"({stats['duplicate_bytes']} caractères non stockés ou non extraits), "
+                f"types rejetés: {stats['rejected_type']}, trop gros: {stats['too_large']}, "
+                f"interdits par robots.txt: {stats['robots_disallowed']}, "
+                f"429/503: {stats['throttled']}, attente polie: {stats['polite_wait']:.1f}s, "
+                f"octets lus: {stats['bytes_downloaded']}, évités: {stats['bytes_avoided']})"
+            )
+            return dict(stats)
             
         except Exception as e:
             logger.error(f"Erreur crawl: {e}")
-            return 0
+            try:
+                self.sources_collection.update_one(
+                    {'_id': ObjectId(source_id)},
+                    {'$set': {'status': 'error', 'error': str(e)}}
+                )
+            except Exception:
+                pass
+            return {'stored': 0, 'error': str(e)}
+    
+    def crawl_all_sources(self, source_ids=None, budget=CRAWL_ALL_BUDGET,
+                          max_parallel=CRAWL_ALL_PARALLEL, progress=None):
+        """Crawl plusieurs sources en parallèle, retourne les stats par source
+        
+        source_ids : sources à crawler (par défaut toutes les sources actives).
+        progress : fonction appelée avec chaque événement de
+        iter_crawl_all_sources.
+        """
+        results = {}
+        for event in self.iter_crawl_all_sources(source_ids, budget, max_parallel):
+            if progress is not None:
+                progress(event)
+            if event['event'] == 'finished':
+                results[event['source_id']] = event['stats']
+        return results
+    
+    def iter_crawl_all_sources(self, source_ids=None, budget=CRAWL_ALL_BUDGET,
+                               max_parallel=CRAWL_ALL_PARALLEL):
+        """Crawl parallèle de plusieurs sources, produit la progression
+        
+        Jusqu'à max_parallel sources sont crawlées en même temps ; leurs
+        requêtes partagent un budget global de budget requêtes en vol
+        (FairBudget), réparti équitablement entre sources, avec au plus
+        per_host_concurrency requêtes par hôte toutes sources confondues.
+        La durée totale tend vers celle de la source la plus lente au lieu
+        de la somme des durées.
+        
+        Événements produits (dictionnaires) : started, progress (pages
+        collectées, pages téléchargées) et finished (stats du crawl_source,
+        durée) ; le dernier est summary (durée totale, budget).
+        """
+        if source_ids is None:
+            sources = self.get_sources(enabled_only=True)
+        else:
+            from bson.objectid import ObjectId
+            sources = list(self.sources_collection.find(
+                {'_id': {'$in': [ObjectId(source_id) for source_id in source_ids]}}
+            ))
+        if not sources:
+            return
+        
+        fair = FairBudget(budget, per_host=self.per_host_concurrency)
+        events = queue.Queue()
+        start = time.perf_counter()
+        
+        def run(source):
+            source_id = str(source['_id'])
+            events.put({'event': 'started', 'source_id': source_id, 'url': source['url']})
+            started = time.perf_counter()
+            
+            def report(collected, stats):
+                events.put({'event': 'progress', 'source_id': source_id, 'url': source['url'],
+                            'collected': collected, 'fetched': stats['fetched']})
+            
+            try:
+                stats = self.crawl_source(source_id, budget=fair, progress=report)
+            except Exception as e:
+                logger.error(f"Erreur crawl {source['url']}: {e}")
+                stats = {'stored': 0, 'error': str(e)}
+            stats['elapsed'] = time.perf_counter() - started
+            events.put({'event': 'finished', 'source_id': source_id, 'url': source['url'],
+                        'stats': stats})
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(sources))))
+        try:
+            for source in sources:
+                executor.submit(run, source)
+            remaining = len(sources)
+            while remaining:
+                event = events.get()
+                if event['event'] == 'finished':
+                    remaining -= 1
+                yield event
+        finally:
+            # Arrêt anticipé : les sources non démarrées sont annulées
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        yield {'event': 'summary', 'sources': len(sources),
+               'elapsed': time.perf_counter() - start, 'budget': fair.stats()}
+    
+    def _recrawl_decision(self, source, stats, now):
+        """Met à jour l'estimation du taux de changement d'une source
+        
+        Seules les pages déjà connues comptent : revisitées = 304 +
+        inchangées + modifiées. La décision est enregistrée pour toutes les
+        sources, le planificateur ne l'applique qu'en fréquence adaptive.
+        """
+        last_crawl = source.get('last_crawl')
+        revisited = stats['not_modified'] + stats['unchanged'] + stats['modified']
+        state = RecrawlPolicy().update(
+            source.get('recrawl'), revisited, stats['modified'],
+            (now - last_crawl).total_seconds() if last_crawl else None,
+            frequency=source.get('frequency'), now=now
+        )
+        logger.info(
+            f"Recrawl: {stats['modified']}/{revisited} pages modifiées, "
+            f"{state['rate_per_day']:.2f} changements/jour, "
+            f"prochain intervalle {state['interval'] / 3600:.1f} h ({state['reason']})"
+        )
+        return state
+    
+    def _flush_batch(self, batch, page_state=None, visited=None):
+        """Écrit un lot de pages (upsert sur source_id + url) en un aller-retour
+        
+        L'état des pages et l'historique des URLs visitées ne sont persistés
+        qu'après l'écriture des données, pour qu'un crash ne fasse pas
+        considérer comme déjà stockées des pages perdues.
+        """
+        if batch:
+            self.data_collection.bulk_write([
+                UpdateOne(
+                    {'source_id': data['source_id'], 'url': data['url']},
+                    {'$set': data},
+                    upsert=True
+                )
+                for data in batch
+            ], ordered=False)
+            if self.search_index is not None:
+                self.search_index.add_documents(batch)
+                self.search_index.commit()
+        if page_state is not None:
+            page_state.commit()
+        if visited is not None:
+            visited.save()
+        return len(batch)
+    
+    def page_state(self, source_id=None, deferred=False):
+        """État des pages (validateurs HTTP, empreintes) d'une source"""
+        return PageStateStore(self.page_state_collection, source_id, deferred)
     
     def search_data(self, query, limit=50):
-        """Recherche par mots-clés"""
+        """Recherche par mots-clés (liste de résultats, sans pagination)"""
+        return self.search(query, limit=limit)['results']
+    
+    def search(self, query, limit=10, cursor=None):
+        """Recherche paginée
+        
+        Retourne {'results', 'total', 'next_cursor'} : chaque résultat a
+        url, title, content_type, source_id, score et un extrait (snippet)
+        où les termes sont surlignés, sans le contenu complet. Passer
+        next_cursor pour obtenir la page suivante.
+        """
         try:
-            results = list(self.data_collection.find(
-                {'$text': {'$search': query}},
-                {'score': {'$meta': 'textScore'}}
-            ).sort([('score', {'$meta': 'textScore'})]).limit(limit))
+            if self.search_index is None:
+                return self._search_text(query, limit)
+            
+            if not len(self.search_index) and self.data_collection.estimated_document_count():
+                self.rebuild_search_index()
             
-            for result in results:
-                result['_id'] = str(result['_id'])
+            page = self.search_index.search(query, limit=limit, cursor=cursor)
+            keys = [(hit['source_id'], hit['url']) for hit in page['results']]
+            docs = {}
+            if keys:
+                for doc in self.data_collection.find(
+                    {'$or': [{'source_id': source_id, 'url': url} for source_id, url in keys]},
+                    {'title': 1, 'content': 1, 'content_type': 1, 'source_id': 1, 'url': 1}
+                ):
+                    docs[(doc.get('source_id'), doc['url'])] = doc
             
-            logger.info(f"Recherche '{query}': {len(results)} résultats")
-            return results
+            results = []
+            for hit in page['results']:
+                doc = docs.get((hit['source_id'], hit['url']))
+                if doc is None:
+                    continue
+                results.append({
+                    '_id': str(doc['_id']),
+                    'url': hit['url'],
+                    'source_id': hit['source_id'],
+                    'title': doc.get('title', ''),
+                    'content_type': doc.get('content_type'),
+                    'score': hit['score'],
+                    'snippet': highlight(doc.get('content', ''), page['terms']),
+                })
+            
+            logger.info(f"Recherche '{query}': {page['total']} résultats")
+            return {'results': results, 'total': page['total'], 'next_cursor': page['next_cursor']}
             
         except Exception as e:
             logger.error(f"Erreur recherche: {e}")
-            return []
+            return {'results': [], 'total': 0, 'next_cursor': None}
+    
+    def _search_text(self, query, limit):
+        """Recherche via l'index $text de MongoDB"""
+        results = list(self.data_collection.find(
+            {'$text': {'$search': query}},
+            {'score': {'$meta': 'textScore'}}
+        ).sort([('score', {'$meta': 'textScore'})]).limit(limit))
+        
+        for result in results:
+            result['_id'] = str(result['_id'])
+            result['snippet'] = result.get('content', '')[:200]
+        
+        logger.info(f"Recherche '{query}': {len(results)} résultats")
+        return {'results': results, 'total': len(results), 'next_cursor': None}
+    
+    def rebuild_search_index(self, batch_size=1000):
+        """Reconstruit l'index BM25 à partir de crawled_data"""
+        self.search_index.clear()
+        count = 0
+        cursor = self.data_collection.find(
+            {}, {'source_id': 1, 'url': 1, 'title': 1, 'content': 1}
+        ).batch_size(batch_size)
+        for doc in cursor:
+            self.search_index.add_documents([doc])
+            count += 1
+            if count % batch_size == 0:
+                self.search_index.commit()
+        self.search_index.commit()
+        logger.info(f"Index de recherche reconstruit: {count} pages")
+        return count
     
     def get_statistics(self):
         """Obtient les statistiques"""
@@ -328,45 +1183,92 @@ class WebCrawler:
             'total_sources': self.sources_collection.count_documents({}),
             'active_sources': self.sources_collection.count_documents({'enabled': True}),
             'total_data': self.data_collection.count_documents({}),
+            'http': self.http.stats(),
+            'politeness': self.politeness.stats() if self.politeness else {},
             'last_update': datetime.now()
         }
     
-    def schedule_crawls(self):
-        """Configure le planificateur"""
-        sources = self.get_sources(enabled_only=True)
-        
-        for source in sources:
-            source_id = source['_id']
-            frequency = source['frequency']
-            schedule_time = source.get('schedule_time', '09:00')
-            
-            if frequency == 'hourly':
-                schedule.every().hour.do(self.crawl_source, source_id)
-            elif frequency == 'daily':
-                schedule.every().day.at(schedule_time).do(self.crawl_source, source_id)
-            elif frequency == 'weekly':
-                schedule.every().week.at(schedule_time).do(self.crawl_source, source_id)
-            elif frequency == 'monthly':
-                schedule.every(30).days.at(schedule_time).do(self.crawl_source, source_id)
-        
-        logger.info(f"Planificateur configuré pour {len(sources)} sources")
-        
-        def run_scheduler():
-            while True:
-                schedule.run_pending()
-                time.sleep(60)
+    def schedule_crawls(self, max_workers=SCHEDULER_WORKERS, job_queue=None):
+        """Démarre le planificateur des sources actives
         
-        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        scheduler_thread.start()
-        logger.info("Planificateur démarré")
+        Avec job_queue (crawler.jobs.JobQueue), les crawls échus sont mis en
+        file pour les workers au lieu d'être exécutés dans ce processus.
+        """
+        self.scheduler = CrawlScheduler(self, max_workers=max_workers, job_queue=job_queue)
+        self.scheduler.start()
+        return self.scheduler
     
     def close(self):
         """Ferme la connexion MongoDB"""
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.extractor.close()
+        self.http.close()
+        if self.search_index is not None:
+            self.search_index.close()
+        if self.archive is not None:
+            self.archive.close()
         self.client.close()
         logger.info("Connexion fermée")
 
 
-def main():
+def print_crawl_event(event):
+    """Affiche un événement de iter_crawl_all_sources"""
+    kind = event['event']
+    if kind == 'started':
+        print(f"→ {event['url']}")
+    elif kind == 'progress':
+        print(f"  … {event['url']}: {event['collected']} pages collectées, "
+              f"{event['fetched']} téléchargées", end='\r', flush=True)
+    elif kind == 'finished':
+        stats = event['stats']
+        status = f"erreur: {stats['error']}" if stats.get('error') else f"{stats['stored']} éléments"
+        print(f"✓ {event['url']}: {status} en {stats['elapsed']:.1f}s" + ' ' * 20)
+    elif kind == 'summary':
+        budget = event['budget']
+        print(f"\n{event['sources']} sources en {event['elapsed']:.1f}s "
+              f"(au plus {budget['peak']}/{budget['limit']} requêtes en vol)")
+
+
+def crawl_all(crawler, source_ids=None, budget=CRAWL_ALL_BUDGET, max_parallel=CRAWL_ALL_PARALLEL):
+    """Crawl parallèle des sources avec affichage de la progression"""
+    sources = source_ids or crawler.get_sources(enabled_only=True)
+    print(f"\nCrawl de {len(sources)} sources ({max_parallel} en parallèle, "
+          f"{budget} requêtes en vol au plus)...")
+    results = crawler.crawl_all_sources(source_ids, budget, max_parallel, progress=print_crawl_event)
+    total = sum(stats['stored'] for stats in results.values())
+    print(f"✓ Total: {total} éléments")
+    return results
+
+
+def main(argv=None):
+    """Interface console : menu interactif ou commande crawl-all"""
+    parser = argparse.ArgumentParser(description="Web crawler configurable")
+    commands = parser.add_subparsers(dest='command')
+    crawl_all_parser = commands.add_parser(
+        'crawl-all', help="crawle les sources actives en parallèle puis quitte")
+    crawl_all_parser.add_argument('--source', action='append', dest='sources',
+                                  help="ID d'une source (répétable, défaut : toutes les actives)")
+    crawl_all_parser.add_argument('--budget', type=int, default=CRAWL_ALL_BUDGET,
+                                  help="requêtes en vol au total")
+    crawl_all_parser.add_argument('--parallel', type=int, default=CRAWL_ALL_PARALLEL,
+                                  help="sources crawlées en même temps")
+    args = parser.parse_args(argv)
+    
+    if args.command == 'crawl-all':
+        crawler = WebCrawler()
+        try:
+            crawl_all(crawler, args.sources, args.budget, args.parallel)
+        except KeyboardInterrupt:
+            print("\nInterrompu")
+        finally:
+            crawler.close()
+        return
+    
+    interactive()
+
+
+def interactive():
     """Interface console interactive"""
     print("=" * 60)
     print("SYSTÈME DE WEB CRAWLER CONFIGURABLE")
@@ -392,11 +1294,20 @@ def main():
             print("\n--- AJOUTER UNE SOURCE ---")
             url = input("URL: ").strip()
             source_type = input("Type [website]: ").strip() or 'website'
-            frequency = input("Fréquence [daily]: ").strip() or 'daily'
+            frequency = input("Fréquence [hourly/daily/weekly/monthly/adaptive] [daily]: ").strip() or 'daily'
             schedule_time = input("Heure [09:00]: ").strip() or '09:00'
             max_hits = int(input("Max pages [100]: ").strip() or '100')
             content_types_input = input("Types [html,text]: ").strip() or 'html,text'
             content_types = [ct.strip() for ct in content_types_input.split(',')]
+            keywords_input = input("Mots-clés (séparés par des virgules) []: ").strip()
+            keywords = [k.strip() for k in keywords_input.split(',') if k.strip()]
+            strategy = 'bfs'
+            if keywords and input("Crawl focalisé sur les mots-clés ? [o/N]: ").strip().lower() == 'o':
+                strategy = 'best_first'
+            discovery = input("Découverte [links/feed/sitemap] [links]: ").strip() or 'links'
+            discovery_url = None
+            if discovery != 'links':
+                discovery_url = input("URL du flux ou du sitemap [auto]: ").strip() or None
             
             source_id = crawler.add_source(
                 url=url,
@@ -404,7 +1315,11 @@ def main():
                 frequency=frequency,
                 schedule_time=schedule_time,
                 max_hits=max_hits,
-                content_types=content_types
+                content_types=content_types,
+                keywords=keywords,
+                strategy=strategy,
+                discovery=discovery,
+                discovery_url=discovery_url
             )
             print(f"\n✓ Source ajoutée! ID: {source_id}")
         
@@ -416,32 +1331,45 @@ def main():
                 print(f"   URL: {source['url']}")
                 print(f"   Type: {source['type']}")
                 print(f"   Fréquence: {source['frequency']}")
+                if source.get('recrawl'):
+                    print(f"   Recrawl: toutes les {source['recrawl']['interval'] / 3600:.1f} h "
+                          f"({source['recrawl']['reason']})")
+                print(f"   Découverte: {source.get('discovery', 'links')}")
                 print(f"   Actif: {'Oui' if source['enabled'] else 'Non'}")
                 print(f"   Dernier crawl: {source.get('last_crawl', 'Jamais')}")
         
         elif choice == '3':
             source_id = input("\nID de la source: ").strip()
-            count = crawler.crawl_source(source_id)
-            print(f"\n✓ {count} éléments collectés")
+            replay = False
+            if crawler.archive is not None:
+                replay = input("Rejouer depuis l'archive ? [o/N]: ").strip().lower() == 'o'
+            stats = crawler.crawl_source(source_id, replay=replay)
+            print(f"\n✓ {stats['stored']} éléments collectés")
+            print(f"   Téléchargés: {stats.get('fetched', 0)}, "
+                  f"non modifiés: {stats.get('not_modified', 0)}, "
+                  f"inchangés: {stats.get('unchanged', 0)}, "
+                  f"quasi-doublons: {stats.get('near_duplicates', 0) + stats.get('near_duplicates_marked', 0)}")
         
         elif choice == '4':
-            sources = crawler.get_sources(enabled_only=True)
-            print(f"\nCrawl de {len(sources)} sources...")
-            total = 0
-            for source in sources:
-                count = crawler.crawl_source(source['_id'])
-                total += count
-            print(f"\n✓ Total: {total} éléments")
+            crawl_all(crawler)
         
         elif choice == '5':
             query = input("\nRecherche: ").strip()
-            results = crawler.search_data(query)
-            print(f"\n--- RÉSULTATS ({len(results)}) ---")
-            for i, result in enumerate(results[:10], 1):
-                print(f"\n{i}. {result['title']}")
-                print(f"   URL: {result['url']}")
-                print(f"   Type: {result['content_type']}")
-                print(f"   Extrait: {result['content'][:150]}...")
+            cursor = None
+            shown = 0
+            while True:
+                page = crawler.search(query, limit=10, cursor=cursor)
+                if not shown:
+                    print(f"\n--- RÉSULTATS ({page['total']}) ---")
+                for i, result in enumerate(page['results'], shown + 1):
+                    print(f"\n{i}. {result['title']}")
+                    print(f"   URL: {result['url']}")
+                    print(f"   Type: {result['content_type']}")
+                    print(f"   Extrait: {result['snippet']}")
+                shown += len(page['results'])
+                cursor = page['next_cursor']
+                if not cursor or input("\nPage suivante ? [o/N]: ").strip().lower() != 'o':
+                    break
         
         elif choice == '6':
             stats = crawler.get_statistics()
@@ -449,6 +1377,14 @@ def main():
             print(f"Total sources: {stats['total_sources']}")
             print(f"Sources actives: {stats['active_sources']}")
             print(f"Total données: {stats['total_data']}")
+            for host, http in stats['http']['hosts'].items():
+                print(f"   {host}: {http['requests']} requêtes, "
+                      f"{http['connections']} connexions "
+                      f"(réutilisation {http['reuse_rate']:.0%}, "
+                      f"établissement {http['handshake_avg_ms']:.1f} ms)")
+            for host, rate in stats['politeness'].items():
+                print(f"   {host}: débit {rate['rate']:.2f} req/s (max {rate['max_rate']:.2f}), "
+                      f"{rate['throttled']} ralentissement(s), latence {rate['latency_ms']:.0f} ms")
         
         elif choice == '7':
             source_id = input("\nID à supprimer: ").strip()
@@ -459,13 +1395,18 @@ def main():
         
         elif choice == '8':
             print("\nDémarrage du planificateur...")
-            crawler.schedule_crawls()
+            scheduler = crawler.schedule_crawls()
             print("✓ Actif (Ctrl+C pour arrêter)")
             try:
                 while True:
                     time.sleep(1)
             except KeyboardInterrupt:
+                stats = scheduler.stats()
+                scheduler.stop()
+                crawler.scheduler = None
                 print("\n\nArrêté")
+                print(f"Retard moyen au démarrage: {stats['lag_avg']:.1f}s "
+                      f"(p95 {stats['lag_p95']:.1f}s, max {stats['lag_max']:.1f}s)")
         
         elif choice == '9':
             crawler.close()
@@ -0,0 +1,148 @@
+"""Worker de crawl : prend des jobs dans la collection MongoDB `jobs`.
+
+Plusieurs workers (sur une ou plusieurs machines) peuvent tourner en même
+temps sur la même base :
+
+    python -m crawler.worker                 # un worker
+    python -m crawler.worker --processes 4   # quatre processus locaux
+    python -m crawler.worker --enqueue-all   # met en file toutes les sources actives
+    python -m crawler.worker --schedule      # planificateur qui alimente la file
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+
+from config.settings import JOB_POLL_INTERVAL
+from crawler.jobs import JobQueue
+from crawler.web_crawler import WebCrawler
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlWorker:
+    """Boucle lease → crawl_source → complete, avec heartbeat pendant le crawl"""
+
+    def __init__(self, crawler, queue, worker_id=None, poll_interval=JOB_POLL_INTERVAL):
+        self.crawler = crawler
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self._stop = threading.Event()
+
+    def _heartbeat(self, job, done):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not done.wait(interval):
+            if not self.queue.heartbeat(job['_id'], self.worker_id):
+                logger.warning(f"Bail perdu pour le job {job['_id']} ({job['source_id']})")
+                return
+
+    def process(self, job):
+        """Exécute un job en maintenant son bail"""
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, done), daemon=True)
+        heartbeat.start()
+        try:
+            result = self.crawler.crawl_source(job['source_id'])
+            if result.get('error'):
+                # Crawl échoué : nouvelle tentative avec backoff
+                logger.error(f"Échec job {job['_id']}: {result['error']}")
+                self.queue.fail(job['_id'], self.worker_id, result['error'])
+            else:
+                self.queue.complete(job['_id'], self.worker_id, result)
+        except Exception as e:
+            logger.error(f"Erreur job {job['_id']}: {e}")
+            self.queue.fail(job['_id'], self.worker_id, e)
+        finally:
+            done.set()
+            heartbeat.join()
+        self.processed += 1
+
+    def run(self, max_jobs=None, exit_when_idle=False):
+        """Traite des jobs jusqu'à stop(), max_jobs, ou file vide si exit_when_idle"""
+        logger.info(f"Worker {self.worker_id} démarré")
+        while not self._stop.is_set():
+            if max_jobs is not None and self.processed >= max_jobs:
+                break
+            job = self.queue.lease(self.worker_id)
+            if job is None:
+                if exit_when_idle:
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            logger.info(f"Worker {self.worker_id}: job {job['_id']} (source {job['source_id']})")
+            self.process(job)
+        logger.info(f"Worker {self.worker_id} arrêté ({self.processed} jobs)")
+        return self.processed
+
+    def stop(self):
+        self._stop.set()
+
+
+def run_worker(mongo_uri, db_name, exit_when_idle=False):
+    """Point d'entrée d'un processus worker"""
+    crawler = WebCrawler(mongo_uri=mongo_uri, db_name=db_name)
+    try:
+        worker = CrawlWorker(crawler, JobQueue(crawler.db))
+        return worker.run(exit_when_idle=exit_when_idle)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        crawler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de crawl distribué")
+    parser.add_argument('--mongo-uri', default="mongodb://localhost:27017/")
+    parser.add_argument('--db', default="web_crawler_db")
+    parser.add_argument('--processes', type=int, default=1, help="nombre de workers locaux")
+    parser.add_argument('--enqueue-all', action='store_true',
+                        help="met en file toutes les sources actives puis quitte")
+    parser.add_argument('--schedule', action='store_true',
+                        help="planifie les sources en alimentant la file de jobs")
+    parser.add_argument('--exit-when-idle', action='store_true')
+    args = parser.parse_args()
+
+    if args.enqueue_all or args.schedule:
+        crawler = WebCrawler(mongo_uri=args.mongo_uri, db_name=args.db)
+        queue = JobQueue(crawler.db)
+        try:
+            if args.enqueue_all:
+                added = sum(queue.enqueue(s['_id']) for s in crawler.get_sources(enabled_only=True))
+                print(f"✓ {added} job(s) ajouté(s)")
+                return
+            crawler.schedule_crawls(job_queue=queue)
+            print("✓ Planificateur actif (Ctrl+C pour arrêter)")
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\nArrêté")
+        finally:
+            crawler.close()
+        return
+
+    if args.processes <= 1:
+        run_worker(args.mongo_uri, args.db, args.exit_when_idle)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.mongo_uri, args.db, args.exit_when_idle))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
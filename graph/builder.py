@@ -8,6 +8,146 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _name_key(name) -> str:
+    """Nom normalisé pour les comparaisons (espaces autour et casse ignorés)"""
+    return str(name or '').strip().lower()
+
+
+def _entity_key(ent: dict) -> tuple:
+    return ('entity', _name_key(ent.get('name')), str(ent.get('type', 'Unknown')).strip())
+
+
+def _relation_key(rel: dict) -> tuple:
+    return ('relation', _name_key(rel.get('source')), _name_key(rel.get('target')),
+            str(rel.get('type', 'related_to')).strip())
+
+
+class IncrementalGraph:
+    """Graphe construit entité par entité, relation par relation
+    
+    Les relations peuvent arriver avant leurs entités (réponse en
+    streaming) : une extrémité inconnue crée un nœud 'Unknown', dont le
+    type est corrigé si l'entité arrive ensuite. Un objet déjà ajouté
+    (mêmes clés que la fusion des blocs : nom et type, ou source, cible et
+    type, casse ignorée) est ignoré.
+    """
+    
+    def __init__(self, source_url: str):
+        self.source_url = source_url
+        self.nodes = []
+        self.edges = []
+        # Dictionnaires pour normaliser les noms (insensible à la casse)
+        self._node_names = {}
+        self._node_names_lower = {}
+        self._placeholders = set()  # noms des nœuds créés par une relation
+        self._keys = set()          # objets déjà ajoutés
+    
+    def _add_node(self, node: Node):
+        self.nodes.append(node)
+        self._node_names[node.name] = node
+        self._node_names_lower[node.name.lower()] = node.name
+    
+    def add(self, key: str, obj: dict):
+        """Ajoute un objet d'extraction ('entities' ou 'relations') ; retourne les éléments créés"""
+        if key == 'entities':
+            return self.add_entity(obj)
+        return self.add_relation(obj)
+    
+    def add_entity(self, ent: dict) -> list:
+        """Ajoute une entité ; retourne le nœud créé ([] si invalide ou déjà créée par une relation)"""
+        try:
+            if not isinstance(ent, dict):
+                return []
+            
+            # Extraire le nom et le type
+            name = ent.get('name', '')
+            ent_type = ent.get('type', 'Unknown')
+            
+            # Convertir en string et nettoyer
+            if not name:
+                return []
+            
+            name = str(name).strip()
+            ent_type = str(ent_type).strip()
+            
+            if not name:  # Vérifier après strip
+                return []
+            
+            key = _entity_key(ent)
+            if key in self._keys:
+                return []
+            self._keys.add(key)
+            
+            # Nœud créé par une relation arrivée avant l'entité
+            known = self._node_names_lower.get(name.lower(), name)
+            if known in self._placeholders:
+                self._placeholders.discard(known)
+                known = self._node_names[known]
+                known.type = ent_type
+                known.metadata = ent.get('metadata', None)
+                return []
+            
+            node = Node(name=name, type=ent_type, metadata=ent.get('metadata', None))
+            self._add_node(node)
+            return [node]
+            
+        except Exception as e:
+            logger.warning(f"Erreur création nœud: {e} - Entité: {ent}")
+            return []
+    
+    def add_relation(self, rel: dict) -> list:
+        """Ajoute une relation ; retourne les nœuds 'Unknown' et l'arête créés"""
+        try:
+            if not isinstance(rel, dict):
+                return []
+            
+            source = str(rel.get('source', '')).strip()
+            target = str(rel.get('target', '')).strip()
+            rel_type = str(rel.get('type', 'related_to')).strip()
+            
+            if not source or not target:
+                return []
+            
+            key = _relation_key(rel)
+            if key in self._keys:
+                return []
+            self._keys.add(key)
+            
+            created = []
+            ends = []
+            for name in (source, target):
+                # Essayer de trouver le nœud (insensible à la casse)
+                normalized = self._node_names_lower.get(name.lower(), name)
+                
+                # Si le nœud n'existe pas, le créer
+                if normalized not in self._node_names:
+                    node = Node(name=name, type='Unknown', metadata=None)
+                    self._add_node(node)
+                    self._placeholders.add(name)
+                    created.append(node)
+                    normalized = name
+                ends.append(normalized)
+            
+            edge = Edge(source=ends[0], target=ends[1], type=rel_type,
+                        weight=float(rel.get('weight', 1.0)))
+            self.edges.append(edge)
+            return created + [edge]
+            
+        except Exception as e:
+            logger.warning(f"Erreur création arête: {e} - Relation: {rel}")
+            return []
+    
+    def graph(self) -> Graph:
+        """Graphe courant (copie des listes de nœuds et d'arêtes)"""
+        return Graph(
+            nodes=list(self.nodes),
+            edges=list(self.edges),
+            source_url=self.source_url,
+            created_at=datetime.now()
+        )
+
+
 class GraphBuilder:
     def __init__(self):
         try:
@@ -18,10 +158,18 @@ class GraphBuilder:
             self.graphs = self.db['graphs']
             self.nodes = self.db['nodes']
             self.edges = self.db['edges']
+            # Blocs de chaque page et extractions rattachées à chaque bloc
+            self.page_blocks = self.db['page_blocks']
+            self.block_extractions = self.db['block_extractions']
             
             try:
                 self.graphs.create_index('source_url')
                 self.graphs.create_index('created_at')
+                self.page_blocks.create_index('source_url', unique=True)
+                self.block_extractions.create_index(
+                    [('source_url', pymongo.ASCENDING), ('block', pymongo.ASCENDING)],
+                    unique=True
+                )
             except:
                 pass
                 
@@ -36,108 +184,44 @@ class GraphBuilder:
         if not knowledge:
             return Graph(nodes=[], edges=[], source_url=source_url, created_at=datetime.now())
         
+        incremental = IncrementalGraph(source_url)
+        
         # ===== CONSTRUIRE LES NŒUDS =====
-        nodes = []
         entities = knowledge.get('entities', [])
-        
         if not isinstance(entities, list):
             entities = []
-        
         for ent in entities:
-            try:
-                if not isinstance(ent, dict):
-                    continue
-                
-                # Extraire le nom et le type
-                name = ent.get('name', '')
-                ent_type = ent.get('type', 'Unknown')
-                
-                # Convertir en string et nettoyer
-                if not name:
-                    continue
-                
-                name = str(name).strip()
-                ent_type = str(ent_type).strip()
-                
-                if not name:  # Vérifier après strip
-                    continue
-                
-                node_data = {
-                    'name': name,
-                    'type': ent_type,
-                    'metadata': ent.get('metadata', None)
-                }
-                
-                nodes.append(Node(**node_data))
-                
-            except Exception as e:
-                logger.warning(f"Erreur création nœud: {e} - Entité: {ent}")
-                continue
+            incremental.add_entity(ent)
         
         # ===== CONSTRUIRE LES ARÊTES =====
-        edges = []
         relations = knowledge.get('relations', [])
-        
         if not isinstance(relations, list):
             relations = []
-        
-        # Créer un dictionnaire pour normaliser les noms (insensible à la casse)
-        node_names = {n.name: n.name for n in nodes}
-        node_names_lower = {n.name.lower(): n.name for n in nodes}
-        
         for rel in relations:
-            try:
-                if not isinstance(rel, dict):
-                    continue
-                
-                source = str(rel.get('source', '')).strip()
-                target = str(rel.get('target', '')).strip()
-                rel_type = str(rel.get('type', 'related_to')).strip()
-                
-                if not source or not target:
-                    continue
-                
-                # Essayer de trouver les nœuds (insensible à la casse)
-                source_normalized = node_names_lower.get(source.lower(), source)
-                target_normalized = node_names_lower.get(target.lower(), target)
-                
-                # Si les nœuds n'existent pas, les créer
-                if source_normalized not in node_names:
-                    new_node = Node(name=source, type='Unknown', metadata=None)
-                    nodes.append(new_node)
-                    node_names[source] = source
-                    node_names_lower[source.lower()] = source
-                    source_normalized = source
-                
-                if target_normalized not in node_names:
-                    new_node = Node(name=target, type='Unknown', metadata=None)
-                    nodes.append(new_node)
-                    node_names[target] = target
-                    node_names_lower[target.lower()] = target
-                    target_normalized = target
-                
-                edge_data = {
-                    'source': source_normalized,
-                    'target': target_normalized,
-                    'type': rel_type,
-                    'weight': float(rel.get('weight', 1.0))
-                }
-                
-                edges.append(Edge(**edge_data))
-                
-            except Exception as e:
-                logger.warning(f"Erreur création arête: {e} - Relation: {rel}")
-                continue
+            incremental.add_relation(rel)
         
-        print(f"   📊 Graphe généré : {len(nodes)} nœuds, {len(edges)} liens")
-        logger.info(f"Graphe créé: {len(nodes)} nœuds, {len(edges)} arêtes")
-        
-        return Graph(
-            nodes=nodes,
-            edges=edges,
-            source_url=source_url,
-            created_at=datetime.now()
-        )
+        graph = incremental.graph()
+        print(f"   📊 Graphe généré : {len(graph.nodes)} nœuds, {len(graph.edges)} liens")
+        logger.info(f"Graphe créé: {len(graph.nodes)} nœuds, {len(graph.edges)} arêtes")
+        return graph
+    
+    def _graph_doc(self, graph: Graph) -> dict:
+        return {
+            'source_url': graph.source_url,
+            'created_at': graph.created_at,
+            'nodes': [
+                {'name': str(n.name), 'type': str(n.type), 'metadata': n.metadata} 
+                for n in graph.nodes
+            ],
+            'edges': [
+                {'source': str(e.source), 'target': str(e.target), 'type': str(e.type), 'weight': float(e.weight)} 
+                for e in graph.edges
+            ],
+            'stats': {
+                'num_nodes': len(graph.nodes),
+                'num_edges': len(graph.edges),
+            }
+        }
     
     def save_graph(self, graph: Graph):
         """Sauvegarde dans MongoDB"""
@@ -145,24 +229,7 @@ class GraphBuilder:
             if not graph.nodes:
                 return None
             
-            graph_doc = {
-                'source_url': graph.source_url,
-                'created_at': graph.created_at,
-                'nodes': [
-                    {'name': str(n.name), 'type': str(n.type), 'metadata': n.metadata} 
-                    for n in graph.nodes
-                ],
-                'edges': [
-                    {'source': str(e.source), 'target': str(e.target), 'type': str(e.type), 'weight': float(e.weight)} 
-                    for e in graph.edges
-                ],
-                'stats': {
-                    'num_nodes': len(graph.nodes),
-                    'num_edges': len(graph.edges),
-                }
-            }
-            
-            result = self.graphs.insert_one(graph_doc)
+            result = self.graphs.insert_one(self._graph_doc(graph))
             graph_id = str(result.inserted_id)
             logger.info(f"Graphe sauvegardé: {graph_id}")
             return graph_id
@@ -172,6 +239,139 @@ class GraphBuilder:
             print(f"   ❌ Erreur sauvegarde: {e}")
             return None
     
+    def known_blocks(self, source_url: str):
+        """Empreintes des blocs de la page au passage précédent (None si jamais extraite)"""
+        doc = self.page_blocks.find_one({'source_url': source_url})
+        return doc['blocks'] if doc else None
+    
+    def _attribute(self, knowledge: dict, blocks) -> dict:
+        """Rattache chaque entité / relation aux blocs dont le texte la mentionne
+        
+        Une entité ou relation introuvable dans le texte (nom reformulé par
+        le LLM) est rattachée à tous les blocs envoyés.
+        """
+        texts = {block.hash: block.text.lower() for block in blocks}
+        attributed = {h: {'entities': [], 'relations': []} for h in texts}
+        
+        def mentioned(*names):
+            names = [_name_key(n) for n in names]
+            found = [h for h, text in texts.items() if any(n and n in text for n in names)]
+            return found or list(texts)
+        
+        for ent in knowledge.get('entities', []):
+            if isinstance(ent, dict) and ent.get('name'):
+                for h in mentioned(ent['name']):
+                    attributed[h]['entities'].append(ent)
+        for rel in knowledge.get('relations', []):
+            if isinstance(rel, dict) and rel.get('source') and rel.get('target'):
+                for h in mentioned(rel['source'], rel['target']):
+                    attributed[h]['relations'].append(rel)
+        return attributed
+    
+    def _block_knowledge(self, source_url: str, hashes, extra: dict = None) -> dict:
+        """Union des extractions de blocs d'une page (et de extra), sans doublons"""
+        entities, relations = {}, {}
+        docs = list(self.block_extractions.find({'source_url': source_url, 'block': {'$in': hashes}}))
+        if extra:
+            docs.append(extra)
+        for doc in docs:
+            for ent in doc.get('entities', []):
+                entities.setdefault(_entity_key(ent), ent)
+            for rel in doc.get('relations', []):
+                relations.setdefault(_relation_key(rel), rel)
+        return {'entities': list(entities.values()), 'relations': list(relations.values())}
+    
+    def start_page_graph(self, source_url: str, plan) -> IncrementalGraph:
+        """Graphe d'une page avant l'extraction de ses blocs modifiés
+        
+        Contient les extractions des blocs inchangés ; les objets des blocs
+        modifiés y sont ajoutés au fil de la réponse du LLM
+        (BatchExtractor, on_item), puis update_page_graph le termine.
+        """
+        changed = {block.hash for block in plan.changed_blocks}
+        unchanged = [block.hash for block in plan.blocks if block.hash not in changed]
+        graph = IncrementalGraph(source_url)
+        knowledge = self._block_knowledge(source_url, unchanged) if unchanged else {}
+        for key in ('entities', 'relations'):
+            for obj in knowledge.get(key, []):
+                graph.add(key, obj)
+        return graph
+    
+    def update_page_graph(self, source_url: str, plan, knowledge: dict,
+                          graph: IncrementalGraph = None) -> Graph:
+        """Fusionne l'extraction des blocs modifiés avec le graphe précédent de la page
+        
+        plan : preprocessing.blocks.ExtractionPlan. Les extractions des
+        blocs modifiés remplacent les anciennes, celles des blocs disparus
+        sont retirées, celles des blocs inchangés sont conservées. Le graphe
+        de la page (un document par source_url) est reconstruit à partir des
+        extractions de ses blocs actuels.
+        
+        Si l'extraction a échoué (clé 'error'), rien n'est enregistré pour
+        les blocs modifiés, ni extraction ni empreinte : ils seront renvoyés
+        au LLM au prochain passage. Les objets récupérés d'une réponse
+        incomplète figurent seulement dans le graphe retourné.
+        
+        graph : graphe commencé par start_page_graph pendant l'extraction ;
+        il est complété avec knowledge au lieu d'être reconstruit.
+        """
+        now = datetime.now()
+        current = [block.hash for block in plan.blocks]
+        failed = knowledge.get('error')
+        pending = {block.hash for block in plan.changed_blocks} if failed else set()
+        
+        operations = [] if failed else [
+            pymongo.UpdateOne(
+                {'source_url': source_url, 'block': block_hash},
+                {'$set': {**extracted, 'updated_at': now}},
+                upsert=True
+            )
+            for block_hash, extracted in self._attribute(knowledge, plan.changed_blocks).items()
+        ]
+        if operations:
+            self.block_extractions.bulk_write(operations, ordered=False)
+        retired = self.block_extractions.delete_many(
+            {'source_url': source_url, 'block': {'$nin': current}}
+        ).deleted_count
+        self.page_blocks.update_one(
+            {'source_url': source_url},
+            {'$set': {'blocks': [h for h in current if h not in pending], 'updated_at': now}},
+            upsert=True
+        )
+        
+        if retired:
+            logger.info(f"{retired} extraction(s) de blocs disparus retirée(s): {source_url}")
+        
+        if graph is not None:
+            # Objets déjà reçus ignorés : seuls manquent ceux non streamés
+            for key in ('entities', 'relations'):
+                for obj in knowledge.get(key, []):
+                    graph.add(key, obj)
+            graph = graph.graph()
+            print(f"   📊 Graphe généré : {len(graph.nodes)} nœuds, {len(graph.edges)} liens")
+            logger.info(f"Graphe créé: {len(graph.nodes)} nœuds, {len(graph.edges)} arêtes")
+            return graph
+        
+        # Union des extractions des blocs actuels, sans doublons
+        return self.build_graph(
+            self._block_knowledge(source_url, current, knowledge if failed else None),
+            source_url
+        )
+    
+    def save_page_graph(self, graph: Graph):
+        """Remplace le graphe courant d'une page (extraction incrémentale)"""
+        try:
+            doc = {**self._graph_doc(graph), 'incremental': True}
+            result = self.graphs.find_one_and_replace(
+                {'source_url': graph.source_url, 'incremental': True}, doc,
+                upsert=True, return_document=pymongo.ReturnDocument.AFTER
+            )
+            return str(result['_id'])
+        except Exception as e:
+            logger.error(f"Erreur sauvegarde: {e}")
+            print(f"   ❌ Erreur sauvegarde: {e}")
+            return None
+    
     def get_all_graphs(self):
         """Récupère tous les graphes"""
         try:
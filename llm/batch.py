@@ -0,0 +1,245 @@
+"""Extraction par lots : plusieurs appels au LLM en parallèle, sous budget.
+
+Les appels partent d'un pool de threads (call_groq est bloquant) et
+chaque appel réserve d'abord sa part des budgets de requêtes et de tokens
+par minute du compte (fenêtre glissante de 60 s). Les tokens du prompt
+sont estimés avant l'envoi, la réponse attendue est réservée d'avance,
+puis la réservation est corrigée avec l'usage réel renvoyé par l'API.
+
+Les textes longs sont découpés en morceaux (preprocessing.chunker),
+extraits en parallèle puis fusionnés par texte : la latence d'un long
+document est celle de son morceau le plus lent. Avec packing, les textes
+courts consécutifs sont regroupés dans un même appel (llm.packing), ce
+qui économise requêtes et tokens de consignes.
+
+Avec streaming, les réponses sont reçues en flux : une connexion coupée
+en cours de génération garde le texte déjà reçu, dont les objets complets
+sont récupérés (llm.json_stream) au lieu de perdre l'appel. Un rappel
+on_item reçoit chaque entité ou relation dès que le LLM l'a terminée,
+pour construire le graphe pendant la génération.
+"""
+import threading
+import time
+from collections import deque
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config.settings import (
+    LLM_CONCURRENCY, LLM_RPM, LLM_TPM, LLM_COMPLETION_TOKENS, LLM_PACKING, LLM_STREAMING,
+    MAX_TOKENS, CHUNK_TOKENS, CHUNK_OVERLAP
+)
+from llm.client import call_groq, stream_groq
+from llm.extractor import EXTRACTION_SYSTEM, build_prompt, cached_knowledge, remember_knowledge
+from llm.json_stream import KnowledgeStream
+from llm.packing import plan_packs, extract_pack
+from llm.tokens import estimate_tokens, MESSAGE_OVERHEAD
+from preprocessing.chunker import split_chunks, merge_knowledge
+
+class RateBudget:
+    """Requêtes et tokens par minute, sur une fenêtre glissante"""
+
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, window=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.waited = 0.0
+        self._entries = deque()   # [instant, tokens] des appels de la fenêtre
+        self._cond = threading.Condition()
+
+    def _purge(self, now):
+        while self._entries and now - self._entries[0][0] >= self.window:
+            self._entries.popleft()
+
+    def _full(self, tokens):
+        if self.rpm and len(self._entries) >= self.rpm:
+            return True
+        # Un appel plus gros que le budget passe seul, fenêtre vide
+        used = sum(entry[1] for entry in self._entries)
+        return bool(self.tpm and self._entries and used + tokens > self.tpm)
+
+    def acquire(self, tokens):
+        """Attend de la place dans la fenêtre ; retourne la réservation"""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._purge(now)
+                if not self._full(tokens):
+                    break
+                self._cond.wait(timeout=self._entries[0][0] + self.window - now)
+            entry = [now, tokens]
+            self._entries.append(entry)
+            self.waited += now - start
+            return entry
+
+    def adjust(self, entry, tokens):
+        """Remplace l'estimation d'une réservation par l'usage réel"""
+        with self._cond:
+            entry[1] = tokens
+            self._cond.notify_all()
+
+    def usage(self):
+        """Requêtes et tokens de la fenêtre courante"""
+        with self._cond:
+            self._purge(time.monotonic())
+            return len(self._entries), sum(entry[1] for entry in self._entries)
+
+
+class BatchExtractor:
+    """extract_knowledge sur plusieurs textes en parallèle, sous budgets RPM / TPM"""
+
+    def __init__(self, concurrency=LLM_CONCURRENCY, rpm=LLM_RPM, tpm=LLM_TPM,
+                 completion_tokens=LLM_COMPLETION_TOKENS, packing=LLM_PACKING,
+                 chunk_tokens=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP, streaming=LLM_STREAMING):
+        self.concurrency = max(1, concurrency)
+        self.packing = packing
+        self.streaming = streaming
+        self.truncated = 0
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.chunked_texts = 0
+        self.chunks = 0
+        self.budget = RateBudget(rpm, tpm)
+        self.completion_tokens = completion_tokens
+        self.calls = 0
+        self.estimated_tokens = 0
+        self.used_tokens = 0
+        self._lock = threading.Lock()
+
+    def estimate(self, prompt: str, documents: int = 1) -> int:
+        """Tokens réservés pour un appel : prompt, système et réponses attendues"""
+        return (estimate_tokens(EXTRACTION_SYSTEM) + estimate_tokens(prompt)
+                + 2 * MESSAGE_OVERHEAD + min(MAX_TOKENS, documents * self.completion_tokens))
+
+    def _call(self, prompt: str, documents: int = 1, on_item=None) -> str:
+        """Appel au LLM après réservation dans le budget
+        
+        on_item(clé, objet) est appelé pendant le streaming pour chaque
+        objet terminé de la réponse.
+        """
+        estimated = self.estimate(prompt, documents)
+        entry = self.budget.acquire(estimated)
+        usage = {}
+        if self.streaming:
+            stream = KnowledgeStream() if on_item else None
+            parts = []
+            for delta in stream_groq(prompt, system=EXTRACTION_SYSTEM, usage=usage):
+                parts.append(delta)
+                if stream is not None:
+                    for key, obj in stream.feed(delta):
+                        on_item(key, obj)
+            response = ''.join(parts)
+        else:
+            response = call_groq(prompt, system=EXTRACTION_SYSTEM, usage=usage)
+        used = usage.get('total_tokens', estimated)
+        self.budget.adjust(entry, used)
+        with self._lock:
+            self.calls += 1
+            self.estimated_tokens += estimated
+            self.used_tokens += used
+            if usage.get('finish_reason') == 'length':
+                self.truncated += 1
+        return response
+
+    def extract(self, text: str, on_item=None) -> dict:
+        """Une extraction, depuis le cache ou après réservation dans le budget"""
+        knowledge = cached_knowledge(text)
+        if knowledge is not None:
+            return knowledge
+        return remember_knowledge(text, self._call(build_prompt(text), on_item=on_item))
+
+    def _extract_unit(self, texts, indices, on_item=None):
+        if len(indices) == 1:
+            i = indices[0]
+            knowledge = self.extract(texts[i], on_item and (lambda key, obj: on_item(i, key, obj)))
+            results = [(i, knowledge)]
+        else:
+            knowledge = extract_pack(
+                [texts[i] for i in indices],
+                call=lambda prompt: self._call(prompt, len(indices)),
+                extract_one=self.extract,
+            )
+            results = list(zip(indices, knowledge))
+        if on_item is not None:
+            # Objets non streamés (cache, appel groupé, réponse non streamée) ;
+            # ceux déjà transmis le sont à nouveau, le graphe les ignore
+            for i, knowledge in results:
+                for key in ('entities', 'relations'):
+                    for obj in knowledge.get(key, []):
+                        on_item(i, key, obj)
+        return results
+
+    def _split(self, texts):
+        """Morceaux de tous les textes et indice du texte de chaque morceau"""
+        chunks, owners = [], []
+        for i, text in enumerate(texts):
+            parts = split_chunks(text, self.chunk_tokens, self.chunk_overlap) or [text]
+            if len(parts) > 1:
+                self.chunked_texts += 1
+            self.chunks += len(parts)
+            chunks.extend(parts)
+            owners.extend([i] * len(parts))
+        return chunks, owners
+
+    def as_completed(self, texts, on_item=None):
+        """Produit (indice, connaissances) dans l'ordre de fin des textes
+        
+        Un texte est produit quand tous ses morceaux sont extraits. En mode
+        packing, les textes d'un même appel groupé arrivent ensemble.
+        
+        on_item(indice, clé, objet) reçoit chaque entité ou relation avant
+        la fin de son texte : en streaming dès que le LLM l'a terminée,
+        sinon à la fin de son appel. Il est appelé depuis les threads des
+        appels, éventuellement plusieurs fois pour un même objet.
+        """
+        chunks, owners = self._split(list(texts))
+        remaining = defaultdict(int)
+        for i in owners:
+            remaining[i] += 1
+        parts = defaultdict(dict)
+        
+        units = plan_packs(chunks) if self.packing else [[j] for j in range(len(chunks))]
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        item = on_item and (lambda j, key, obj: on_item(owners[j], key, obj))
+        futures = [executor.submit(self._extract_unit, chunks, indices, item) for indices in units]
+        try:
+            for future in as_completed(futures):
+                for j, knowledge in future.result():
+                    i = owners[j]
+                    parts[i][j] = knowledge
+                    remaining[i] -= 1
+                    if remaining[i]:
+                        continue
+                    extracted = parts.pop(i)
+                    done = [extracted[j] for j in sorted(extracted)]
+                    yield i, done[0] if len(done) == 1 else merge_knowledge(done)
+        finally:
+            # Arrêt anticipé : les appels non démarrés sont annulés
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def map(self, texts) -> list:
+        """Connaissances de chaque texte, dans l'ordre des textes"""
+        texts = list(texts)
+        results = [None] * len(texts)
+        for i, knowledge in self.as_completed(texts):
+            results[i] = knowledge
+        return results
+
+    def stats(self):
+        requests, tokens = self.budget.usage()
+        return {
+            'calls': self.calls,
+            'chunked_texts': self.chunked_texts,
+            'chunks': self.chunks,
+            'truncated': self.truncated,
+            'estimated_tokens': self.estimated_tokens,
+            'used_tokens': self.used_tokens,
+            'budget_wait': self.budget.waited,
+            'window_requests': requests,
+            'window_tokens': tokens,
+        }
+
+
+def extract_knowledge_batch(texts, **kwargs) -> list:
+    """Extrait entités et relations de plusieurs textes, dans l'ordre des textes"""
+    return BatchExtractor(**kwargs).map(texts)
@@ -0,0 +1,158 @@
+"""Cache des extractions LLM : mémoire (LRU) devant une base SQLite locale.
+
+La clé est l'empreinte du texte normalisé, du modèle, de la température
+et de la version des consignes d'extraction : changer l'un d'eux donne
+d'autres clés, les anciennes entrées ne sont plus lues et finissent
+évincées. Les entrées expirent après ttl secondes ; au-delà de
+max_entries sur disque, les moins récemment utilisées sont supprimées.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config.settings import (
+    LLM_CACHE_PATH, LLM_CACHE_MEMORY, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Texte en forme NFC, espaces fusionnés"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(text: str, model: str, temperature: float, prompt_version: str) -> str:
+    """Empreinte d'une extraction"""
+    payload = json.dumps([normalize_text(text), model, temperature, prompt_version])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """Extractions (entités, relations) par clé, en mémoire puis sur disque"""
+
+    def __init__(self, path=LLM_CACHE_PATH, memory_size=LLM_CACHE_MEMORY,
+                 max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._memory = OrderedDict()   # clé -> (expiration, extraction)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS extractions (
+                    key TEXT PRIMARY KEY, value TEXT, created REAL, expires REAL, accessed REAL
+                );
+                CREATE INDEX IF NOT EXISTS extractions_accessed ON extractions (accessed);
+            """)
+            self._count = self._db.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+
+    def _remember(self, key, expires, value):
+        if not self.memory_size:
+            return
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Extraction en cache, ou None (absente ou expirée)"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+            row = None
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires FROM extractions WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE extractions SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        now = time.time()
+        expires = now + self.ttl if self.ttl else float('inf')
+        with self._lock:
+            self._remember(key, expires, value)
+            if self._db is None:
+                return
+            inserted = self._db.execute(
+                "INSERT OR REPLACE INTO extractions (key, value, created, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, expires, now)
+            ).rowcount
+            self._count += inserted
+            if self.max_entries and self._count > self.max_entries * 1.1:
+                self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+        """Supprime les entrées expirées puis les moins récemment utilisées"""
+        removed = self._db.execute("DELETE FROM extractions WHERE expires <= ?", (now,)).rowcount
+        self._count = self._db.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        if self._count > self.max_entries:
+            removed += self._db.execute(
+                "DELETE FROM extractions WHERE key IN ("
+                "SELECT key FROM extractions ORDER BY accessed LIMIT ?)",
+                (self._count - self.max_entries,)
+            ).rowcount
+            self._count = self.max_entries
+        self.evicted += removed
+        logger.info(f"Cache LLM : {removed} entrée(s) évincée(s)")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM extractions")
+                self._db.commit()
+                self._count = 0
+
+    def stats(self):
+        """Succès (dont mémoire), échecs, taux de succès et entrées"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'memory_hits': self.memory_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'entries': self._count if self._db is not None else len(self._memory),
+                'evicted': self.evicted,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
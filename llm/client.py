@@ -20,45 +20,111 @@ except Exception as e:
     print(f"❌ Erreur initialisation Groq: {e}")
     raise
 
-def call_groq(prompt: str, system: str = "") -> str:
-    """Appelle Groq API via OpenAI SDK"""
+def _messages(prompt: str, system: str = "") -> list:
+    """Messages de chat : système (si fourni) puis prompt utilisateur"""
+    messages = []
+    
+    # Ajouter le message système si fourni
+    if system:
+        messages.append({"role": "system", "content": system})
+    
+    # Ajouter le prompt utilisateur
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _fill_usage(usage: dict, source):
+    """Copie les tokens consommés d'une réponse (ou d'un dict) dans usage"""
+    if usage is None or source is None:
+        return
+    if isinstance(source, dict):
+        get = source.get
+    else:
+        def get(name):
+            return getattr(source, name, None)
+    if get('total_tokens') is None:
+        return
+    usage.update(
+        prompt_tokens=get('prompt_tokens'),
+        completion_tokens=get('completion_tokens'),
+        total_tokens=get('total_tokens'),
+    )
+
+
+def _report_error(e: Exception):
+    """Affiche une erreur d'appel avec un conseil selon son type"""
+    print(f"❌ Erreur appel Groq: {e}")
+    
+    # Messages d'aide selon le type d'erreur
+    error_str = str(e).lower()
+    if "authentication" in error_str or "api_key" in error_str:
+        print("→ Vérifiez votre GROQ_API_KEY dans .env")
+    elif "rate_limit" in error_str:
+        print("→ Trop de requêtes, attendez quelques secondes")
+    elif "model" in error_str:
+        print(f"→ Modèle '{MODEL}' non disponible")
+        print("   Modèles disponibles : llama-3.3-70b-versatile, mixtral-8x7b-32768")
+    elif "connection" in error_str:
+        print("→ Vérifiez votre connexion internet")
+
+
+def call_groq(prompt: str, system: str = "", usage: dict = None) -> str:
+    """Appelle Groq API via OpenAI SDK
+    
+    usage : dictionnaire optionnel rempli avec les tokens consommés
+    (prompt_tokens, completion_tokens, total_tokens) quand l'API les donne,
+    et finish_reason ("length" : réponse coupée à MAX_TOKENS).
+    """
     try:
-        messages = []
-        
-        # Ajouter le message système si fourni
-        if system:
-            messages.append({"role": "system", "content": system})
-        
-        # Ajouter le prompt utilisateur
-        messages.append({"role": "user", "content": prompt})
-        
         # Appel API
         response = client.chat.completions.create(
             model=MODEL,
-            messages=messages,
+            messages=_messages(prompt, system),
             max_tokens=MAX_TOKENS,
             temperature=TEMPERATURE,
         )
         
+        _fill_usage(usage, getattr(response, 'usage', None))
+        if usage is not None and response.choices[0].finish_reason:
+            usage['finish_reason'] = response.choices[0].finish_reason
+        
         return response.choices[0].message.content
     
     except Exception as e:
-        print(f"❌ Erreur appel Groq: {e}")
-        
-        # Messages d'aide selon le type d'erreur
-        error_str = str(e).lower()
-        if "authentication" in error_str or "api_key" in error_str:
-            print("→ Vérifiez votre GROQ_API_KEY dans .env")
-        elif "rate_limit" in error_str:
-            print("→ Trop de requêtes, attendez quelques secondes")
-        elif "model" in error_str:
-            print(f"→ Modèle '{MODEL}' non disponible")
-            print("   Modèles disponibles : llama-3.3-70b-versatile, mixtral-8x7b-32768")
-        elif "connection" in error_str:
-            print("→ Vérifiez votre connexion internet")
-        
+        _report_error(e)
         return ""
 
+
+def stream_groq(prompt: str, system: str = "", usage: dict = None):
+    """Appelle Groq en streaming : produit le texte de la réponse au fil de l'eau
+    
+    usage : comme pour call_groq, rempli à la fin du flux. Une erreur en cours de flux arrête la génération : le
+    texte déjà produit reste exploitable (llm.json_stream).
+    """
+    try:
+        stream = client.chat.completions.create(
+            model=MODEL,
+            messages=_messages(prompt, system),
+            max_tokens=MAX_TOKENS,
+            temperature=TEMPERATURE,
+            stream=True,
+        )
+        for chunk in stream:
+            # Groq donne l'usage dans le dernier morceau (x_groq), OpenAI dans usage
+            extra = getattr(chunk, 'model_extra', None) or {}
+            _fill_usage(usage, getattr(chunk, 'usage', None)
+                        or (extra.get('x_groq') or {}).get('usage'))
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if usage is not None and choice.finish_reason:
+                usage['finish_reason'] = choice.finish_reason
+            if choice.delta and choice.delta.content:
+                yield choice.delta.content
+    
+    except Exception as e:
+        _report_error(e)
+
 # Alias pour compatibilité
 call_claude = call_groq
 call_gemini = call_groq
@@ -1,6 +1,11 @@
+import hashlib
 import json
 import re
-from llm.client import call_groq
+from config.settings import MODEL, TEMPERATURE, LLM_CACHE_ENABLED
+from llm.cache import ExtractionCache, cache_key
+from llm.client import call_groq, stream_groq
+from llm.json_stream import KnowledgeStream, loads_lenient, salvage
+from preprocessing.chunker import split_chunks
 
 EXTRACTION_SYSTEM = """Tu es un expert en extraction d'informations structurées depuis du texte.
 
@@ -35,36 +40,188 @@ TEXTE À ANALYSER :
 Retourne UNIQUEMENT le JSON sans autre texte :
 """
 
+# Plusieurs documents courts dans un même appel (llm.packing)
+PACKED_PROMPT = """
+Analyse séparément chacun des documents ci-dessous et extrait ses entités et relations.
+Ne mélange pas les documents : une relation relie deux entités du même document.
+
+Format JSON attendu, un objet par document avec son id, même sans entité :
+{{
+  "documents": [
+    {{
+      "id": "D1",
+      "entities": [
+        {{"name": "Nom exact", "type": "Person|Location|Organization|Concept|Date|Technology"}}
+      ],
+      "relations": [
+        {{"source": "Entité source", "target": "Entité cible", "type": "type_relation"}}
+      ]
+    }}
+  ]
+}}
+
+DOCUMENTS À ANALYSER :
+
+{documents}
+
+Retourne UNIQUEMENT le JSON sans autre texte :
+"""
+
+# Version des consignes : les modifier invalide les extractions en cache
+PROMPT_VERSION = hashlib.sha256(
+    (EXTRACTION_SYSTEM + EXTRACTION_PROMPT + PACKED_PROMPT).encode('utf-8')
+).hexdigest()[:12]
+
+_cache = None
+
+
+class PartialResponse(ValueError):
+    """Réponse au JSON incomplet (coupée, mal formée) dont des objets sont récupérés"""
+    
+    def __init__(self, message, knowledge):
+        super().__init__(message)
+        self.knowledge = knowledge
+
+
+def build_prompt(text: str) -> str:
+    """Prompt d'extraction d'un texte (un morceau, voir preprocessing.chunker)"""
+    return EXTRACTION_PROMPT.format(text=text)
+
+
+def get_cache():
+    """Cache des extractions partagé par le processus (None si désactivé)"""
+    global _cache
+    if _cache is None and LLM_CACHE_ENABLED:
+        _cache = ExtractionCache()
+    return _cache
+
+
+def cached_knowledge(text: str):
+    """Extraction déjà connue d'un texte (None si absente du cache)"""
+    cache = get_cache()
+    if cache is None:
+        return None
+    knowledge = cache.get(cache_key(text, MODEL, TEMPERATURE, PROMPT_VERSION))
+    if knowledge is not None:
+        print(f"   ♻️  Extraction en cache: {len(knowledge['entities'])} entités, "
+              f"{len(knowledge['relations'])} relations")
+    return knowledge
+
+
+def remember_knowledge(text: str, response: str) -> dict:
+    """Parse une réponse du LLM et la met en cache si elle est valide
+    
+    Une extraction échouée porte une clé 'error', ce qui la distingue d'un
+    texte sans entité : réponse absente ou illisible (listes vides), ou
+    incomplète (objets récupérés). Elle n'est pas mise en cache : le
+    prochain passage retentera une extraction complète.
+    """
+    try:
+        knowledge = parse_knowledge(response, strict=True)
+    except PartialResponse as e:
+        return {**e.knowledge, "error": f"Réponse incomplète: {e}"}
+    except ValueError as e:
+        return {"entities": [], "relations": [], "error": str(e) or "Réponse illisible"}
+    cache_knowledge(text, knowledge)
+    return knowledge
+
+
+def cache_knowledge(text: str, knowledge: dict):
+    """Met en cache l'extraction valide d'un texte"""
+    cache = get_cache()
+    if cache is not None:
+        cache.put(cache_key(text, MODEL, TEMPERATURE, PROMPT_VERSION), knowledge)
+
+
 def extract_knowledge(text: str) -> dict:
-    """Extrait entités et relations avec Groq"""
+    """Extrait entités et relations avec Groq (ou depuis le cache)
+    
+    Un texte plus long qu'un morceau (CHUNK_TOKENS) est découpé, ses
+    morceaux extraits en parallèle puis fusionnés. Une extraction échouée
+    porte une clé 'error' (voir remember_knowledge).
+    """
+    if len(split_chunks(text)) > 1:
+        from llm.batch import BatchExtractor
+        return BatchExtractor().map([text])[0]
     
-    # Limiter la taille du texte
-    text = text[:6000]  # Groq/Llama gère bien jusqu'à 6000 chars
+    knowledge = cached_knowledge(text)
+    if knowledge is not None:
+        return knowledge
     
     # Préparer le prompt
-    prompt = EXTRACTION_PROMPT.format(text=text)
+    prompt = build_prompt(text)
     
     # Appeler Groq
     response = call_groq(prompt, system=EXTRACTION_SYSTEM)
+    return remember_knowledge(text, response)
+
+
+def stream_knowledge(text: str, usage: dict = None):
+    """Extrait entités et relations en streaming : produit (clé, objet) au fil de la réponse
+    
+    clé vaut 'entities' ou 'relations'. Chaque objet arrive dès que le LLM
+    l'a terminé, ce qui permet de construire le graphe pendant la
+    génération (graph.builder.IncrementalGraph). Un texte long est extrait
+    morceau par morceau, sans doublons entre morceaux. Seules les réponses
+    complètes sont mises en cache.
+    """
+    seen = set()
+    for chunk in split_chunks(text) or [text]:
+        knowledge = cached_knowledge(chunk)
+        if knowledge is not None:
+            items = [(key, obj) for key in ('entities', 'relations') for obj in knowledge[key]]
+        else:
+            items = _stream_items(chunk, usage)
+        for key, obj in items:
+            # Mêmes clés de fusion que preprocessing.chunker.merge_knowledge
+            if key == 'entities':
+                if not obj.get('name'):
+                    continue
+                ident = (key, str(obj['name']).strip().lower(), obj.get('type'))
+            else:
+                if not obj.get('source') or not obj.get('target'):
+                    continue
+                ident = (key, str(obj['source']).strip().lower(),
+                         str(obj['target']).strip().lower(), obj.get('type'))
+            if ident not in seen:
+                seen.add(ident)
+                yield key, obj
+
+
+def _stream_items(text: str, usage: dict = None):
+    """Objets d'une réponse en streaming, puis mise en cache si elle est complète"""
+    stream = KnowledgeStream()
+    for delta in stream_groq(build_prompt(text), system=EXTRACTION_SYSTEM, usage=usage):
+        yield from stream.feed(delta)
     
+    knowledge = stream.result()
+    if stream.complete and not stream.invalid:
+        cache_knowledge(text, knowledge)
+        print(f"   ✅ Extraction réussie: {len(knowledge['entities'])} entités, "
+              f"{len(knowledge['relations'])} relations")
+    elif knowledge['entities'] or knowledge['relations']:
+        print(f"   ⚠️  Réponse incomplète, récupéré: {len(knowledge['entities'])} entités, "
+              f"{len(knowledge['relations'])} relations")
+    else:
+        print("   ⚠️  Pas de réponse exploitable de Groq")
+
+
+def parse_knowledge(response: str, strict: bool = False) -> dict:
+    """Entités et relations d'une réponse du LLM
+    
+    Réponse au JSON incomplet (coupée à MAX_TOKENS, virgule en trop) : les
+    objets complets sont récupérés, retournés ou, avec strict, portés par
+    PartialResponse. Réponse vide ou illisible : extraction vide, ou
+    ValueError avec strict.
+    """
     if not response:
         print("   ⚠️  Pas de réponse de Groq")
+        if strict:
+            raise ValueError("Pas de réponse du LLM")
         return {"entities": [], "relations": []}
     
     try:
-        # Nettoyer la réponse
-        response = response.strip()
-        
-        # Supprimer les balises markdown si présentes
-        if "```json" in response:
-            response = re.sub(r'```json\s*', '', response)
-        if "```" in response:
-            response = re.sub(r'```\s*', '', response)
-        
-        # Extraire le JSON s'il y a du texte autour
-        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-        if json_match:
-            response = json_match.group(0)
+        response = clean_json(response)
         
         # Parser le JSON
         data = json.loads(response)
@@ -73,29 +230,100 @@ def extract_knowledge(text: str) -> dict:
         if not isinstance(data, dict):
             raise ValueError("La réponse n'est pas un dictionnaire")
         
-        entities = data.get('entities', [])
-        relations = data.get('relations', [])
-        
-        # Valider les entités
-        if not isinstance(entities, list):
-            entities = []
-        
-        # Valider les relations
-        if not isinstance(relations, list):
-            relations = []
-        
-        print(f"   ✅ Extraction réussie: {len(entities)} entités, {len(relations)} relations")
-        
-        return {
-            "entities": entities,
-            "relations": relations
-        }
+        knowledge = _knowledge(data)
+        print(f"   ✅ Extraction réussie: {len(knowledge['entities'])} entités, "
+              f"{len(knowledge['relations'])} relations")
+        return knowledge
         
     except json.JSONDecodeError as e:
+        knowledge, complete = salvage(response)
+        if complete:
+            print(f"   ✅ Extraction réussie (JSON réparé): {len(knowledge['entities'])} entités, "
+                  f"{len(knowledge['relations'])} relations")
+            return knowledge
+        if knowledge['entities'] or knowledge['relations']:
+            print(f"   ⚠️  JSON incomplet ({e}), récupéré: {len(knowledge['entities'])} entités, "
+                  f"{len(knowledge['relations'])} relations")
+            if strict:
+                raise PartialResponse(str(e), knowledge) from e
+            return knowledge
         print(f"   ❌ Erreur JSON: {e}")
         print(f"   Réponse brute (200 premiers chars): {response[:200]}...")
+        if strict:
+            raise
         return {"entities": [], "relations": []}
     
     except Exception as e:
         print(f"   ❌ Erreur extraction: {e}")
-        return {"entities": [], "relations": []}
\ No newline at end of file
+        if strict:
+            raise ValueError(str(e)) from e
+        return {"entities": [], "relations": []}
+
+
+def clean_json(response: str) -> str:
+    """Réponse du LLM débarrassée du markdown et du texte autour du JSON"""
+    # Nettoyer la réponse
+    response = response.strip()
+    
+    # Supprimer les balises markdown si présentes
+    if "```json" in response:
+        response = re.sub(r'```json\s*', '', response)
+    if "```" in response:
+        response = re.sub(r'```\s*', '', response)
+    
+    # Extraire le JSON s'il y a du texte autour
+    json_match = re.search(r'\{.*\}', response, re.DOTALL)
+    if json_match:
+        response = json_match.group(0)
+    return response
+
+
+def _knowledge(data: dict) -> dict:
+    """Entités et relations d'un objet JSON, listes vides si invalides"""
+    entities = data.get('entities', [])
+    relations = data.get('relations', [])
+    
+    # Valider les entités
+    if not isinstance(entities, list):
+        entities = []
+    
+    # Valider les relations
+    if not isinstance(relations, list):
+        relations = []
+    
+    return {
+        "entities": entities,
+        "relations": relations
+    }
+
+
+def build_packed_prompt(documents: dict) -> str:
+    """Prompt d'extraction de plusieurs documents {id: texte}"""
+    return PACKED_PROMPT.format(documents='\n\n'.join(
+        f"=== DOCUMENT {doc_id} ===\n{text}\n=== FIN {doc_id} ==="
+        for doc_id, text in documents.items()
+    ))
+
+
+def parse_packed_knowledge(response: str, ids) -> dict:
+    """Extraction de chaque document d'une réponse groupée {id: connaissances}
+    
+    ValueError si la réponse est illisible ; les documents absents de la
+    réponse sont absents du résultat.
+    """
+    if not response:
+        raise ValueError("Pas de réponse du LLM")
+    data = loads_lenient(clean_json(response))
+    documents = data.get('documents') if isinstance(data, dict) else None
+    if not isinstance(documents, list):
+        raise ValueError("Réponse groupée sans liste 'documents'")
+    
+    wanted = {str(doc_id).upper(): doc_id for doc_id in ids}
+    results = {}
+    for document in documents:
+        if not isinstance(document, dict):
+            continue
+        doc_id = wanted.get(str(document.get('id', '')).strip().upper())
+        if doc_id is not None and doc_id not in results:
+            results[doc_id] = _knowledge(document)
+    return results
@@ -0,0 +1,136 @@
+"""Lecture incrémentale d'une réponse JSON d'extraction.
+
+KnowledgeStream reçoit la réponse du LLM morceau par morceau et produit
+chaque objet des listes "entities" et "relations" dès que son accolade
+fermante arrive, sans attendre la fin du JSON. Le texte autour du JSON
+(balises markdown, phrase d'introduction) est ignoré. Un objet mal formé
+à cause d'une virgule en trop est réparé ; une réponse coupée (MAX_TOKENS
+atteint) garde tous les objets complets reçus avant la coupure.
+"""
+import json
+import re
+from typing import List, Tuple
+
+TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+
+def loads_lenient(raw: str):
+    """json.loads qui tolère les virgules avant } ou ]"""
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        repaired = _strip_trailing_commas(raw)
+        if repaired == raw:
+            raise
+        return json.loads(repaired)
+
+
+def _strip_trailing_commas(raw: str) -> str:
+    """Retire les virgules en trop, hors chaînes de caractères"""
+    parts = re.split(r'("(?:[^"\\]|\\.)*")', raw)
+    return ''.join(part if i % 2 else TRAILING_COMMA.sub(r'\1', part)
+                   for i, part in enumerate(parts))
+
+
+class KnowledgeStream:
+    """Objets des listes d'extraction, produits au fil de la réponse"""
+
+    def __init__(self, keys=('entities', 'relations')):
+        self.keys = set(keys)
+        self.items = {key: [] for key in keys}
+        self.complete = False     # objet JSON racine refermé
+        self.invalid = 0          # objets illisibles malgré la réparation
+        self._buffer = ''
+        self._pos = 0
+        self._stack = []          # [type, clé] des conteneurs ouverts
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._pending_key = None
+        self._object_start = None  # début de l'objet d'extraction en cours
+        self._object_depth = None
+        self._object_key = None
+
+    def feed(self, text: str) -> List[Tuple[str, dict]]:
+        """Ajoute un morceau de réponse ; retourne les objets complétés (clé, objet)"""
+        self._buffer += text
+        found = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._object_start is None:
+                        self._last_string = buffer[self._string_start:pos + 1]
+                continue
+            if self.complete or (not self._stack and char != '{'):
+                # Texte autour du JSON racine
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ':':
+                if self._last_string is not None:
+                    try:
+                        self._pending_key = json.loads(self._last_string)
+                    except json.JSONDecodeError:
+                        self._pending_key = None
+            elif char == ',':
+                self._pending_key = None
+                self._last_string = None
+            elif char in '{[':
+                key = self._pending_key
+                if (char == '{' and self._object_start is None and self._stack
+                        and self._stack[-1][0] == '[' and self._stack[-1][1] in self.keys):
+                    self._object_start = pos
+                    self._object_depth = len(self._stack)
+                    self._object_key = self._stack[-1][1]
+                self._stack.append([char, key])
+                self._pending_key = None
+                self._last_string = None
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if self._object_start is not None and len(self._stack) == self._object_depth:
+                    item = self._close_object(buffer[self._object_start:pos + 1])
+                    if item is not None:
+                        found.append(item)
+                if not self._stack:
+                    self.complete = True
+        self._pos = len(buffer)
+        return found
+
+    def _close_object(self, raw):
+        key = self._object_key
+        self._object_start = self._object_depth = self._object_key = None
+        try:
+            obj = loads_lenient(raw)
+        except json.JSONDecodeError:
+            self.invalid += 1
+            return None
+        if not isinstance(obj, dict):
+            return None
+        self.items[key].append(obj)
+        return key, obj
+
+    def result(self) -> dict:
+        """Objets complets reçus jusqu'ici, par clé"""
+        return {key: list(items) for key, items in self.items.items()}
+
+
+def salvage(text: str, keys=('entities', 'relations')):
+    """Objets complets d'une réponse entière, même coupée ou mal formée
+
+    Retourne (objets par clé, complète) : complète si le JSON racine est
+    refermé et qu'aucun objet n'a été perdu (seules des virgules en trop
+    ont été réparées).
+    """
+    stream = KnowledgeStream(keys)
+    stream.feed(text)
+    return stream.result(), stream.complete and not stream.invalid
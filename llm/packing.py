@@ -0,0 +1,86 @@
+"""Regroupement de documents courts dans un même prompt d'extraction.
+
+Chaque appel au LLM répète les consignes d'extraction : pour des pages
+courtes, elles pèsent autant que le texte. plan_packs regroupe les textes
+consécutifs jusqu'à un budget de tokens ; extract_pack les envoie en un
+seul appel, chaque document balisé par un identifiant (D1, D2...), et
+redistribue la réponse par document. Les documents absents d'une réponse
+groupée, ou tout le groupe si la réponse est illisible, repassent en
+appels individuels.
+"""
+from typing import Callable, List
+
+from config.settings import LLM_PACK_TOKENS, LLM_PACK_MAX_DOCS
+from llm.client import call_groq
+from llm.extractor import (
+    EXTRACTION_SYSTEM, build_packed_prompt, parse_packed_knowledge,
+    cached_knowledge, cache_knowledge, extract_knowledge
+)
+from llm.tokens import estimate_tokens
+
+DOCUMENT_OVERHEAD = 16   # balises et identifiant d'un document
+
+
+def document_tokens(text: str) -> int:
+    """Tokens d'un document dans un prompt groupé"""
+    return estimate_tokens(text) + DOCUMENT_OVERHEAD
+
+
+def plan_packs(texts: List[str], max_tokens: int = LLM_PACK_TOKENS,
+               max_docs: int = LLM_PACK_MAX_DOCS) -> List[List[int]]:
+    """Indices des textes regroupés par appel, dans l'ordre des textes
+
+    Un texte de plus de la moitié du budget part seul : le regrouper
+    n'économiserait presque rien.
+    """
+    packs = []
+    current, size = [], 0
+    for i, text in enumerate(texts):
+        tokens = document_tokens(text)
+        if tokens > max_tokens / 2:
+            packs.append([i])
+            continue
+        if current and (size + tokens > max_tokens or len(current) >= max_docs):
+            packs.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def extract_pack(texts: List[str], call: Callable[[str], str] = None,
+                 extract_one: Callable[[str], dict] = extract_knowledge) -> List[dict]:
+    """Extraction de plusieurs textes en un appel, dans l'ordre des textes
+
+    call : envoie un prompt groupé et retourne la réponse brute ;
+    extract_one : extraction individuelle (cache compris) pour les textes
+    seuls et les replis.
+    """
+    if call is None:
+        def call(prompt):
+            return call_groq(prompt, system=EXTRACTION_SYSTEM)
+
+    results = [cached_knowledge(text) for text in texts]
+    pending = [i for i, knowledge in enumerate(results) if knowledge is None]
+    if len(pending) > 1:
+        ids = {f"D{n}": i for n, i in enumerate(pending, 1)}
+        response = call(build_packed_prompt({doc_id: texts[i] for doc_id, i in ids.items()}))
+        try:
+            packed = parse_packed_knowledge(response, ids)
+        except ValueError as e:
+            print(f"   ⚠️  Réponse groupée illisible ({e}), repli document par document")
+            packed = {}
+        for doc_id, knowledge in packed.items():
+            i = ids[doc_id]
+            results[i] = knowledge
+            cache_knowledge(texts[i], knowledge)
+        if packed:
+            print(f"   ✅ Extraction groupée: {len(packed)}/{len(ids)} document(s)")
+
+    # Textes seuls, ou absents de la réponse groupée
+    for i, knowledge in enumerate(results):
+        if knowledge is None:
+            results[i] = extract_one(texts[i])
+    return results
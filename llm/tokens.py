@@ -0,0 +1,22 @@
+"""Estimation du nombre de tokens d'un texte avant l'appel au LLM."""
+import math
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4   # tokens de structure par message
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Nombre de tokens d'un texte (tiktoken si installé, sinon ~4 caractères par token)"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
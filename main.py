@@ -1,11 +1,35 @@
+import threading
+
+from config.settings import EXTRACTION_MAX_CHARS
 from crawler.web_crawler import WebCrawler
-from preprocessing.cleaner import clean_text, truncate_text
-from llm.extractor import extract_knowledge
+from crawler.page_state import CrawlStats
+from crawler.relevance import RelevanceFilter
+from crawler.dedup import NearDuplicateFilter
+from crawler.focus import LinkScorer
+from preprocessing.cleaner import clean_text
+from preprocessing.blocks import split_blocks, plan_extraction
+from llm.batch import BatchExtractor
+from llm.extractor import get_cache
 from graph.builder import GraphBuilder
 from visualization.plotter import visualize_graph
 
-def pipeline(url: str, max_pages: int = 5):
-    """Pipeline complet : Crawl → LLM (Groq) → Graph → Viz"""
+def pipeline(url: str, max_pages: int = 5, incremental: bool = True,
+             keywords: list = None, min_relevance: int = 1,
+             near_duplicates: str = 'skip', focused: bool = True):
+    """Pipeline complet : Crawl → LLM (Groq) → Graph → Viz
+    
+    En mode incrémental, les pages non modifiées depuis le dernier passage
+    (304 ou contenu identique) ne sont pas renvoyées au LLM. Avec des
+    mots-clés, seules les pages pertinentes sont analysées. Les
+    quasi-doublons d'une page déjà crawlée ne sont jamais envoyés au LLM
+    (near_duplicates : 'skip', 'mark' ou 'off'). Avec focused, le crawl
+    suit d'abord les liens les plus proches des mots-clés.
+    
+    Le texte de chaque page est découpé en blocs : en mode incrémental,
+    seuls les blocs nouveaux ou modifiés depuis la dernière extraction
+    (avec un peu de contexte) sont envoyés au LLM, et le résultat est
+    fusionné avec le graphe précédent de la page.
+    """
     print("\n" + "="*60)
     print("🚀 GRAPHCRAWLER - Pipeline avec Groq")
     print("="*60)
@@ -17,57 +41,102 @@ def pipeline(url: str, max_pages: int = 5):
     
     # 1. Crawl
     print("⏳ Étape 1/4 : Crawling en cours...")
-    crawler = WebCrawler()
+    # Pages lues en entier (jusqu'à EXTRACTION_MAX_CHARS) : découpées en morceaux à l'extraction
+    crawler = WebCrawler(max_content_chars=EXTRACTION_MAX_CHARS)
     
+    stats = CrawlStats()
+    # État des pages écrit seulement après leur extraction : une page dont
+    # l'extraction échoue est retéléchargée au prochain passage
+    page_state = crawler.page_state(deferred=True) if incremental else None
     try:
-        data = crawler.crawl_url(url, content_types=['html'], max_hits=max_pages)
+        data = crawler.crawl_url(
+            url, content_types=['html'], max_hits=max_pages,
+            page_state=page_state,
+            stats=stats,
+            relevance=RelevanceFilter(keywords, min_relevance),
+            dedup=NearDuplicateFilter(near_duplicates) if near_duplicates != 'off' else None,
+            focus=LinkScorer(keywords) if focused and keywords else None
+        )
     except Exception as e:
         print(f"❌ Erreur crawl: {e}")
         crawler.close()
         builder.close()
         return
     
+    skipped = stats['not_modified'] + stats['unchanged']
+    if skipped:
+        print(f"ℹ️  {skipped} page(s) non modifiée(s) depuis le dernier passage, ignorée(s)")
+    if stats['irrelevant']:
+        print(f"ℹ️  {stats['irrelevant']} page(s) sans les mots-clés, ignorée(s)")
+    duplicates = stats['near_duplicates'] + stats['near_duplicates_marked']
+    if duplicates:
+        print(f"ℹ️  {duplicates} quasi-doublon(s) détecté(s) : {duplicates} appel(s) LLM "
+              f"et {stats['duplicate_bytes']} caractères évités")
+    
     if not data:
         print("❌ Aucune donnée crawlée")
+        if page_state is not None:
+            page_state.commit()
         crawler.close()
         builder.close()
         return
     
     print(f"✅ {len(data)} pages crawlées avec succès\n")
     
-    # 2. Traiter chaque page
+    # 2. Préparer chaque page : nettoyage et blocs modifiés
     print("⏳ Étape 2/4 : Extraction avec Groq...")
     total_entities = 0
     total_relations = 0
+    chars_sent = 0
+    chars_total = 0
     all_graphs = []  # ← Stocker les graphes en mémoire aussi
+    pages = []  # (item, plan) des pages à mettre à jour
+    failed = 0  # pages dont l'extraction a échoué
     
     for i, item in enumerate(data, 1):
         print(f"\n📄 [{i}/{len(data)}] {item['title'][:50]}...")
         
-        # Nettoyer
+        if item.get('near_duplicate_of'):
+            print(f"   ⚠️  Quasi-doublon de {item['near_duplicate_of']}, ignoré")
+            continue
+        
+        # Nettoyer (les textes longs sont découpés en morceaux à l'extraction)
         text = clean_text(item['content'])
-        text = truncate_text(text, max_chars=6000)
         
         if len(text) < 100:
             print("   ⚠️  Texte trop court, ignoré")
             continue
         
-        # LLM
-        print("   🤖 Analyse par Groq...")
-        knowledge = extract_knowledge(text)
-        
-        entities_count = len(knowledge.get('entities', []))
-        relations_count = len(knowledge.get('relations', []))
-        
-        total_entities += entities_count
-        total_relations += relations_count
+        # Blocs modifiés depuis la dernière extraction de la page
+        plan = plan_extraction(
+            split_blocks(text),
+            builder.known_blocks(item['url']) if incremental else None
+        )
+        chars_total += len(text)
+        if plan.changed:
+            if len(plan.changed) < len(plan.blocks):
+                print(f"   ✂️  {len(plan.changed)}/{len(plan.blocks)} bloc(s) modifié(s), "
+                      f"{len(plan.removed)} retiré(s)")
+            chars_sent += len(plan.text)
+        else:
+            print(f"   ✂️  Aucun bloc nouveau, {len(plan.removed)} bloc(s) retiré(s)")
+        pages.append((item, plan))
+    
+    def save(item, plan, knowledge, graph=None):
+        nonlocal total_entities, total_relations, failed
+        total_entities += len(knowledge.get('entities', []))
+        total_relations += len(knowledge.get('relations', []))
+        if knowledge.get('error'):
+            # Blocs modifiés non enregistrés : renvoyés au LLM au prochain passage
+            failed += 1
+            print(f"   ❌ Extraction échouée ({knowledge['error']}), à reprendre au prochain passage")
+            if page_state is not None:
+                page_state.discard(item['url'])
         
-        # Graph
-        if entities_count > 0:
-            graph = builder.build_graph(knowledge, item['url'])
-            print(f"   📊 Graphe généré : {len(graph.nodes)} nœuds, {len(graph.edges)} liens")
-            
-            graph_id = builder.save_graph(graph)
+        # Graph : extraction des blocs modifiés fusionnée avec celle des autres
+        graph = builder.update_page_graph(item['url'], plan, knowledge, graph)
+        if graph.nodes:
+            graph_id = builder.save_page_graph(graph)
             if graph_id:
                 print(f"   💾 Graphe sauvegardé (ID: {graph_id[:8]}...)")
                 all_graphs.append(graph)  # ← Garder en mémoire
@@ -76,9 +145,60 @@ def pipeline(url: str, max_pages: int = 5):
         else:
             print("   ⚠️  Aucune entité extraite")
     
+    # Pages sans bloc nouveau : seuls les blocs retirés sont mis à jour
+    changed = [(item, plan) for item, plan in pages if plan.changed]
+    for item, plan in pages:
+        if not plan.changed:
+            save(item, plan, {'entities': [], 'relations': []})
+    
+    # LLM : appels simultanés sous les limites du compte, traités à leur arrivée.
+    # Le graphe de chaque page se construit pendant la génération de la réponse.
+    extractor = BatchExtractor()
+    graphs = [builder.start_page_graph(item['url'], plan) for item, plan in changed]
+    graphs_lock = threading.Lock()
+    
+    def on_item(i, key, obj):
+        with graphs_lock:
+            graphs[i].add(key, obj)
+    
+    if changed:
+        print(f"\n   🤖 Analyse par Groq de {len(changed)} page(s), "
+              f"{extractor.concurrency} appel(s) simultané(s)...")
+    for done, (i, knowledge) in enumerate(
+            extractor.as_completed([plan.text for _, plan in changed], on_item=on_item), 1):
+        item, plan = changed[i]
+        print(f"\n📄 [{done}/{len(changed)}] {item['title'][:50]}")
+        # Tous les objets de la page sont arrivés : graphe complété et sauvegardé
+        save(item, plan, knowledge, graphs[i])
+    
+    if page_state is not None:
+        page_state.commit()
+    
     print(f"\n✅ Extraction terminée:")
     print(f"   📊 Total entités: {total_entities}")
-    print(f"   🔗 Total relations: {total_relations}\n")
+    print(f"   🔗 Total relations: {total_relations}")
+    if failed:
+        print(f"   ❌ {failed} page(s) en échec d'extraction")
+    if chars_total:
+        print(f"   ✂️  Texte envoyé au LLM: {chars_sent}/{chars_total} caractères "
+              f"({chars_sent / chars_total:.0%})")
+    llm_stats = extractor.stats()
+    if llm_stats['chunked_texts']:
+        print(f"   🧩 {llm_stats['chunked_texts']} page(s) longue(s) découpée(s), "
+              f"{llm_stats['chunks']} morceau(x) extrait(s) en parallèle")
+    if llm_stats['calls']:
+        print(f"   🤖 {llm_stats['calls']} appel(s) LLM, {llm_stats['used_tokens']} tokens "
+              f"(estimés : {llm_stats['estimated_tokens']}), "
+              f"attente des limites : {llm_stats['budget_wait']:.1f}s")
+    if llm_stats['truncated']:
+        print(f"   ✂️  {llm_stats['truncated']} réponse(s) coupée(s) à MAX_TOKENS, "
+              f"objets complets récupérés")
+    cache = get_cache()
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"   ♻️  Cache LLM: {cache_stats['hits']} succès, {cache_stats['misses']} échec(s) "
+              f"({cache_stats['hit_rate']:.0%})")
+    print()
     
     # 3. Récupérer les graphes
     print("⏳ Étape 3/4 : Construction du graphe global...")
@@ -159,5 +279,8 @@ if __name__ == "__main__":
     except:
         max_pages = 5
     
+    keywords_input = input("🔑 Mots-clés (séparés par des virgules) []: ").strip()
+    keywords = [k.strip() for k in keywords_input.split(',') if k.strip()]
+    
     # Lancer le pipeline
-    pipeline(url, max_pages)
\ No newline at end of file
+    pipeline(url, max_pages, keywords=keywords)
\ No newline at end of file
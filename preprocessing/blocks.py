@@ -0,0 +1,133 @@
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional
+
+from config.settings import BLOCK_MIN_CHARS, BLOCK_MAX_CHARS, BLOCK_BOUNDARY, BLOCK_CONTEXT
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+PARAGRAPH_END = re.compile(r'\n\s*\n')
+
+
+def paragraphs(text: str) -> List[List[str]]:
+    """Phrases du texte, paragraphe par paragraphe (sans paragraphe vide)"""
+    result = []
+    for paragraph in PARAGRAPH_END.split(text.strip()):
+        sentences = [s for s in SENTENCE_END.split(paragraph.strip()) if s]
+        if sentences:
+            result.append(sentences)
+    return result
+
+
+def sentences(text: str) -> List[str]:
+    """Phrases du texte, tous paragraphes confondus"""
+    return [sentence for paragraph in paragraphs(text) for sentence in paragraph]
+
+
+@dataclass
+class Block:
+    """Passage d'une page (quelques phrases) et son empreinte"""
+    hash: str
+    text: str
+    # Le bloc se termine avec un paragraphe (le suivant commence une ligne vide après)
+    paragraph_end: bool = False
+
+
+@dataclass
+class ExtractionPlan:
+    """Blocs à envoyer au LLM pour une page"""
+    blocks: List[Block]
+    changed: List[int]      # indices des blocs nouveaux ou modifiés
+    removed: List[str]      # empreintes des blocs disparus
+    context: int = 0        # phrases des blocs voisins inchangés ajoutées autour
+
+    @property
+    def text(self) -> str:
+        """Blocs modifiés, par passages contigus entourés de leur contexte"""
+        changed = set(self.changed)
+        passages = []
+        for i in self.changed:
+            if i - 1 in changed:
+                passages[-1].append(self._separator(i - 1))
+                passages[-1].append(self.blocks[i].text)
+                continue
+            passage = [self.blocks[i].text]
+            if self.context and i > 0:
+                before = sentences(self.blocks[i - 1].text)[-self.context:]
+                passage[:0] = [' '.join(before), self._separator(i - 1)]
+            passages.append(passage)
+        for passage, end in zip(passages, self._run_ends()):
+            if self.context and end + 1 < len(self.blocks):
+                after = sentences(self.blocks[end + 1].text)[:self.context]
+                passage.extend([self._separator(end), ' '.join(after)])
+        return '\n\n'.join(''.join(passage) for passage in passages)
+
+    def _separator(self, i):
+        """Séparateur entre le bloc i et le suivant"""
+        return '\n\n' if self.blocks[i].paragraph_end else ' '
+
+    def _run_ends(self):
+        changed = set(self.changed)
+        return [i for i in self.changed if i + 1 not in changed]
+
+    @property
+    def changed_blocks(self) -> List[Block]:
+        return [self.blocks[i] for i in self.changed]
+
+
+def block_hash(text: str) -> str:
+    """Empreinte d'un bloc, insensible aux espaces et à la casse"""
+    normalized = ' '.join(text.lower().split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def split_blocks(text: str, min_chars: int = BLOCK_MIN_CHARS,
+                 max_chars: int = BLOCK_MAX_CHARS, boundary: int = BLOCK_BOUNDARY) -> List[Block]:
+    """Découpe un texte en blocs de phrases aux frontières définies par le contenu
+
+    Un bloc se termine après une phrase dont l'empreinte est multiple de
+    boundary ou à une fin de paragraphe (une fois min_chars atteints), ou
+    à max_chars. Les frontières ne dépendent que des phrases voisines :
+    modifier ou insérer un paragraphe ne change que les blocs qui le
+    contiennent, pas les suivants. Le texte d'un bloc garde ses fins de
+    paragraphe (ligne vide).
+    """
+    blocks = []
+    current = ''
+    for paragraph in paragraphs(text):
+        for j, sentence in enumerate(paragraph):
+            if current and not current.endswith('\n\n'):
+                current += ' '
+            current += sentence
+            end = j == len(paragraph) - 1
+            at_boundary = end or zlib.crc32(sentence.encode('utf-8')) % boundary == 0
+            if len(current) >= max_chars or (len(current) >= min_chars and at_boundary):
+                blocks.append((current, end))
+                current = ''
+            elif end:
+                current += '\n\n'
+    if current:
+        blocks.append((current.rstrip(), True))
+    return [Block(block_hash(block), block, end) for block, end in blocks]
+
+
+def plan_extraction(blocks: List[Block], previous: Optional[List[str]] = None,
+                    context: int = BLOCK_CONTEXT) -> ExtractionPlan:
+    """Blocs à (ré)extraire par rapport aux empreintes du passage précédent
+
+    Sans passage précédent, tous les blocs sont à extraire. Sinon seuls les
+    blocs dont l'empreinte est inconnue, accompagnés de `context` phrases
+    des blocs inchangés voisins pour ne pas perdre le fil du texte.
+    """
+    if previous is None:
+        return ExtractionPlan(blocks, list(range(len(blocks))), [])
+
+    known = set(previous)
+    current = {block.hash for block in blocks}
+    return ExtractionPlan(
+        blocks=blocks,
+        changed=[i for i, block in enumerate(blocks) if block.hash not in known],
+        removed=[h for h in dict.fromkeys(previous) if h not in current],
+        context=context,
+    )
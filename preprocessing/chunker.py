@@ -0,0 +1,128 @@
+from typing import Callable, List, Tuple
+
+from config.settings import CHUNK_TOKENS, CHUNK_OVERLAP
+from llm.tokens import estimate_tokens
+from preprocessing.blocks import paragraphs
+
+
+def _split_long(sentence: str, max_tokens: int, count: Callable[[str], int]) -> List[str]:
+    """Coupe aux espaces une phrase plus longue qu'un morceau (un mot trop long, n'importe où)"""
+    words = []
+    for word in sentence.split():
+        tokens = count(word)
+        if tokens > max_tokens:
+            step = max(1, len(word) * max_tokens // tokens)
+            words.extend(word[i:i + step] for i in range(0, len(word), step))
+        else:
+            words.append(word)
+    # Tokens des mots additionnés : approximation sans réencoder la phrase
+    pieces, current, size = [], [], 0
+    for word in words:
+        tokens = count(word)
+        if current and size + tokens > max_tokens:
+            pieces.append(' '.join(current))
+            current, size = [], 0
+        current.append(word)
+        size += tokens
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def _units(text: str, max_tokens: int, count: Callable[[str], int]) -> List[Tuple[str, int, bool]]:
+    """(phrase, tokens, fin de paragraphe) du texte, phrases trop longues coupées"""
+    units = []
+    for paragraph in paragraphs(text):
+        pieces = []
+        for sentence in paragraph:
+            tokens = count(sentence)
+            if tokens > max_tokens:
+                pieces.extend((piece, count(piece)) for piece in _split_long(sentence, max_tokens, count))
+            else:
+                pieces.append((sentence, tokens))
+        units.extend((s, tokens, i == len(pieces) - 1) for i, (s, tokens) in enumerate(pieces))
+    return units
+
+
+def _join(units) -> str:
+    """Texte d'un morceau : phrases séparées par une espace, paragraphes par une ligne vide"""
+    return ''.join(sentence + ('\n\n' if paragraph_end else ' ')
+                   for sentence, _, paragraph_end in units).rstrip()
+
+
+def _cut(units, size: int) -> int:
+    """Nombre de phrases du morceau à émettre : jusqu'à la dernière fin de
+    paragraphe si elle laisse au moins la moitié du morceau, sinon toutes"""
+    prefix = 0
+    best = len(units)
+    for i, (_, tokens, paragraph_end) in enumerate(units[:-1]):
+        prefix += tokens
+        if paragraph_end and prefix * 2 >= size:
+            best = i + 1
+    return best
+
+
+def split_chunks(text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP,
+                 count: Callable[[str], int] = estimate_tokens) -> List[str]:
+    """Découpe un texte en morceaux d'au plus max_tokens, aux fins de phrases
+
+    Un morceau plein est coupé de préférence à une fin de paragraphe (s'il
+    en reste au moins la moitié), sinon à une fin de phrase ; les
+    paragraphes restent séparés par une ligne vide. Chaque morceau reprend
+    les dernières phrases du précédent, jusqu'à overlap tokens, pour
+    qu'une relation à cheval sur la coupure reste visible du LLM. Un texte
+    assez court donne un seul morceau, identique au texte ; un texte vide
+    n'en donne aucun.
+    """
+    if not text.strip():
+        return []
+    if count(text) <= max_tokens:
+        return [text]
+
+    chunks = []
+    current, size = [], 0
+    for unit in _units(text, max_tokens, count):
+        tokens = unit[1]
+        while current and size + tokens > max_tokens:
+            cut = _cut(current, size)
+            done, current = current[:cut], current[cut:]
+            chunks.append(_join(done))
+            size = sum(u[1] for u in current)
+            # Recouvrement : phrases de fin du morceau, sans dépasser overlap
+            kept, kept_size = [], 0
+            for previous in reversed(done):
+                if (kept_size + previous[1] > overlap
+                        or kept_size + previous[1] + size + tokens > max_tokens):
+                    break
+                kept.insert(0, previous)
+                kept_size += previous[1]
+            current, size = kept + current, kept_size + size
+        current.append(unit)
+        size += tokens
+    if current:
+        chunks.append(_join(current))
+    return chunks
+
+
+def merge_knowledge(parts: List[dict]) -> dict:
+    """Fusionne les extractions des morceaux d'une page, sans doublons
+
+    Mêmes clés que la fusion des blocs d'une page (GraphBuilder) : entité
+    par nom (casse ignorée) et type, relation par source, cible et type.
+    Si l'extraction d'un morceau a échoué, la fusion porte son erreur.
+    """
+    entities, relations = {}, {}
+    errors = [knowledge['error'] for knowledge in parts if knowledge.get('error')]
+    for knowledge in parts:
+        for ent in knowledge.get('entities', []):
+            if isinstance(ent, dict) and ent.get('name'):
+                entities.setdefault((str(ent['name']).strip().lower(), ent.get('type')), ent)
+        for rel in knowledge.get('relations', []):
+            if isinstance(rel, dict) and rel.get('source') and rel.get('target'):
+                key = (str(rel['source']).strip().lower(), str(rel['target']).strip().lower(),
+                       rel.get('type'))
+                relations.setdefault(key, rel)
+    merged = {'entities': list(entities.values()), 'relations': list(relations.values())}
+    if errors:
+        merged['error'] = '; '.join(errors)
+    return merged
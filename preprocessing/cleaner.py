@@ -1,12 +1,20 @@
 import re
 
 def clean_text(text: str) -> str:
-    """Nettoie le texte crawlé"""
-    # Supprimer espaces multiples
-    text = re.sub(r'\s+', ' ', text)
-    # Supprimer caractères spéciaux
-    text = re.sub(r'[^\w\s\.,;:!?\-]', '', text)
-    return text.strip()
+    """Nettoie le texte crawlé, paragraphe par paragraphe
+    
+    Les paragraphes (séparés par une ligne vide) sont conservés : le
+    découpage en blocs et en morceaux coupe de préférence entre eux.
+    """
+    paragraphs = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        # Supprimer espaces multiples
+        paragraph = re.sub(r'\s+', ' ', paragraph)
+        # Supprimer caractères spéciaux
+        paragraph = re.sub(r'[^\w\s\.,;:!?\-]', '', paragraph).strip()
+        if paragraph:
+            paragraphs.append(paragraph)
+    return '\n\n'.join(paragraphs)
 
 def truncate_text(text: str, max_chars: int = 10000) -> str:
     """Limite la taille pour le LLM"""
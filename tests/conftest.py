@@ -0,0 +1,52 @@
+import os
+
+# Le client LLM exige une clé à l'import ; aucun test n'appelle l'API
+os.environ.setdefault('GROQ_API_KEY', 'test')
+
+import mongomock
+import pytest
+from mongomock.collection import BulkOperationBuilder
+
+from benchmarks.fixture_site import FixtureSite
+
+# pymongo >= 4.11 passe sort à add_update, que mongomock ne connaît pas encore
+_add_update = BulkOperationBuilder.add_update
+if 'sort' not in _add_update.__code__.co_varnames:
+    def _add_update_sorted(self, *args, sort=None, **kwargs):
+        return _add_update(self, *args, **kwargs)
+    BulkOperationBuilder.add_update = _add_update_sorted
+
+
+@pytest.fixture
+def crawler(tmp_path, monkeypatch):
+    """WebCrawler sur une base mongomock, état et index dans un dossier temporaire"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('crawler.web_crawler.pymongo.MongoClient', mongomock.MongoClient)
+    from crawler.web_crawler import WebCrawler
+    crawler = WebCrawler(archive_dir=None, polite=False)
+    yield crawler
+    crawler.close()
+
+
+@pytest.fixture
+def site():
+    """Site local sans latence, pages modifiables pendant le test"""
+    with FixtureSite(pages={}, latency=0) as site:
+        yield site
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    """GraphBuilder sur une base mongomock"""
+    monkeypatch.setattr('graph.builder.pymongo.MongoClient', mongomock.MongoClient)
+    from graph.builder import GraphBuilder
+    builder = GraphBuilder()
+    yield builder
+    builder.close()
+
+
+@pytest.fixture
+def no_llm_cache(monkeypatch):
+    """Extractions jamais lues ni écrites dans le cache"""
+    monkeypatch.setattr('llm.extractor.LLM_CACHE_ENABLED', False)
+    monkeypatch.setattr('llm.extractor._cache', None)
@@ -0,0 +1,30 @@
+import os
+
+import requests
+
+from crawler.archive import ResponseArchive, SEGMENT_SUFFIX
+
+
+def _response(url, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers['Content-Type'] = 'text/html'
+    response._content = body
+    return response
+
+
+def test_archive_evicts_oldest_segments(tmp_path):
+    archive = ResponseArchive(str(tmp_path), segment_bytes=2000, max_bytes=6000)
+    for i in range(40):
+        url = f"http://example.com/{i}"
+        archive.store(url, _response(url, os.urandom(500)))
+
+    segments = [name for name in os.listdir(tmp_path) if name.endswith(SEGMENT_SUFFIX)]
+    size = sum(os.path.getsize(tmp_path / name) for name in segments)
+    assert archive.evicted > 0
+    assert size <= 6000 + 2000
+    assert archive.get("http://example.com/0") is None
+    assert archive.get("http://example.com/39") is not None
+    assert archive.stats()['captures'] < 40
+    archive.close()
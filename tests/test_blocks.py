@@ -0,0 +1,80 @@
+import json
+
+from preprocessing.blocks import split_blocks, plan_extraction
+from preprocessing.chunker import merge_knowledge
+from llm.extractor import remember_knowledge
+
+URL = 'https://exemple.fr/article'
+TEXT = ' '.join(f"Acme{i} a racheté Beta{i} en {2000 + i}." for i in range(60))
+
+
+def _knowledge(*names):
+    return {'entities': [{'name': name, 'type': 'Organization'} for name in names],
+            'relations': []}
+
+
+def _plan(builder, text=TEXT):
+    return plan_extraction(split_blocks(text), builder.known_blocks(URL))
+
+
+def test_failed_extraction_keeps_blocks_pending(builder):
+    plan = _plan(builder)
+    assert len(plan.blocks) > 1
+    graph = builder.update_page_graph(URL, plan, {**_knowledge('Acme0'), 'error': 'coupée'})
+
+    # Objets récupérés dans le graphe, mais aucun bloc marqué extrait
+    assert [node.name for node in graph.nodes] == ['Acme0']
+    assert builder.known_blocks(URL) == []
+    assert builder.block_extractions.count_documents({'source_url': URL}) == 0
+
+    plan = _plan(builder)
+    assert len(plan.changed) == len(plan.blocks)
+    builder.update_page_graph(URL, plan, _knowledge('Acme0', 'Beta0'))
+    assert builder.known_blocks(URL) == [block.hash for block in plan.blocks]
+    assert not _plan(builder).changed
+
+
+def test_failed_update_keeps_previous_extractions(builder):
+    builder.update_page_graph(URL, _plan(builder), _knowledge('Acme0', 'Acme59'))
+    before = builder.known_blocks(URL)
+
+    edited = TEXT.replace('Acme59 a racheté Beta59', 'Acme59 a vendu Gamma59')
+    plan = _plan(builder, edited)
+    assert 0 < len(plan.changed) < len(plan.blocks)
+    graph = builder.update_page_graph(URL, plan, {**_knowledge(), 'error': 'illisible'})
+
+    # Blocs inchangés conservés, bloc modifié toujours à extraire
+    assert 'Acme0' in {node.name for node in graph.nodes}
+    assert set(builder.known_blocks(URL)) == set(before) - set(plan.removed)
+    assert _plan(builder, edited).changed == plan.changed
+
+
+def test_remember_knowledge_distinguishes_failure_from_empty(no_llm_cache):
+    empty = remember_knowledge('texte', json.dumps({'entities': [], 'relations': []}))
+    assert empty == {'entities': [], 'relations': []}
+
+    assert remember_knowledge('texte', 'pas de JSON')['error']
+    assert remember_knowledge('texte', '')['error']
+
+    truncated = remember_knowledge('texte', '{"entities": [{"name": "Acme", "type": "Organization"}, {"na')
+    assert truncated['error']
+    assert truncated['entities'] == [{'name': 'Acme', 'type': 'Organization'}]
+
+
+def test_merge_knowledge_propagates_errors():
+    merged = merge_knowledge([_knowledge('Acme'), {**_knowledge('Beta'), 'error': 'coupée'}])
+    assert merged['error'] == 'coupée'
+    assert len(merged['entities']) == 2
+    assert 'error' not in merge_knowledge([_knowledge('Acme'), _knowledge('Beta')])
+
+
+def test_block_knowledge_ignores_spaces_around_names(builder):
+    plan = _plan(builder)
+    builder.update_page_graph(URL, plan, _knowledge(' Acme0 ', 'Beta0'))
+    hashes = [block.hash for block in plan.blocks]
+    extra = {'entities': [{'name': 'acme0', 'type': 'Organization'}],
+             'relations': [{'source': 'Acme0 ', 'target': 'Beta0', 'type': 'owns'},
+                           {'source': 'acme0', 'target': ' beta0', 'type': 'owns'}]}
+    knowledge = builder._block_knowledge(URL, hashes, extra)
+    assert sorted(e['name'].strip().lower() for e in knowledge['entities']) == ['acme0', 'beta0']
+    assert len(knowledge['relations']) == 1
@@ -0,0 +1,56 @@
+import pytest
+
+from config.settings import MAX_CONTENT_CHARS
+from crawler.parsing import available_backends, parse_html
+from preprocessing.blocks import split_blocks, plan_extraction
+from preprocessing.chunker import split_chunks
+from preprocessing.cleaner import clean_text
+
+PAGE = """<html><head><title>Rapport</title></head><body>
+<h1>Résultats</h1>
+<p>Acme a signé avec <b>Beta</b>.<!-- note --> Le contrat court sur deux ans.</p>
+<div>Introduction<p>Détail du contrat.</p>Conclusion</div>
+<ul><li>Paris</li><li>Lyon <a href="/lyon">voir</a></li></ul>
+<table><tr><td>a</td><td>b</td></tr></table>
+</body></html>"""
+
+
+def _paragraph(i, sentences=8):
+    return ' '.join(f"Acme{i} signe le contrat numéro {j} avec Beta{i}." for j in range(sentences))
+
+
+@pytest.mark.parametrize('backend', available_backends())
+def test_html_text_keeps_paragraphs(backend):
+    text = parse_html(PAGE, 'http://example.com/', backend).text
+    assert text.split('\n\n') == [
+        'Rapport', 'Résultats', 'Acme a signé avec Beta . Le contrat court sur deux ans.',
+        'Introduction', 'Détail du contrat.', 'Conclusion', 'Paris', 'Lyon voir', 'a b',
+    ]
+
+
+def test_clean_text_keeps_paragraphs():
+    assert clean_text("Un   texte\n avec  des espaces.\n\n \n Second paragraphe.") == \
+        "Un texte avec des espaces.\n\nSecond paragraphe."
+
+
+def test_chunks_cut_at_paragraph_ends():
+    paragraphs = [_paragraph(i) for i in range(6)]
+    text = '\n\n'.join(paragraphs)
+    count = lambda s: len(s.split())
+    size = count(paragraphs[0])
+    chunks = split_chunks(text, max_tokens=int(size * 2.5), overlap=0, count=count)
+    assert len(chunks) == 3
+    assert chunks == ['\n\n'.join(paragraphs[i:i + 2]) for i in range(0, 6, 2)]
+
+
+def test_blocks_keep_paragraphs():
+    text = clean_text('\n\n'.join(_paragraph(i, 3) for i in range(5)))
+    plan = plan_extraction(split_blocks(text, min_chars=100, max_chars=1000))
+    assert len(plan.blocks) > 1
+    assert plan.text == text
+
+
+def test_stored_content_is_capped(crawler, site):
+    site.pages['/'] = f"<html><body><p>{'mot ' * 5000}</p></body></html>"
+    data = crawler.crawl_url(site.url, content_types=['html'], max_hits=1)
+    assert len(data[0]['content']) == MAX_CONTENT_CHARS
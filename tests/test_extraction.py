@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from crawler.extraction import DocumentExtractor
+
+
+@pytest.fixture
+def extractor():
+    extractor = DocumentExtractor(max_workers=2, timeout=3, memory_mb=0)
+    yield extractor
+    extractor.close()
+
+
+def test_timeout_kills_only_its_task(extractor):
+    stuck = extractor.submit(time.sleep, 30)
+    other = extractor.submit(sorted, [3, 1, 2])
+    assert other.result() == [1, 2, 3]
+    with pytest.raises(TimeoutError):
+        stuck.result()
+    assert extractor.run(sorted, 'cba') == ['a', 'b', 'c']
+
+
+def test_crashed_worker_fails_only_its_task(extractor):
+    slow = extractor.submit(time.sleep, 1)
+    crashed = extractor.submit(os._exit, 1)
+    with pytest.raises(BrokenProcessPool):
+        crashed.result()
+    assert slow.result() is None
+    assert extractor.run(len, 'abc') == 3
+
+
+def test_errors_are_raised_in_the_caller(extractor):
+    with pytest.raises(ValueError):
+        extractor.run(int, 'pas un nombre')
+
+
+def test_crawl_continues_during_pdf_extraction(crawler, site, monkeypatch):
+    site.pages['/'] = ('<html><body><p>Accueil</p><a href="/doc.pdf">pdf</a> '
+                       '<a href="/a">a</a> <a href="/b">b</a></body></html>')
+    site.pages['/doc.pdf'] = ('application/pdf', b'%PDF-1.4')
+    site.pages['/a'] = '<html><body><p>Page a</p></body></html>'
+    site.pages['/b'] = '<html><body><p>Page b</p></body></html>'
+    text = Future()
+    monkeypatch.setattr(crawler.extractor, 'submit_pdf', lambda content: text)
+
+    urls = []
+    for data in crawler.iter_crawl_url(site.url, ['html', 'pdf'], max_hits=10):
+        urls.append(data['url'])
+        if len(urls) == 3:
+            # Les pages HTML sont arrivées pendant l'extraction du PDF
+            threading.Timer(0.1, text.set_result, ['Texte du PDF']).start()
+
+    assert urls[-1] == site.url + 'doc.pdf'
+    assert set(urls[:3]) == {site.url, site.url + 'a', site.url + 'b'}
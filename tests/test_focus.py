@@ -0,0 +1,30 @@
+from crawler.focus import LinkScorer
+from crawler.frontier import Frontier
+
+
+def test_better_score_after_enqueue_raises_priority():
+    focus = LinkScorer(['contrat'])
+    frontier = Frontier(best_first=True)
+    for link in ('http://e/a', 'http://e/b', 'http://e/c'):
+        focus.observe([link], ['rien'], 0)
+        frontier.push(link, priority=focus.priority(link))
+
+    # Une autre page cite /c avec une ancre pertinente
+    focus.observe(['http://e/c'], ['le contrat signé'], 3)
+    frontier.push('http://e/c', priority=focus.priority('http://e/c'))
+    assert focus.priority('http://e/c') > 0
+    assert len(frontier) == 3
+
+    assert frontier.pop() == 'http://e/c'
+    assert [frontier.pop(), frontier.pop()] == ['http://e/a', 'http://e/b']
+    assert not frontier
+
+
+def test_lower_score_keeps_best_priority():
+    focus = LinkScorer(['contrat'])
+    focus.observe(['http://e/a'], ['contrat'], 0)
+    best = focus.priority('http://e/a')
+    focus.observe(['http://e/a'], ['autre'], 0)
+    assert focus.priority('http://e/a') == best
+    focus.discard('http://e/a')
+    assert focus.priority('http://e/a') == 0
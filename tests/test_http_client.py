@@ -0,0 +1,49 @@
+import socket
+from urllib.parse import urlparse
+
+from crawler.http_client import DNSCache, HttpClient
+
+
+def test_dns_cache_is_bounded():
+    dns = DNSCache(ttl=60, max_entries=2)
+    for port in (80, 443, 8080):
+        dns.getaddrinfo('127.0.0.1', port)
+    assert len(dns) == 2
+    dns.getaddrinfo('127.0.0.1', 8080)
+    assert dns.stats()['hits'] == 1
+    dns.getaddrinfo('127.0.0.1', 80)
+    assert dns.stats()['misses'] == 4
+
+
+def test_dns_cache_limited_to_client_connections(site):
+    site.pages['/'] = '<html><body>ok</body></html>'
+    resolve = socket.getaddrinfo
+    client = HttpClient(dns_ttl=60, http2=False)
+    try:
+        assert socket.getaddrinfo is resolve
+        # Un nom plutôt qu'une IP ; ::1 refusé, la connexion passe à l'adresse suivante
+        url = f"http://localhost:{urlparse(site.url).port}/"
+        for _ in range(3):
+            client.session.get(url, headers={'Connection': 'close'}, timeout=5).raise_for_status()
+        assert client.stats()['dns']['misses'] == 1
+        assert client.stats()['dns']['hits'] == 2
+    finally:
+        client.close()
+
+
+def test_host_pool_does_not_match_longer_host_names():
+    client = HttpClient(host_pools={'example.com': 4}, dns_ttl=0, http2=False)
+    try:
+        dedicated = client.session.get_adapter('http://example.com/page')
+        assert client.session.get_adapter('http://example.com.evil.com/') is not dedicated
+        assert client.session.get_adapter('https://example.com/page') is dedicated
+    finally:
+        client.close()
+
+
+def test_throttled_responses_are_retried():
+    retry = HttpClient(dns_ttl=0, http2=False)._retry()
+    assert retry.is_retry('GET', 429)
+    assert retry.respect_retry_after_header
+    # Avec le contrôleur de débit, les 429 lui reviennent
+    assert not HttpClient(dns_ttl=0, http2=False, throttle_retries=False)._retry().is_retry('GET', 429)
@@ -0,0 +1,63 @@
+from crawler.jobs import JobQueue
+from crawler.worker import CrawlWorker
+
+
+def _worker(crawler):
+    queue = JobQueue(crawler.db, max_attempts=2)
+    return queue, CrawlWorker(crawler, queue, worker_id='test', poll_interval=0)
+
+
+def test_failed_crawl_is_retried_then_failed(crawler, site):
+    # Aucune page servie : chaque requête répond 404
+    source_id = crawler.add_source(site.url + 'absente', content_types=['html'])
+    queue, worker = _worker(crawler)
+    queue.enqueue(source_id)
+
+    worker.process(queue.lease('test'))
+    job = queue.jobs.find_one({'source_id': source_id})
+    assert job['status'] == 'queued'
+    assert job['run_at'] > job['finished_at']
+    assert '1 erreur' in job['error']
+    assert crawler.sources_collection.find_one()['status'] == 'error'
+
+    # Backoff écoulé : le job est repris, puis abandonné après max_attempts
+    queue.jobs.update_one({'_id': job['_id']}, {'$set': {'run_at': job['finished_at']}})
+    worker.process(queue.lease('test'))
+    job = queue.jobs.find_one({'_id': job['_id']})
+    assert job['status'] == 'failed'
+    assert job['attempts'] == 2
+
+
+def test_successful_crawl_completes_job(crawler, site):
+    site.pages['/'] = '<html><head><title>Accueil</title></head><body><p>Bonjour</p></body></html>'
+    source_id = crawler.add_source(site.url, content_types=['html'])
+    queue, worker = _worker(crawler)
+    queue.enqueue(source_id)
+
+    worker.process(queue.lease('test'))
+    job = queue.jobs.find_one({'source_id': source_id})
+    assert job['status'] == 'done'
+    assert job['result']['stored'] == 1
+    assert 'error' not in job['result']
+
+
+def test_missing_source_reports_error(crawler):
+    result = crawler.crawl_source('0' * 24)
+    assert result['stored'] == 0
+    assert result['error']
+
+
+def test_concurrent_enqueue_keeps_one_active_job(crawler, monkeypatch):
+    queue = JobQueue(crawler.db)
+    assert queue.enqueue('source')
+    # Deux planificateurs : le second n'a pas vu le job inséré par le premier
+    def racing_upsert(query, update, upsert):
+        queue.jobs.insert_one(dict(update['$setOnInsert']))
+    monkeypatch.setattr(queue.jobs, 'update_one', racing_upsert)
+    assert not queue.enqueue('source')
+    monkeypatch.undo()
+    assert queue.jobs.count_documents({'source_id': 'source'}) == 1
+
+    job = queue.lease('w')
+    queue.complete(job['_id'], 'w')
+    assert queue.enqueue('source')
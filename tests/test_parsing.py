@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.fixture_site import build_site
+from crawler.parsing import available_backends, parse_html
+
+SAMPLES = {
+    'template': ('<html><head><title>Modèle</title></head><body><p>Visible</p>'
+                 '<template><p>Caché</p><a href="/cache">caché</a></template>'
+                 '<a href="/vu">vu</a></body></html>'),
+    'scripts': ('<!DOCTYPE html><html><head><title> Titre  long </title>'
+                '<meta name="keywords" content="un, deux"><style>p {}</style></head>'
+                '<body><script>var x = "<p>non</p>";</script><!-- commentaire -->'
+                '<noscript>Activez JavaScript</noscript><p>Texte &amp; entités &eacute;</p></body></html>'),
+    'nested': ('<html><body><div>avant<section><h2>Titre</h2><p>Un <em>mot</em> '
+               '<a href="../rel?q=1#frag">lien <b>gras</b></a></p></section>après</div>'
+               '<ul><li>un</li><li>deux</li></ul><table><tr><td>a</td><td>b</td></tr></table>'
+               '</body></html>'),
+    'broken': '<html><body><p>non fermé<div>bloc<p>autre <a href=/x>x</a></body>',
+    'charset': ('<html><head><meta charset="iso-8859-1"><title>Caf\xe9</title></head>'
+                '<body><p>\xe9t\xe9</p></body></html>').encode('latin-1'),
+    'fixture': build_site(3)['/page/1'],
+}
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_backends_agree(name):
+    backends = available_backends()
+    pages = {b: parse_html(SAMPLES[name], 'http://example.com/a/b', b) for b in backends}
+    reference = pages[backends[-1]]
+    for backend, page in pages.items():
+        assert page == reference, backend
+
+
+def test_template_content_is_ignored():
+    for backend in available_backends():
+        page = parse_html(SAMPLES['template'], 'http://example.com/', backend)
+        assert 'Caché' not in page.text
+        assert page.links == ['http://example.com/vu']
@@ -0,0 +1,10 @@
+from urllib.robotparser import RobotFileParser
+
+from crawler.web_crawler import HEADERS
+
+
+def test_sent_user_agent_matches_robots_group():
+    robots = RobotFileParser()
+    robots.parse(['User-agent: GrapheWeb', 'Disallow: /prive/'])
+    assert not robots.can_fetch(HEADERS['User-Agent'], 'http://example.com/prive/page')
+    assert robots.can_fetch(HEADERS['User-Agent'], 'http://example.com/public')
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+from crawler.page_state import CrawlStats
+
+
+def _page(title, links=(), text=''):
+    anchors = ''.join(f'<a href="{href}">{href}</a> ' for href in links)
+    return (f'<html><head><title>{title}</title></head><body><h1>{title}</h1>'
+            f'<p>{text or title} contenu de test.</p><nav>{anchors}</nav></body></html>')
+
+
+def _news_site():
+    return {
+        '/': _page('Accueil', ['/news/', '/docs/']),
+        '/news/': _page('Actualités', ['/news/1']),
+        '/news/1': _page('Article 1'),
+        '/docs/': _page('Documentation', ['intro']),
+        '/docs/intro': _page('Introduction'),
+    }
+
+
+def test_relative_links_resolved_under_trailing_slash(crawler, site):
+    site.pages.update(_news_site())
+    urls = {data['url'] for data in crawler.crawl_url(site.url, ['html'], max_hits=10)}
+    assert site.url + 'docs/intro' in urls
+    assert site.url + 'docs/' in urls
+
+
+def test_recrawl_revisits_known_pages_and_finds_new_ones(crawler, site):
+    site.pages.update(_news_site())
+    source_id = crawler.add_source(site.url, content_types=['html'], max_hits=20)
+    first = crawler.crawl_source(source_id)
+    assert first['stored'] == 5
+
+    site.pages['/news/'] = _page('Actualités', ['/news/1', '/news/2'])
+    site.pages['/news/2'] = _page('Article 2')
+    hits = site.hits
+    second = crawler.crawl_source(source_id)
+
+    assert site.hits - hits > 1
+    stored = crawler.data_collection.find_one({'url': site.url + 'news/2'})
+    assert stored is not None
+    # Seule la page modifiée et la nouvelle sont retenues
+    assert second['stored'] == 2
+    assert second['not_modified'] == 4
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_recrawl_estimate_counts_non_seed_pages(crawler, site, concurrency):
+    crawler.concurrency = concurrency
+    site.pages.update(_news_site())
+    source_id = crawler.add_source(site.url, content_types=['html'], max_hits=20)
+    crawler.crawl_source(source_id)
+    site.pages['/docs/intro'] = _page('Introduction', text='Version 2')
+    crawler.crawl_source(source_id)
+
+    from bson.objectid import ObjectId
+    source = crawler.sources_collection.find_one({'_id': ObjectId(source_id)})
+    decision = source['recrawl']['history'][-1]
+    assert decision['revisited'] == 5
+    assert decision['changed'] == 1
+
+
+def test_failed_fetch_is_not_marked_visited(crawler, site):
+    from crawler.frontier import VisitedStore
+    site.pages.update(_news_site())
+    del site.pages['/news/1']
+    source_id = crawler.add_source(site.url, content_types=['html'], max_hits=20)
+    crawler.crawl_source(source_id)
+
+    visited = VisitedStore.for_source(source_id)
+    assert site.url + 'news/' in visited
+    assert site.url + 'news/1' not in visited
+
+
+def test_deferred_state_written_only_on_commit(crawler, site):
+    site.pages.update(_news_site())
+    state = crawler.page_state(deferred=True)
+    crawler.crawl_url(site.url, ['html'], max_hits=10, page_state=state)
+    assert crawler.page_state_collection.count_documents({}) == 0
+
+    # Extraction échouée pour un article : son état n'est pas écrit
+    state.discard(site.url + 'news/1')
+    state.commit()
+    assert crawler.page_state_collection.count_documents({}) == 4
+
+    hits = site.hits
+    again = crawler.crawl_url(site.url, ['html'], max_hits=10, page_state=crawler.page_state())
+    assert [data['url'] for data in again] == [site.url + 'news/1']
+    # Requêtes conditionnelles pour toutes les pages connues, pas seulement l'URL de départ
+    assert site.hits - hits == 5
+
+
+def test_irrelevant_pages_keep_their_state(crawler, site):
+    site.pages.update(_news_site())
+    source_id = crawler.add_source(site.url, content_types=['html'], max_hits=20, keywords=['Article'])
+    first = crawler.crawl_source(source_id)
+    assert first['stored'] == 1
+    assert crawler.page_state_collection.count_documents({'body_hash': {'$exists': True}}) == 5
+
+    second = crawler.crawl_source(source_id)
+    # Pages non pertinentes revalidées par requête conditionnelle, pas retéléchargées
+    assert second['stored'] == 0
+    assert second['not_modified'] == 5
+
+
+def test_async_crawl_returns_after_its_workers(crawler, site):
+    site.latency = 0.2
+    site.pages.update(_news_site())
+    site.pages['/'] = _page('Accueil', [f'/p{i}' for i in range(8)])
+    site.pages.update({f'/p{i}': _page(f'Page {i}') for i in range(8)})
+    crawler.concurrency = 8
+    stats = CrawlStats()
+
+    data = asyncio.run(crawler.crawl_url_async(site.url, ['html'], max_hits=2, stats=stats))
+    assert len(data) == 2
+    fetched = stats['fetched']
+    time.sleep(0.5)
+    # Aucune page terminée après le retour du crawl
+    assert stats['fetched'] == fetched
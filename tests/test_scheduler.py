@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson.objectid import ObjectId
+
+from crawler.scheduler import CrawlScheduler
+
+
+def _boom(source_id):
+    raise RuntimeError('panne')
+
+
+@pytest.mark.parametrize('crawl', [_boom, lambda source_id: {'stored': 0, 'error': 'panne'}])
+def test_failed_crawl_is_not_redispatched_at_once(crawler, crawl, monkeypatch):
+    source_id = crawler.add_source('http://example.com/', frequency='daily')
+    stale = datetime.now() - timedelta(days=30)
+    crawler.sources_collection.update_one({'_id': ObjectId(source_id)}, {'$set': {'last_crawl': stale}})
+    monkeypatch.setattr(crawler, 'crawl_source', crawl)
+
+    scheduler = CrawlScheduler(crawler, max_workers=1)
+    try:
+        scheduler.refresh()
+        assert scheduler.entries[source_id][0] <= datetime.now()
+        started = datetime.now()
+        scheduler._run(source_id, started)
+        assert scheduler.entries[source_id][0] > started + timedelta(hours=1)
+        assert scheduler._dispatch_due() > 0
+        assert not scheduler.running
+    finally:
+        scheduler.stop()
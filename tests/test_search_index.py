@@ -0,0 +1,29 @@
+from crawler.search_index import SearchIndex
+
+
+def _scores(index, query):
+    return {r['url']: r['score'] for r in index.search(query)['results']}
+
+
+def test_deleted_documents_leave_document_frequency(tmp_path):
+    docs = {f'/{i}': f'contrat numéro {i}' for i in range(4)}
+    docs['/autre'] = 'sans rapport'
+
+    index = SearchIndex(str(tmp_path / 'index'))
+    for url, text in docs.items():
+        index.add('s', url, text)
+    index.commit()
+    for url in ('/1', '/2', '/3'):
+        index.delete('s', url)
+    index.add('s', '/autre', 'autre texte')
+    index.commit()
+
+    fresh = SearchIndex(str(tmp_path / 'fresh'))
+    fresh.add('s', '/0', docs['/0'])
+    fresh.add('s', '/autre', 'autre texte')
+    fresh.commit()
+    try:
+        assert _scores(index, 'contrat') == _scores(fresh, 'contrat')
+    finally:
+        index.close()
+        fresh.close()
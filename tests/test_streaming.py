@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from llm.batch import BatchExtractor
+from llm.extractor import PartialResponse, parse_knowledge
+from llm.json_stream import KnowledgeStream, loads_lenient, salvage
+from preprocessing.blocks import split_blocks, plan_extraction
+
+ENTITIES = [{'name': f'Acme{i}', 'type': 'Organization'} for i in range(5)]
+RELATIONS = [{'source': 'Acme0', 'target': 'Acme1', 'type': 'partenaire'}]
+RESPONSE = json.dumps({'entities': ENTITIES, 'relations': RELATIONS})
+
+
+def test_objects_emitted_as_soon_as_complete():
+    stream = KnowledgeStream()
+    emitted = []
+    for pos, char in enumerate('Voici le JSON :\n```json\n' + RESPONSE + '\n```'):
+        for item in stream.feed(char):
+            emitted.append((pos, item))
+    assert [obj for _, (key, obj) in emitted if key == 'entities'] == ENTITIES
+    assert [obj for _, (key, obj) in emitted if key == 'relations'] == RELATIONS
+    # La première entité arrive bien avant la fin de la réponse
+    assert emitted[0][0] < len(RESPONSE) // 2
+    assert stream.complete and not stream.invalid
+
+
+def test_salvage_truncated_response():
+    knowledge, complete = salvage(RESPONSE[:RESPONSE.index('Acme3') + 3])
+    assert knowledge == {'entities': ENTITIES[:3], 'relations': []}
+    assert not complete
+
+
+def test_salvage_repairs_trailing_commas():
+    raw = '{"entities": [{"name": "Acme", "type": "Organization",},], "relations": [],}'
+    knowledge, complete = salvage(raw)
+    assert knowledge['entities'] == [{'name': 'Acme', 'type': 'Organization'}]
+    assert complete
+    assert loads_lenient(raw)['relations'] == []
+
+
+def test_salvage_ignores_braces_inside_strings():
+    raw = '{"entities": [{"name": "A } B", "type": "Concept"}, {"name": "C {", "type'
+    knowledge, _ = salvage(raw)
+    assert knowledge['entities'] == [{'name': 'A } B', 'type': 'Concept'}]
+
+
+def test_parse_knowledge_partial_response():
+    truncated = RESPONSE[:RESPONSE.index('Acme2') + 3]
+    assert parse_knowledge(truncated)['entities'] == ENTITIES[:2]
+    with pytest.raises(PartialResponse) as info:
+        parse_knowledge(truncated, strict=True)
+    assert info.value.knowledge['entities'] == ENTITIES[:2]
+
+
+def test_batch_extractor_emits_items_during_stream(monkeypatch, no_llm_cache):
+    events = []
+
+    def fake_stream(prompt, system=None, usage=None):
+        for start in range(0, len(RESPONSE), 8):
+            events.append('delta')
+            yield RESPONSE[start:start + 8]
+        events.append('end')
+
+    monkeypatch.setattr('llm.batch.stream_groq', fake_stream)
+    extractor = BatchExtractor(packing=False, streaming=True, rpm=0, tpm=0)
+    items = []
+
+    def on_item(i, key, obj):
+        events.append('item')
+        items.append((i, key, obj))
+
+    [(i, knowledge)] = list(extractor.as_completed(['Acme0 et Acme1.'], on_item=on_item))
+    assert knowledge == {'entities': ENTITIES, 'relations': RELATIONS}
+    assert events.index('item') < events.index('end')
+    assert {(key, json.dumps(obj)) for _, key, obj in items} == {
+        ('entities', json.dumps(e)) for e in ENTITIES} | {('relations', json.dumps(RELATIONS[0]))}
+
+
+def test_live_page_graph_matches_rebuilt_graph(builder):
+    url = 'https://exemple.fr/page'
+    text = ' '.join(f"Acme{i} travaille avec Acme{i + 1} depuis {2000 + i}." for i in range(40))
+    plan = plan_extraction(split_blocks(text), builder.known_blocks(url))
+    knowledge = {'entities': ENTITIES, 'relations': RELATIONS}
+
+    live = builder.start_page_graph(url, plan)
+    # Relation reçue avant ses entités, puis doublons
+    for key, obj in [('relations', RELATIONS[0])] + [('entities', e) for e in ENTITIES] * 2:
+        live.add(key, obj)
+    streamed = builder.update_page_graph(url, plan, knowledge, live)
+
+    rebuilt = builder.update_page_graph(url, plan, knowledge)
+    assert sorted((n.name, n.type) for n in streamed.nodes) == sorted((n.name, n.type) for n in rebuilt.nodes)
+    assert [(e.source, e.target) for e in streamed.edges] == [(e.source, e.target) for e in rebuilt.edges]